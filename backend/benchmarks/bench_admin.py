@@ -0,0 +1,64 @@
+"""
+Render time of the admin changelists as the tables grow.
+
+Seeds the same hostel at each --students size in turn (seed_hostel with
+--days days of attendance and --months of bills, fixed seed; each size adds
+to the previous one), runs ANALYZE so the database has row estimates, as
+autovacuum keeps them on a server, then loads each changelist --repeat
+times as a superuser: unfiltered, and narrowed to one month (the filter
+the admin offers for attendance is the date range).
+
+    python benchmarks/bench_admin.py [--students 1000 10000] [--days 30]
+"""
+import argparse
+import datetime
+import json
+
+from common import setup_django, summarize, test_database, timed
+
+START = datetime.date(2025, 1, 1)
+
+CHANGELISTS = [
+    '/admin/mess_api/attendance/',
+    f'/admin/mess_api/attendance/?date__gte={START}&date__lt={START.replace(month=2)}',
+    '/admin/mess_api/bill/',
+    '/admin/mess_api/studentprofile/',
+    '/admin/mess_api/monthlyattendancesummary/',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--months', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import Client
+    from mess_api.models import Attendance, User
+    from mess_api.seeding import seed_hostel
+
+    results = {}
+    with test_database():
+        client = Client()
+        client.force_login(User.objects.create(username='bench_admin', is_staff=True, is_superuser=True))
+        for students in args.students:
+            seed_hostel(students, days=args.days, months=args.months, start=START)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            run = {'attendance_rows': Attendance.objects.count()}
+            for url in CHANGELISTS:
+                queries = []
+                with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                    assert client.get(url).status_code == 200, url
+                run[url] = dict(summarize(timed(lambda: client.get(url), args.repeat)), queries=len(queries))
+            results[f'{students} students'] = run
+
+    print(json.dumps({'params': vars(args), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
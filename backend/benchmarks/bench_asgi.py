@@ -0,0 +1,212 @@
+"""
+Load test of the async read endpoints under an ASGI server against the
+sync endpoints under a WSGI server, at meal-time concurrency.
+
+Migrates and seeds (seed_data) a scratch SQLite database in a temporary
+directory, then starts two real servers on it with --workers processes each:
+
+* wsgi - gunicorn (sync workers: one request at a time each)
+* asgi - uvicorn
+
+Both serve the project's applications through benchmarks/latency.py, which
+adds --db-latency-ms before every query to stand in for the network round
+trip to a real database server (0 to measure the SQLite file as it is).
+
+Each endpoint is then hit --requests times by --concurrency clients over
+keep-alive connections (gunicorn's sync workers close them after each
+response, so its clients reconnect), with a seeded student's token, or the
+staff token for the roster. Three runs per endpoint:
+
+* wsgi sync    - /api/... under gunicorn, today's deployment
+* asgi sync    - /api/... under uvicorn (DRF views in worker threads)
+* asgi async   - /api/async/... under uvicorn
+
+and per run: requests per second, p50 / p95 / max latency, and the count
+of non-200 responses or failed connections.
+
+    python benchmarks/bench_asgi.py --students 500 --concurrency 200 --requests 4000
+
+Needs gunicorn and uvicorn (requirements.txt). The load generator runs on
+the same machine as the servers, so compare runs with each other rather
+than with production numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from common import BACKEND_DIR, setup_django, summarize
+
+# (sync path, async path, query string); the dates fall in the seeded range.
+ENDPOINTS = [
+    ('/api/menu/', '/api/async/menu/', ''),
+    ('/api/me/', '/api/async/me/', ''),
+    ('/api/attendance/', '/api/async/attendance/', 'month=2025-01'),
+    ('/api/bills/', '/api/async/bills/', ''),
+    ('/api/attendance/roster/', '/api/async/roster/', 'date=2025-01-15'),
+]
+
+STAFF_ONLY = {'/api/attendance/roster/'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def manage(env, *args):
+    subprocess.run([sys.executable, 'manage.py', *args], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def start_server(command, env, port):
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/menu/', timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{command[0]} did not start on port {port}")
+
+
+def login(port, username, role):
+    from mess_api.seeding import SEED_PASSWORD
+
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/api/login/',
+        data=json.dumps({'username': username, 'password': SEED_PASSWORD, 'role': role}).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)['access']
+
+
+async def read_response(reader):
+    """Reads one HTTP/1.1 response; returns (status, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    return status, headers.get('connection') != 'close'
+
+
+async def load(port, path, token, total, concurrency):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+        f'Authorization: Bearer {token}\r\nConnection: keep-alive\r\n\r\n'
+    ).encode()
+    remaining = iter(range(total))
+    samples, failures = [], 0
+
+    async def client():
+        nonlocal failures
+        connection = None
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                reader, writer = connection
+                writer.write(request)
+                status, keep_alive = await read_response(reader)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                failures += 1
+                connection = None
+                continue
+            samples.append(time.perf_counter() - start)
+            failures += status != 200
+            if not keep_alive:
+                writer.close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    return dict(summarize(samples), requests_per_s=round(len(samples) / elapsed, 1), errors=failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--months', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--db-latency-ms', type=float, default=2.0)
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    # Only for the seeded credentials; the servers are separate processes.
+    setup_django()
+    from mess_api.seeding import SEED_STAFF_USERNAME
+
+    report = {'params': vars(args), 'results': {}}
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{scratch}/bench.sqlite3', DEBUG='False')
+        manage(env, 'migrate')
+        manage(env, 'seed_data', '--students', str(args.students), '--days', str(args.days),
+               '--months', str(args.months))
+
+        env['BENCH_DB_LATENCY_MS'] = str(args.db_latency_ms)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(BACKEND_DIR), env.get('PYTHONPATH')]))
+        wsgi_port, asgi_port = free_port(), free_port()
+        servers = {
+            'wsgi': (wsgi_port, ['gunicorn', 'benchmarks.latency:wsgi_application', '--workers', str(args.workers),
+                                 '--bind', f'127.0.0.1:{wsgi_port}', '--backlog', '4096']),
+            'asgi': (asgi_port, ['uvicorn', 'benchmarks.latency:asgi_application', '--workers', str(args.workers),
+                                 '--port', str(asgi_port), '--no-access-log', '--backlog', '4096']),
+        }
+        processes = []
+        try:
+            for port, command in servers.values():
+                processes.append(start_server(command, env, port))
+            student = login(asgi_port, 'seed_000000', 'student')
+            staff = login(asgi_port, SEED_STAFF_USERNAME, 'staff')
+
+            for sync_path, async_path, query in ENDPOINTS:
+                token = staff if sync_path in STAFF_ONLY else student
+                runs = [('wsgi sync', wsgi_port, sync_path), ('asgi sync', asgi_port, sync_path),
+                        ('asgi async', asgi_port, async_path)]
+                for label, port, path in runs:
+                    url = f'{path}?{query}' if query else path
+                    report['results'][f'{label} GET {url}'] = asyncio.run(
+                        load(port, url, token, args.requests, args.concurrency)
+                    )
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Table size and billing time of the two attendance layouts
+(ATTENDANCE_STORAGE = 'rows' or 'bitmap').
+
+Seeds --students students with --days days of attendance (seed_hostel,
+row layout), measures, then packs the same days into AttendanceMonth with
+pack_attendance() and measures again. Per layout:
+
+* rows and bytes of the attendance table with its indexes (SQLite's
+  dbstat; other backends report rows only)
+* recount      - every monthly count recomputed from the day-level data,
+                 as `rebuild_attendance_summaries --verify` does
+* bill month   - generate_monthly_bills() for the first month
+* roll call    - one day marked for every student (bulk_mark_attendance)
+* roster       - the roster query for one day, all students
+
+Writes run in a rolled-back transaction so both layouts see the same data.
+
+    python benchmarks/bench_attendance_storage.py [--students 5000] [--days 90] [--repeat 3]
+"""
+import argparse
+import datetime
+import json
+import time
+
+from common import setup_django, summarize, test_database, timed
+
+START = datetime.date(2025, 1, 1)
+
+
+def table_size(model):
+    """(rows, bytes of the table and its indexes); bytes is None off SQLite."""
+    from django.db import connection
+
+    table = model._meta.db_table
+    rows = model.objects.count()
+    if connection.vendor != 'sqlite':
+        return rows, None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+            [table],
+        )
+        return rows, cursor.fetchone()[0]
+
+
+def measure(args, model):
+    from django.db import transaction
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+    from mess_api.attendance_ingest import bulk_mark_attendance
+    from mess_api.billing_engine import generate_monthly_bills
+    from mess_api.models import StudentProfile
+    from mess_api.seeding import SEED_RATES
+    from mess_api.summaries import rebuild_monthly_summaries
+    from mess_api.views import roster_queryset
+
+    rows, size = table_size(model)
+    day = START + datetime.timedelta(days=args.days // 2)
+    records = [{'reg_num': reg_num, 'is_present': True, 'meal_type': 'Veg'}
+               for reg_num in StudentProfile.objects.values_list('reg_num', flat=True)]
+    roster_request = Request(RequestFactory().get('/', {'date': day.isoformat()}))
+
+    def rolled_back(fn):
+        def run():
+            with transaction.atomic():
+                fn()
+                transaction.set_rollback(True)
+        return run
+
+    return {
+        'rows': rows,
+        'bytes': size,
+        'bytes_per_student_day': round(size / (len(records) * args.days), 1) if size else None,
+        'recount': summarize(timed(lambda: rebuild_monthly_summaries(dry_run=True), args.repeat)),
+        'bill month': summarize(timed(
+            rolled_back(lambda: generate_monthly_bills(START, SEED_RATES)), args.repeat,
+        )),
+        'roll call': summarize(timed(rolled_back(lambda: bulk_mark_attendance(day, records)), args.repeat)),
+        'roster': summarize(timed(lambda: list(roster_queryset(roster_request)), args.repeat)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from mess_api.attendance_bitmap import pack_attendance
+    from mess_api.models import Attendance, AttendanceMonth
+    from mess_api.seeding import seed_hostel
+
+    results = {}
+    with test_database():
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            seed_hostel(args.students, days=args.days, months=0, start=START)
+            results['rows'] = measure(args, Attendance)
+
+        with override_settings(ATTENDANCE_STORAGE='bitmap'):
+            start = time.perf_counter()
+            stats = pack_attendance()
+            results['pack_seconds'] = round(time.perf_counter() - start, 2)
+            results['packed_days'] = stats['days']
+            results['bitmap'] = measure(args, AttendanceMonth)
+
+    print(json.dumps({'params': vars(args), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark of the bill formula (mess_api/billing.py).
+
+Prices 100k random (present days, non-veg days) pairs, as one month of a
+100k-student hostel, three ways: the batched Decimal evaluator the bill
+generator uses, a plain per-student Decimal loop, and the float loop the
+API used to run. No database is involved.
+
+    python benchmarks/bench_billing.py [--students 100000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+
+from common import setup_django, summarize, timed
+
+RATES = {'daily_rate': 65, 'nv_plate_rate': 27}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup_django()
+    from mess_api import billing
+
+    rng = random.Random(args.seed)
+    present = [rng.randint(0, 31) for _ in range(args.students)]
+    nv = [rng.randint(0, p) for p in present]
+    rates = billing.parse_rates(RATES)
+    float_rates = {name: float(value) for name, value in rates.items()}
+
+    def batched():
+        return billing.bill_amounts(present, nv, rates)
+
+    def per_student():
+        return [billing.bill_amount(p, n, rates) for p, n in zip(present, nv)]
+
+    def floats():
+        fixed = sum(float_rates[name] for name in billing.FIXED_CHARGE_FIELDS)
+        return [p * float_rates['daily_rate'] + n * float_rates['nv_plate_rate'] + fixed for p, n in zip(present, nv)]
+
+    assert batched() == per_student()
+    results = {
+        name: summarize(timed(fn, args.repeat))
+        for name, fn in (('decimal batched', batched), ('decimal per student', per_student), ('float loop', floats))
+    }
+    print(json.dumps({'students': args.students, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Latency of POST /api/attendance/bulk_update/ for 100, 1k and 10k records.
+
+Each payload is posted twice per run: once against an empty day (all
+inserts) and once more for the same day (all conflicts -> updates).
+
+    python benchmarks/bench_bulk_attendance.py [--repeat 3]
+"""
+import argparse
+import datetime
+import json
+
+from common import setup_django, test_database, timed, summarize
+
+SIZES = [100, 1_000, 10_000]
+
+
+def seed_students(count):
+    from mess_api.models import User, StudentProfile
+
+    User.objects.bulk_create(
+        User(username=f'bench{i}', is_student=True) for i in range(count)
+    )
+    users = User.objects.filter(username__startswith='bench').order_by('id')
+    StudentProfile.objects.bulk_create(
+        StudentProfile(user=user, reg_num=f'B{i:06d}', branch='CSE', year=1 + i % 4)
+        for i, user in enumerate(users)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from mess_api.models import User
+
+    results = {}
+    with test_database():
+        seed_students(max(SIZES))
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='bench-staff', is_staff_member=True))
+        day = datetime.date(2025, 1, 1)
+
+        for size in SIZES:
+            records = [
+                {'reg_num': f'B{i:06d}', 'is_present': i % 7 != 0, 'meal_type': 'Non-Veg' if i % 3 == 0 else 'Veg'}
+                for i in range(size)
+            ]
+            inserts, updates = [], []
+            for _ in range(args.repeat):
+                day += datetime.timedelta(days=1)
+                payload = {'date': day.isoformat(), 'records': records}
+                inserts += timed(lambda: client.post('/api/attendance/bulk_update/', payload, format='json'))
+                with CaptureQueriesContext(connection) as queries:
+                    updates += timed(lambda: client.post('/api/attendance/bulk_update/', payload, format='json'))
+            results[size] = {
+                'insert': summarize(inserts),
+                'update': summarize(updates),
+                'queries': len(queries),
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Time and peak Python memory of a CSV attendance import.
+
+Builds registers of 2,000 students over 5, 10 and 25 days (10k, 20k and
+50k rows) on disk, then imports each one from the file with
+import_attendance_csv, as the upload endpoint and the import_attendance
+command do. Peak memory should stay roughly flat as the file grows.
+
+    python benchmarks/bench_csv_import.py [--students 2000]
+"""
+import argparse
+import datetime
+import json
+import tempfile
+import time
+import tracemalloc
+
+from common import setup_django, test_database
+
+DAYS = [5, 10, 25]
+
+
+def write_register(handle, students, days, first_day):
+    handle.write('reg_num,date,is_present,meal_type\n')
+    for offset in range(days):
+        day = (first_day + datetime.timedelta(days=offset)).isoformat()
+        for i in range(students):
+            present = 'no' if (i + offset) % 9 == 0 else 'yes'
+            meal = 'Non-Veg' if (i + offset) % 4 == 0 else 'Veg'
+            handle.write(f'B{i:06d},{day},{present},{meal}\n')
+    handle.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from bench_bulk_attendance import seed_students
+    from mess_api.attendance_ingest import import_attendance_csv
+
+    results = {}
+    with test_database():
+        seed_students(args.students)
+        first_day = datetime.date(2025, 1, 1)
+        for days in DAYS:
+            with tempfile.NamedTemporaryFile('w+', suffix='.csv', newline='') as register:
+                write_register(register, args.students, days, first_day)
+                register.seek(0)
+                start = time.perf_counter()
+                report = import_attendance_csv(register)
+                elapsed = time.perf_counter() - start
+
+                # Memory is measured on a second import of the same file
+                # (all updates), since tracing slows the import down.
+                register.seek(0)
+                tracemalloc.start()
+                import_attendance_csv(register)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            results[f'{report["rows"]} rows'] = {
+                'seconds': round(elapsed, 2),
+                'rows_per_s': round(report['rows'] / elapsed),
+                'peak_mib': round(peak / 2 ** 20, 1),
+                'errors': report['error_count'],
+            }
+            # Next register lands on fresh days, so every run is all inserts.
+            first_day += datetime.timedelta(days=days)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
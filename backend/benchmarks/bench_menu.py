@@ -0,0 +1,83 @@
+"""
+Throughput of GET /api/menu/ before and after the menu cache.
+
+Three scenarios, each sending --requests requests through the full
+middleware stack with a student's bearer token, as the frontend does:
+
+* uncached     - the cache is flushed before every request, i.e. the menu
+                 query and serialization every read paid before the cache
+                 existed (the old view also loaded the token's user, so
+                 the real "before" was one query slower still)
+* cached       - plain GETs served from the cache
+* conditional  - revalidations with If-None-Match, answered with 304
+
+    python benchmarks/bench_menu.py [--requests 2000]
+"""
+import argparse
+import json
+import time
+
+from common import setup_django, test_database
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def run(client, count, before=None, **headers):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    elapsed = 0.0
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(count):
+            if before:
+                before()
+            start = time.perf_counter()
+            response = client.get('/api/menu/', headers=headers)
+            elapsed += time.perf_counter() - start
+    return {
+        'status': response.status_code,
+        'requests_per_s': round(count / elapsed, 1),
+        'mean_ms': round(elapsed / count * 1000, 3),
+        'queries_per_request': round(len(queries) / count, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from mess_api.models import User, Menu
+
+    with test_database():
+        for day in DAYS:
+            Menu.objects.create(
+                day=day,
+                breakfast='Idli, Sambar, Chutney, Tea',
+                lunch='Rice, Dal, Sabzi, Curd, Papad',
+                dinner='Chapati, Paneer Curry, Rice, Kheer',
+            )
+        student = User.objects.create(username='bench-student', is_student=True)
+        token = str(RefreshToken.for_user(student).access_token)
+        client = Client(headers={'Authorization': f'Bearer {token}'})
+
+        cache.clear()
+        etag = client.get('/api/menu/')['ETag']
+        results = {
+            'uncached': run(client, args.requests, before=cache.clear),
+            'cached': run(client, args.requests),
+            'conditional': run(client, args.requests, if_none_match=etag),
+        }
+        baseline = results['uncached']['requests_per_s']
+        for scenario in results.values():
+            scenario['speedup'] = round(scenario['requests_per_s'] / baseline, 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
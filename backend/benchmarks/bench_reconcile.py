@@ -0,0 +1,75 @@
+"""
+Time of a statement reconciliation against a hostel's unpaid bills.
+
+Seeds --students students with three months of bills (seed_hostel, about
+30% left unpaid), then writes statements of 1k, 5k and 10k lines: one
+payment per unpaid bill, half by reg_num / month columns and half by a
+UPI narration, plus a tenth of lines that match nothing. Each statement
+is reconciled twice, as a dry run and for real, and the queries counted.
+
+    python benchmarks/bench_reconcile.py [--students 10000]
+"""
+import argparse
+import json
+import time
+
+from common import setup_django, test_database
+
+LINES = [1000, 5000, 10000]
+
+
+def statement(bills, count):
+    lines = ['reg_num,month,amount,narration,reference']
+    for i, (reg_num, period, amount) in enumerate(bills[:count]):
+        if i % 10 == 9:
+            lines.append(f',,{amount},UPI/CANTEEN/{i},R{i}')
+        elif i % 2:
+            lines.append(f',,{amount},UPI/SVU MESS/{reg_num} {period:%Y-%m},R{i}')
+        else:
+            lines.append(f'{reg_num},{period:%Y-%m},{amount},,R{i}')
+    return [line + '\n' for line in lines]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+    from mess_api.models import Bill
+    from mess_api.reconciliation import reconcile_statement
+    from mess_api.seeding import seed_hostel
+
+    results = {}
+    with test_database():
+        seed_hostel(args.students, days=3, months=3)
+        bills = list(
+            Bill.objects.filter(is_paid=False).order_by('pk').values_list('student__reg_num', 'period', 'amount')
+        )
+        results['unpaid_bills'] = len(bills)
+        for count in LINES:
+            lines = statement(bills, count)
+            run = {}
+            for dry_run in (True, False):
+                with CaptureQueriesContext(connection) as queries:
+                    # Rolled back, so every statement starts from the same bills.
+                    with transaction.atomic():
+                        start = time.perf_counter()
+                        report = reconcile_statement(lines, dry_run=dry_run)
+                        elapsed = time.perf_counter() - start
+                        transaction.set_rollback(True)
+                run['dry_run' if dry_run else 'apply'] = {
+                    'seconds': round(elapsed, 3),
+                    'queries': len(queries),
+                    'matched': len(report['matched']),
+                    'unmatched': len(report['unmatched']),
+                }
+            results[f'{report["lines"]} lines'] = run
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Run the scripts from the backend directory, e.g.
+
+    python benchmarks/bench_bulk_attendance.py
+
+Every script works against a throwaway test database created from the
+configured DATABASES, so it never touches real data.
+"""
+import contextlib
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mess_system.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Creates a fresh test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(fn, repeat=1):
+    """Calls fn `repeat` times and returns the wall-clock samples in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    """Returns min / p50 / p95 / max of the samples in milliseconds."""
+    ordered = sorted(samples)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 2),
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': round(ordered[p95_index] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def peak_memory(fn):
+    """Calls fn once under tracemalloc and returns the peak traced allocation in MiB."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2 ** 20, 2)
@@ -0,0 +1,31 @@
+"""
+The project's WSGI and ASGI applications with BENCH_DB_LATENCY_MS of extra
+wait before every SQL query, for bench_asgi.py's servers.
+
+The benchmark's SQLite file answers in microseconds; a database across the
+network takes a millisecond or more per round trip, and that wait is what
+ties up a sync worker. The sleep stands in for it.
+"""
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+DELAY = float(os.environ.get('BENCH_DB_LATENCY_MS', '0')) / 1000
+
+
+def _wait(execute, sql, params, many, context):
+    time.sleep(DELAY)
+    return execute(sql, params, many, context)
+
+
+def _add_latency(sender, connection, **kwargs):
+    if _wait not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wait)
+
+
+if DELAY:
+    connection_created.connect(_add_latency)
+
+from mess_system.asgi import application as asgi_application  # noqa: E402
+from mess_system.wsgi import application as wsgi_application  # noqa: E402
@@ -0,0 +1,134 @@
+"""
+End-to-end benchmark suite at hostel scale.
+
+Seeds a throwaway test database with seed_hostel() (N students x D days of
+attendance x M months of bills, fixed seed), then drives the API through
+the Django test client with real JWT logins and reports, per scenario:
+
+* p50 / p95 (and min / max) latency over --repeat runs
+* queries issued by one run
+* peak Python memory of one extra run, traced with tracemalloc (kept out
+  of the timed runs because tracing slows them down)
+
+The output is JSON with the parameters and environment alongside the
+results, so runs can be diffed or compared by a script:
+
+    python benchmarks/run_benchmarks.py --students 2000 --days 90 --months 3 \
+        --output results/$(date +%F).json
+"""
+import argparse
+import datetime
+import json
+import platform
+import time
+from io import StringIO
+
+from common import setup_django, test_database, timed, summarize, peak_memory
+
+LIST_ENDPOINTS = [
+    '/api/profiles/',
+    '/api/attendance/',
+    '/api/bills/',
+    '/api/menu/',
+    '/api/attendance-summaries/',
+    '/api/billing-jobs/',
+]
+
+
+def measure(fn, repeat):
+    """Times fn `repeat` times, then counts the queries and peak memory of one more run."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = timed(fn, repeat)
+    with CaptureQueriesContext(connection) as queries:
+        fn()
+    return dict(summarize(samples), queries=len(queries), peak_mib=peak_memory(fn))
+
+
+def login(client, username, role):
+    from mess_api.seeding import SEED_PASSWORD
+
+    response = client.post(
+        '/api/login/', {'username': username, 'password': SEED_PASSWORD, 'role': role},
+        content_type='application/json',
+    )
+    assert response.status_code == 200, response.content
+    return response.json()['access']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--months', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from mess_api.seeding import SEED_STAFF_USERNAME, seed_hostel, seed_reg_num
+
+    report = {
+        'params': vars(args),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+        },
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'results': {},
+    }
+    results = report['results']
+
+    with test_database():
+        began = time.perf_counter()
+        report['seeded'] = seed_hostel(args.students, args.days, args.months, seed=args.seed)
+        report['seed_seconds'] = round(time.perf_counter() - began, 2)
+
+        anonymous = Client()
+        results['login staff'] = measure(lambda: login(anonymous, SEED_STAFF_USERNAME, 'staff'), args.repeat)
+        staff = Client(headers={'Authorization': f"Bearer {login(anonymous, SEED_STAFF_USERNAME, 'staff')}"})
+        student = Client(headers={'Authorization': f"Bearer {login(anonymous, 'seed_000000', 'student')}"})
+
+        for url in LIST_ENDPOINTS:
+            results[f'GET {url} staff'] = measure(lambda: staff.get(url), args.repeat)
+            results[f'GET {url} student'] = measure(lambda: student.get(url), args.repeat)
+
+        # Roll call for every student on a day after the seeded range.
+        roll_call = {
+            'date': (datetime.date(2025, 1, 1) + datetime.timedelta(days=args.days)).isoformat(),
+            'records': [
+                {'reg_num': seed_reg_num(i), 'is_present': i % 7 != 0, 'meal_type': 'Veg'}
+                for i in range(args.students)
+            ],
+        }
+        results['POST bulk_update'] = measure(
+            lambda: staff.post('/api/attendance/bulk_update/', roll_call, content_type='application/json'),
+            args.repeat,
+        )
+
+        # Enqueue plus one worker pass, i.e. until the bills exist.
+        def generate_bills():
+            staff.post('/api/bills/generate_bills/', {
+                'month': '2025-01', 'daily_rate': 70, 'nv_plate_rate': 30,
+            }, content_type='application/json')
+            call_command('run_billing_worker', once=True, stdout=StringIO())
+
+        results['generate_bills + worker'] = measure(generate_bills, args.repeat)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ from django.conf import settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mess_system.settings')
 django.setup()
 
+from mess_api import billing
 from mess_api.models import Bill, StudentProfile, Attendance
 from datetime import date
 
@@ -24,33 +25,28 @@ for d in range(11, 13): # 2 days NV
 
 # Generate Bill for 2025-01
 month_str = '2025-01'
-daily_rate = 65.0
-nv_plate_rate = 27.0
-room = 150.0
-water = 125.0
-elec = 150.0
-est = 275.0
-
-fixed_total = room + water + elec + est
+period = date(2025, 1, 1)
+rates = billing.parse_rates({
+    'daily_rate': 65,
+    'nv_plate_rate': 27,
+    'room_rent': 150,
+    'water_charges': 125,
+    'electricity_charges': 150,
+    'establishment_charges': 275,
+})
+
 present_days = 12
 nv_days = 2
 
-food_cost = (present_days * daily_rate)
-nv_add_on = (nv_days * nv_plate_rate)
-total = food_cost + nv_add_on + fixed_total
+food_cost = present_days * rates['daily_rate']
+nv_add_on = nv_days * rates['nv_plate_rate']
+fixed_total = billing.fixed_total(rates)
+total = billing.bill_amount(present_days, nv_days, rates)
 
 bill, created = Bill.objects.update_or_create(
     student=student,
-    month=month_str,
-    defaults={
-        'amount': total,
-        'daily_rate': daily_rate,
-        'nv_plate_rate': nv_plate_rate,
-        'room_rent': room,
-        'water_charges': water,
-        'electricity_charges': elec,
-        'establishment_charges': est
-    }
+    period=period,
+    defaults=dict(rates, amount=total)
 )
 
 print(f"Generated Bill for {student.reg_num}: {bill.amount}")
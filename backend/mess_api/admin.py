@@ -1,5 +1,96 @@
+import datetime
+
+from django import forms
 from django.contrib import admin
-from .models import User, StudentProfile, Menu, Attendance, Bill
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .archive import archive_cutoff, validate_not_archived
+from .attendance_bitmap import bitmap_storage
+from .models import User, StudentProfile, Menu, Attendance, ArchivedAttendance, AttendanceMonth, Bill, MonthlyAttendanceSummary, DailyHeadcount, BillingJob
+
+# Changelists count at most this many rows. Past it, an unfiltered list
+# shows the database's row estimate and a filtered one counts only as far
+# as the page after the one shown.
+ADMIN_COUNT_LIMIT = 10_000
+
+# Days of attendance shown inline on a student's page; older days are in
+# the Attendance list.
+ADMIN_INLINE_ATTENDANCE_DAYS = 31
+
+
+def estimated_row_count(model, using):
+    """The database's own estimate of the rows in model's table (no scan), or None without statistics."""
+    table = model._meta.db_table
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        elif connection.vendor == 'sqlite' and 'sqlite_stat1' in connection.introspection.table_names(cursor):
+            # Filled in by ANALYZE; the first number of a stat is the row count.
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for a table that was never analyzed.
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts at most ADMIN_COUNT_LIMIT + 1 rows, or to the end of the page
+    after `page_number` when that is further. An unfiltered list of a
+    bigger table takes the database's estimate instead, so the page costs
+    the same at a million rows as at a thousand.
+
+    Past the limit a filtered count is a lower bound that always includes
+    the next page, so every row stays reachable and the count never scans
+    further than the page's own OFFSET does.
+    """
+    def __init__(self, *args, page_number=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_number = page_number
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ADMIN_COUNT_LIMIT:
+                return estimate
+        limit = max(ADMIN_COUNT_LIMIT, (self.page_number + 1) * self.per_page)
+        return min(queryset[:limit + 1].count(), limit)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow with students x days."""
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) behind "N results (M total)".
+    show_full_result_count = False
+    # No joins in the page query, so it stays an index range with a LIMIT
+    # (joined, SQLite drives from the students and sorts every row). The
+    # page's students and their users are fetched by pk instead, two
+    # queries whatever the page size.
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('student__user')
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page_number = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page_number = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, page_number=page_number)
 
 admin.site.register(User)
 @admin.register(Menu)
@@ -19,30 +110,146 @@ class MenuAdmin(admin.ModelAdmin):
         return obj.dinner[:50] + '...' if len(obj.dinner) > 50 else obj.dinner
     get_dinner.short_description = 'Dinner'
 
-class AttendanceInline(admin.TabularInline):
+class AttendanceForm(forms.ModelForm):
+    def clean_date(self):
+        # Days of archived months live in ArchivedAttendance and are read-only.
+        date = self.cleaned_data['date']
+        validate_not_archived(date, archive_cutoff())
+        return date
+
+class BitmapReadOnlyMixin:
+    """
+    With ATTENDANCE_STORAGE = 'bitmap' new days go to AttendanceMonth; an
+    Attendance row saved here would count the day twice. Rows left from
+    the row layout stay visible until convert_attendance moves them.
+    """
+    def has_add_permission(self, request, *args):
+        return not bitmap_storage() and super().has_add_permission(request, *args)
+
+    def has_change_permission(self, request, obj=None):
+        return not bitmap_storage() and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not bitmap_storage() and super().has_delete_permission(request, obj)
+
+class AttendanceInline(BitmapReadOnlyMixin, admin.TabularInline):
     model = Attendance
+    form = AttendanceForm
     extra = 1
+    ordering = ('-date',)
+    verbose_name_plural = f'Attendance (last {ADMIN_INLINE_ATTENDANCE_DAYS} days)'
+
+    def get_queryset(self, request):
+        # Read through the (student, date) unique index, a month at most.
+        since = timezone.localdate() - datetime.timedelta(days=ADMIN_INLINE_ATTENDANCE_DAYS)
+        return super().get_queryset(request).filter(date__gte=since)
 
 @admin.register(StudentProfile)
 class StudentProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'reg_num', 'branch', 'year')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'reg_num')
     list_filter = ('branch', 'year')
     inlines = [AttendanceInline]
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(BitmapReadOnlyMixin, LargeTableAdmin):
+    form = AttendanceForm
     list_display = ('student', 'date', 'is_present', 'meal_type')
+    # The date filter's ranges (today, past 7 days, this month) lead
+    # attendance_day_idx. No date_hierarchy: its year / month links need a
+    # DISTINCT over every row.
     list_filter = ('date', 'meal_type', 'is_present')
+    # Newest days first, read backwards along the same index; ordering a
+    # date range by id instead would sort every row in it.
+    ordering = ('-date',)
     search_fields = ('student__reg_num', 'student__user__username')
     list_editable = ('is_present', 'meal_type')
-    date_hierarchy = 'date'
+    autocomplete_fields = ('student',)
+
+@admin.register(ArchivedAttendance)
+class ArchivedAttendanceAdmin(LargeTableAdmin):
+    # Closed academic years moved out by archive_attendance; read-only.
+    list_display = ('student', 'date', 'is_present', 'meal_type', 'archived_at')
+    ordering = ('-date',)
+    search_fields = ('student__reg_num', 'student__user__username')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(AttendanceMonth)
+class AttendanceMonthAdmin(LargeTableAdmin):
+    # Bitmap storage; edit days through the attendance API instead.
+    list_display = ('student', 'period', 'get_marked_days', 'get_present_days', 'get_nv_days')
+    list_filter = ('period',)
+    search_fields = ('student__reg_num',)
+
+    def get_marked_days(self, obj):
+        return obj.marked_mask.bit_count()
+    get_marked_days.short_description = 'Marked days'
+
+    def get_present_days(self, obj):
+        return obj.present_mask.bit_count()
+    get_present_days.short_description = 'Present days'
+
+    def get_nv_days(self, obj):
+        return (obj.present_mask & obj.nv_mask).bit_count()
+    get_nv_days.short_description = 'NV days'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(MonthlyAttendanceSummary)
+class MonthlyAttendanceSummaryAdmin(LargeTableAdmin):
+    # Derived from Attendance; fix attendance instead of editing these.
+    list_display = ('student', 'period', 'present_days', 'nv_days')
+    list_filter = ('period',)
+    search_fields = ('student__reg_num',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(DailyHeadcount)
+class DailyHeadcountAdmin(admin.ModelAdmin):
+    # Derived from Attendance; two rows a day, so the defaults are fine.
+    list_display = ('date', 'meal_type', 'plates')
+    list_filter = ('meal_type',)
+    ordering = ('-date', 'meal_type')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 @admin.register(Bill)
-class BillAdmin(admin.ModelAdmin):
-    list_display = ('student', 'month', 'amount', 'is_paid', 'generated_date')
-    list_filter = ('is_paid', 'month', 'generated_date')
-    search_fields = ('student__reg_num', 'student__user__username', 'month')
+class BillAdmin(LargeTableAdmin):
+    list_display = ('student', 'period', 'amount', 'is_paid', 'generated_date')
+    # Both covered by bill_period_paid_idx; generated_date has no index.
+    list_filter = ('is_paid', 'period')
+    autocomplete_fields = ('student',)
+    search_fields = ('student__reg_num', 'student__user__username')
     list_editable = ('is_paid',)
     actions = ['mark_as_paid']
 
@@ -50,3 +257,14 @@ class BillAdmin(admin.ModelAdmin):
         updated = queryset.update(is_paid=True)
         self.message_user(request, f'{updated} bills marked as paid.')
     mark_as_paid.short_description = "Mark selected bills as Paid"
+
+
+@admin.register(BillingJob)
+class BillingJobAdmin(admin.ModelAdmin):
+    # Written by the billing worker; queue new runs from Manage Bills.
+    list_display = ('id', 'period', 'status', 'processed', 'total', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'period')
+    readonly_fields = [field.name for field in BillingJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
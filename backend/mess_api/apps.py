@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MessApiConfig(AppConfig):
     name = 'mess_api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
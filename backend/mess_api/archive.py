@@ -0,0 +1,95 @@
+"""
+Archiving of closed academic years.
+
+archive_attendance() moves Attendance rows older than a cutoff into
+ArchivedAttendance, a batch of rows per transaction, so the hot table (and
+everything that scans it, like the admin's date drill-down) only holds the
+current academic year. Rows keep their ids; the monthly summaries count
+both tables, so no summary or bill changes, and
+`manage.py rebuild_attendance_summaries --verify` still checks every
+summary against the day-level rows it came from. The attendance list and
+export read the AttendanceHistory view over both tables.
+
+Archived months are read-only: every attendance write path checks its
+dates with validate_not_archived() and refuses days before
+archive_cutoff(), which would otherwise sit in both tables and be counted
+twice.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Attendance, ArchivedAttendance, Bill
+from .periods import next_month
+from .signals import attendance_signals_suspended
+
+# Rows moved per transaction.
+ARCHIVE_BATCH_SIZE = 5000
+
+_ARCHIVED_FIELDS = ['id', 'student_id', 'date', 'is_present', 'meal_type']
+
+
+def academic_year_start(day):
+    """First day of the academic year `day` falls in (see ACADEMIC_YEAR_START_MONTH)."""
+    start_month = settings.ACADEMIC_YEAR_START_MONTH
+    year = day.year if day.month >= start_month else day.year - 1
+    return datetime.date(year, start_month, 1)
+
+
+def archive_cutoff():
+    """
+    First day after the archived months, or None when nothing is archived.
+    Archiving moves whole months, so every earlier day is archived.
+    """
+    last = ArchivedAttendance.objects.aggregate(last=Max('date'))['last']
+    return next_month(last.replace(day=1)) if last else None
+
+
+def validate_not_archived(date, cutoff):
+    """
+    Raises ValidationError when `date` is before `cutoff`, the value of
+    archive_cutoff() (read once by callers checking many dates).
+    """
+    if cutoff and date < cutoff:
+        raise ValidationError(
+            f"Attendance before {cutoff} is archived and read-only.", code='archived',
+        )
+
+
+def archive_attendance(before, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """
+    Moves every Attendance row dated before `before` (the first day of a
+    month, so no month is split across the tables) to ArchivedAttendance.
+
+    Refuses, with ValueError, while bills of those months wait to be
+    rebilled: archived days should only back bills that match them.
+    Returns {'archived': rows moved (or to move), 'batches': transactions}.
+    """
+    if before.day != 1:
+        raise ValueError("The archive cutoff must be the first day of a month.")
+    pending = Bill.objects.filter(needs_rebill=True, period__lt=before).count()
+    if pending:
+        raise ValueError(f"{pending} bills before {before} need rebilling first.")
+
+    stale = Attendance.objects.filter(date__lt=before)
+    if dry_run:
+        return {'archived': stale.count(), 'batches': 0}
+
+    archived = batches = 0
+    while True:
+        with transaction.atomic():
+            rows = list(stale.order_by('pk').values(*_ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                break
+            ArchivedAttendance.objects.bulk_create([ArchivedAttendance(**row) for row in rows])
+            # The counts do not change, so skip the per-row summary refresh.
+            with attendance_signals_suspended():
+                deleted, _ = Attendance.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+            if deleted != len(rows):
+                raise RuntimeError("Attendance changed while it was being archived; nothing was moved in this batch.")
+        archived += len(rows)
+        batches += 1
+    return {'archived': archived, 'batches': batches}
@@ -0,0 +1,173 @@
+"""
+Async versions of the read endpoints phones poll at meal times, under
+/api/async/.
+
+DRF views are synchronous, so under ASGI each of their requests runs in a
+worker thread from start to finish. These are plain Django async views:
+authentication (ClaimsJWTAuthentication.aauthenticate) and the queries go
+through the async cache and ORM. Django still runs each such call in a
+thread, but the request only holds one for the call itself. Serializers
+only format rows that are already loaded.
+
+The responses match their sync counterparts except where noted:
+
+* /api/async/menu/        as /api/menu/, including the ETag / 304
+* /api/async/me/          as /api/me/
+* /api/async/attendance/  the student's marks for ?month=YYYY-MM (default
+                          this month), newest first, not paginated
+* /api/async/bills/       the student's bills, newest first, ?month=
+                          optional, not paginated (one bill a month)
+* /api/async/roster/      as /api/attendance/roster/ (staff only), paged by
+                          ?after=<reg_num> instead of a cursor
+* /api/async/headcount/   as /api/attendance/headcount/ (staff only)
+
+Errors use DRF's {"detail": ...} bodies and status codes. Only GET and HEAD
+are accepted. Deploy under an ASGI server to benefit; under WSGI they still
+work, one event loop per request.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+
+from .authentication import ClaimsJWTAuthentication
+from .menu_cache import get_cached_menu
+from .headcounts import format_headcount
+from .models import User, Menu, AttendanceHistory, Bill, DailyHeadcount
+from .pagination import RosterPagination
+from .periods import format_month, next_month
+from .permissions import IsStaffMember
+from .serializers import UserSerializer, MenuSerializer, AttendanceSerializer, BillSerializer, RosterEntrySerializer
+from .views import date_query_param, month_query_param, roster_queryset
+
+authenticator = ClaimsJWTAuthentication()
+
+
+def _error_response(request, exc):
+    # Same body and headers as DRF's exception handler.
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = JsonResponse(data, status=exc.status_code, safe=False)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+
+def async_api_view(permission_classes=(IsAuthenticated,)):
+    """
+    Authenticates the request from its bearer token, checks the DRF
+    permission classes and turns APIExceptions into error responses.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # The query-param helpers in views.py read DRF's query_params.
+            request.query_params = request.GET
+            try:
+                if request.method not in ('GET', 'HEAD'):
+                    raise exceptions.MethodNotAllowed(request.method)
+                # Replaces the session user, which would load synchronously.
+                request.user, request.auth = await authenticator.aauthenticate(request) or (AnonymousUser(), None)
+                for permission_class in permission_classes:
+                    if not permission_class().has_permission(request, None):
+                        if request.auth is None:
+                            raise exceptions.NotAuthenticated()
+                        raise exceptions.PermissionDenied()
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error_response(request, exc)
+        return wrapper
+    return decorator
+
+
+def _student_profile_id(request):
+    student = request.user.student_profile_id
+    if student is None:
+        raise exceptions.NotFound('Student profile not found.')
+    return student
+
+
+def _page_size(request):
+    # ?page_size= as the cursor paginators read it.
+    value = request.GET.get('page_size', '')
+    if value.isdigit() and int(value) > 0:
+        return min(int(value), RosterPagination.max_page_size)
+    return api_settings.PAGE_SIZE
+
+
+@async_api_view(permission_classes=())
+async def menu(request):
+    # Django's cache backends have no native async I/O (their a* methods run
+    # the sync ones in a thread), so the whole lookup takes one thread hop
+    # instead of one per cache call.
+    entry = await sync_to_async(get_cached_menu)(
+        lambda: MenuSerializer(Menu.objects.all(), many=True).data
+    )
+    not_modified = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    response = not_modified or JsonResponse(entry['data'], safe=False)
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@async_api_view()
+async def me(request):
+    # request.user may be built from token claims; email is not among them.
+    user = await User.objects.aget(pk=request.user.pk)
+    return JsonResponse(UserSerializer(user).data)
+
+
+@async_api_view()
+async def attendance(request):
+    student = _student_profile_id(request)
+    month = month_query_param(request) or timezone.localdate().replace(day=1)
+    queryset = AttendanceSerializer.setup_eager_loading(
+        AttendanceHistory.objects
+        .filter(student_id=student, date__gte=month, date__lt=next_month(month))
+        .order_by('-date', '-id')
+    )
+    rows = [row async for row in queryset]
+    return JsonResponse({'month': format_month(month), 'results': AttendanceSerializer(rows, many=True).data})
+
+
+@async_api_view()
+async def bills(request):
+    queryset = Bill.objects.filter(student_id=_student_profile_id(request))
+    period = month_query_param(request)
+    if period:
+        queryset = queryset.filter(period=period)
+    queryset = BillSerializer.setup_eager_loading(queryset.order_by('-period', '-id'))
+    rows = [bill async for bill in queryset]
+    return JsonResponse({'results': BillSerializer(rows, many=True).data})
+
+
+@async_api_view(permission_classes=(IsStaffMember,))
+async def roster(request):
+    page_size = _page_size(request)
+    queryset = roster_queryset(request).order_by('reg_num')
+    after = request.GET.get('after')
+    if after:
+        queryset = queryset.filter(reg_num__gt=after)
+
+    rows = [row async for row in queryset[:page_size + 1]]
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        query = request.GET.copy()
+        query['after'] = rows[-1]['reg_num']
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return JsonResponse({'next': next_url, 'results': RosterEntrySerializer(rows, many=True).data})
+
+
+@async_api_view(permission_classes=(IsStaffMember,))
+async def headcount(request):
+    day = date_query_param(request, 'date') or timezone.localdate()
+    rows = [row async for row in DailyHeadcount.objects.filter(date=day).values_list('meal_type', 'plates')]
+    return JsonResponse(format_headcount(day, rows))
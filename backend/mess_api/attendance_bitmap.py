@@ -0,0 +1,318 @@
+"""
+Bitmap-packed attendance (ATTENDANCE_STORAGE = 'bitmap').
+
+Instead of one Attendance row per student per day, each (student, month)
+is one AttendanceMonth row holding three 31-bit masks, bit d - 1 for day d:
+marked_mask (the day has a mark at all), present_mask and nv_mask. A month
+of a 1,000-student hostel is then 1,000 rows instead of 31,000, and its
+counts are popcounts: present days = present_mask.bit_count(), non-veg
+days = (present_mask & nv_mask).bit_count().
+
+The functions here keep the row layout's semantics:
+
+* write_days()    upsert keyed on (student, date), last write wins, as
+                  attendance_ingest.upsert_attendance (which calls it in
+                  bitmap mode)
+* clear_days()    deletes days, as deleting Attendance rows
+* unpack()        the marked days of a month as (date, is_present,
+                  meal_type); the AttendanceHistory view does the same in
+                  SQL, so the list and export read both layouts alike
+* roster_marks()  is_present / meal_type of one day for the roster query
+* monthly_counts  {(student_id, period): (present_days, nv_days)} by popcount
+
+Writes set and clear bits in SQL (UPDATE ... SET mask = mask | bit), one
+UPDATE per (month, day, mark) and batch of students, so concurrent roll
+calls for different days of a month never overwrite each other. A day's
+roll call locks its students' profiles, reads the month rows it changes,
+then runs one INSERT of the missing month rows and at most four UPDATEs.
+The student lock also covers months that do not exist yet, so two writers
+creating the same day take turns and count its plate once.
+
+pack_attendance() and unpack_attendance() move the hot table between the
+two layouts (manage.py convert_attendance). Archived years stay as rows.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When, BooleanField, CharField
+from django.db.models.lookups import GreaterThan
+
+from .batching import chunks
+from .headcounts import update_daily_headcounts
+from .models import Attendance, AttendanceMonth
+from .signals import attendance_signals_suspended
+from .summaries import lock_students, refresh_monthly_summaries
+
+# Students per UPDATE, and rows (or months) moved per transaction when
+# converting between the layouts.
+BITMAP_BATCH_SIZE = 1000
+
+# History ids of bitmap days are -(AttendanceMonth.id * 32 + day), so they
+# never collide with Attendance ids.
+_HISTORY_ID_DAYS = 32
+
+
+def bitmap_storage():
+    """True when new attendance is written as AttendanceMonth bitmaps."""
+    return settings.ATTENDANCE_STORAGE == 'bitmap'
+
+
+def day_bit(date):
+    return 1 << (date.day - 1)
+
+
+def history_id(month_id, day):
+    """The AttendanceHistory id of day `day` of AttendanceMonth `month_id`."""
+    return -(month_id * _HISTORY_ID_DAYS + day)
+
+
+def counts(present_mask, nv_mask):
+    """(present_days, nv_days) of a month, as the summaries count them."""
+    return present_mask.bit_count(), (present_mask & nv_mask).bit_count()
+
+
+def unpack(period, marked_mask, present_mask, nv_mask):
+    """Yields (date, is_present, meal_type) for every marked day, in date order."""
+    while marked_mask:
+        bit = marked_mask & -marked_mask
+        marked_mask ^= bit
+        yield (
+            period.replace(day=bit.bit_length()),
+            bool(present_mask & bit),
+            'Non-Veg' if nv_mask & bit else 'Veg',
+        )
+
+
+def _set_bit(field, bit, value):
+    # (mask | bit) - bit clears the bit without a bitwise NOT, which the
+    # backends spell differently.
+    expression = F(field).bitor(bit)
+    return expression if value else expression - bit
+
+
+def _stored_masks(months, batch_size):
+    """
+    {(student_id, period): (marked_mask, present_mask, nv_mask)} of the
+    (student_id, period) months that exist, read once their students are
+    locked for the caller's writes.
+    """
+    lock_students(student_id for student_id, _ in months)
+    masks = {}
+    for chunk in chunks(sorted(months), batch_size):
+        masks.update(
+            ((student_id, period), tuple(month_masks))
+            for student_id, period, *month_masks in AttendanceMonth.objects.select_for_update().filter(
+                period__in={period for _, period in chunk},
+                student_id__in={student_id for student_id, _ in chunk},
+            ).values_list('student_id', 'period', 'marked_mask', 'present_mask', 'nv_mask')
+        )
+    return masks
+
+
+def _day_mark(masks, date):
+    """(is_present, meal_type) of `date` in a month's masks, or None when it has no mark."""
+    bit = day_bit(date)
+    if masks is None or not masks[0] & bit:
+        return None
+    return bool(masks[1] & bit), 'Non-Veg' if masks[2] & bit else 'Veg'
+
+
+def write_days(rows, batch_size=BITMAP_BATCH_SIZE, refresh_summaries=True, count_plates=True):
+    """
+    Inserts or updates attendance days keyed on (student, date).
+
+    `rows` is an iterable of (student_id, date, is_present, meal_type), as
+    for upsert_attendance(); the last row for a key wins. count_plates=False
+    leaves the daily headcounts alone, for callers moving days that are
+    already counted. Returns the number of days written.
+    """
+    latest = {}
+    for student_id, date, is_present, meal_type in rows:
+        latest[(student_id, date)] = (is_present, meal_type)
+    if not latest:
+        return 0
+
+    # (period, bit, is_present, non_veg) -> students given that mark
+    marks = defaultdict(list)
+    for (student_id, date), (is_present, meal_type) in latest.items():
+        marks[(date.replace(day=1), day_bit(date), bool(is_present), meal_type == 'Non-Veg')].append(student_id)
+    months = {(student_id, date.replace(day=1)) for student_id, date in latest}
+
+    with transaction.atomic(savepoint=False):
+        # Usually only the first roll call of a month creates rows, so look
+        # before building an INSERT for every month. The masks read here
+        # hold the marks being overwritten, for the headcounts.
+        stored = _stored_masks(months, batch_size)
+        months.difference_update(stored)
+        AttendanceMonth.objects.bulk_create(
+            [AttendanceMonth(student_id=student_id, period=period) for student_id, period in months],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        for (period, bit, is_present, non_veg), student_ids in marks.items():
+            for chunk in chunks(student_ids, batch_size):
+                AttendanceMonth.objects.filter(period=period, student_id__in=chunk).update(
+                    marked_mask=F('marked_mask').bitor(bit),
+                    present_mask=_set_bit('present_mask', bit, is_present),
+                    nv_mask=_set_bit('nv_mask', bit, non_veg),
+                )
+        if count_plates:
+            update_daily_headcounts(
+                (date, _day_mark(stored.get((student_id, date.replace(day=1))), date), mark)
+                for (student_id, date), mark in latest.items()
+            )
+        if refresh_summaries:
+            refresh_monthly_summaries(latest.keys())
+    return len(latest)
+
+
+def clear_days(keys, batch_size=BITMAP_BATCH_SIZE):
+    """
+    Unmarks the (student_id, date) days in `keys` and drops months left
+    without a marked day. Returns the number of months changed.
+    """
+    keys = set(keys)
+    days = defaultdict(list)
+    for student_id, date in keys:
+        days[(date.replace(day=1), day_bit(date))].append(student_id)
+
+    changed = 0
+    with transaction.atomic(savepoint=False):
+        stored = _stored_masks({(student_id, date.replace(day=1)) for student_id, date in keys}, batch_size)
+        for (period, bit), student_ids in days.items():
+            for chunk in chunks(student_ids, batch_size):
+                changed += AttendanceMonth.objects.filter(
+                    period=period, student_id__in=chunk, marked_mask=F('marked_mask').bitor(bit),
+                ).update(
+                    marked_mask=_set_bit('marked_mask', bit, False),
+                    present_mask=_set_bit('present_mask', bit, False),
+                    nv_mask=_set_bit('nv_mask', bit, False),
+                )
+        AttendanceMonth.objects.filter(
+            marked_mask=0,
+            period__in={period for period, _ in days},
+            student_id__in={student_id for student_id, _ in keys},
+        ).delete()
+        update_daily_headcounts(
+            (date, _day_mark(stored.get((student_id, date.replace(day=1))), date), None)
+            for student_id, date in keys
+        )
+        refresh_monthly_summaries(keys)
+    return changed
+
+
+def marked_day(student_id, date):
+    """(is_present, meal_type) of one stored day, or None when it has no mark."""
+    masks = AttendanceMonth.objects.filter(student_id=student_id, period=date.replace(day=1)).values_list(
+        'marked_mask', 'present_mask', 'nv_mask',
+    ).first()
+    return _day_mark(masks, date)
+
+
+def roster_marks(relation, date):
+    """
+    is_present and meal_type expressions for day `date` of the month row
+    joined as `relation` (a FilteredRelation on the month); both are NULL
+    when the day has no mark, like a missing Attendance row.
+    """
+    bit = day_bit(date)
+
+    def has_bit(field):
+        return GreaterThan(F(f'{relation}__{field}').bitand(bit), 0)
+
+    return {
+        'is_present': Case(
+            When(has_bit('marked_mask') & has_bit('present_mask'), then=Value(True)),
+            When(has_bit('marked_mask'), then=Value(False)),
+            default=None,
+            output_field=BooleanField(),
+        ),
+        'meal_type': Case(
+            When(has_bit('marked_mask') & has_bit('nv_mask'), then=Value('Non-Veg')),
+            When(has_bit('marked_mask'), then=Value('Veg')),
+            default=None,
+            output_field=CharField(),
+        ),
+    }
+
+
+def monthly_counts(first_period, last_period, student_ids=None):
+    """
+    {(student_id, period): (present_days, nv_days)} straight from the
+    bitmaps, for months with a present day; the same numbers the summary
+    table holds for them.
+    """
+    queryset = AttendanceMonth.objects.filter(period__gte=first_period, period__lte=last_period).exclude(present_mask=0)
+    if student_ids is not None:
+        queryset = queryset.filter(student_id__in=student_ids)
+    return {
+        (student_id, period): counts(present_mask, nv_mask)
+        for student_id, period, present_mask, nv_mask in queryset
+        .values_list('student_id', 'period', 'present_mask', 'nv_mask').iterator(chunk_size=BITMAP_BATCH_SIZE)
+    }
+
+
+def pack_attendance(batch_size=BITMAP_BATCH_SIZE, dry_run=False):
+    """
+    Moves every Attendance row into AttendanceMonth bitmaps, batch_size
+    rows per transaction. Counts do not change, so no summary or bill is
+    touched. Returns {'days': days moved (or to move), 'batches': transactions}.
+    """
+    if dry_run:
+        return {'days': Attendance.objects.count(), 'batches': 0}
+
+    moved = batches = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Attendance.objects.select_for_update().order_by('pk')
+                .values_list('pk', 'student_id', 'date', 'is_present', 'meal_type')[:batch_size]
+            )
+            if not rows:
+                break
+            write_days([row[1:] for row in rows], batch_size, refresh_summaries=False, count_plates=False)
+            with attendance_signals_suspended():
+                deleted, _ = Attendance.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            if deleted != len(rows):
+                raise RuntimeError("Attendance changed while it was being packed; nothing was moved in this batch.")
+        moved += len(rows)
+        batches += 1
+    return {'days': moved, 'batches': batches}
+
+
+def unpack_attendance(batch_size=BITMAP_BATCH_SIZE, dry_run=False):
+    """
+    Moves every AttendanceMonth back to Attendance rows, batch_size months
+    per transaction. Returns {'days': days moved (or to move), 'batches': transactions}.
+    """
+    if dry_run:
+        days = sum(mask.bit_count() for mask in AttendanceMonth.objects.values_list('marked_mask', flat=True).iterator())
+        return {'days': days, 'batches': 0}
+
+    moved = batches = 0
+    while True:
+        with transaction.atomic():
+            months = list(
+                AttendanceMonth.objects.select_for_update().order_by('pk')
+                .values_list('pk', 'student_id', 'period', 'marked_mask', 'present_mask', 'nv_mask')[:batch_size]
+            )
+            if not months:
+                break
+            rows = [
+                Attendance(student_id=student_id, date=date, is_present=is_present, meal_type=meal_type)
+                for _, student_id, period, *masks in months
+                for date, is_present, meal_type in unpack(period, *masks)
+            ]
+            Attendance.objects.bulk_create(
+                rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['student', 'date'],
+                update_fields=['is_present', 'meal_type'],
+            )
+            with attendance_signals_suspended():
+                AttendanceMonth.objects.filter(pk__in=[month[0] for month in months]).delete()
+        moved += len(rows)
+        batches += 1
+    return {'days': moved, 'batches': batches}
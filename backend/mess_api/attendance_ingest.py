@@ -0,0 +1,237 @@
+"""
+Batched attendance writes.
+
+Roll calls arrive as lists of reg_nums. Rather than looking each student up
+and calling update_or_create per row, the whole batch is resolved with one
+IN lookup and written with INSERT ... ON CONFLICT (student, date) DO UPDATE.
+
+CSV registers go through the same upsert: the file is read line by line
+and flushed every ATTENDANCE_BATCH_SIZE valid rows, so memory depends on
+the batch size rather than the file size.
+"""
+import csv
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .archive import archive_cutoff, validate_not_archived
+from .attendance_bitmap import bitmap_storage, write_days
+from .batching import chunks
+from .headcounts import update_daily_headcounts
+from .models import StudentProfile, Attendance
+from .summaries import lock_students, refresh_monthly_summaries
+
+# Rows per INSERT ... ON CONFLICT statement.
+ATTENDANCE_BATCH_SIZE = 1000
+
+MEAL_TYPES = {choice for choice, _ in Attendance.MEAL_TYPES}
+
+# At most this many line errors are kept in an import report; the rest are
+# only counted.
+MAX_IMPORT_ERRORS = 1000
+
+CSV_COLUMNS = ('reg_num', 'date', 'is_present', 'meal_type')
+
+# Spreadsheet spellings accepted in the is_present column, on top of what
+# BooleanField accepts.
+CSV_BOOLEANS = {
+    'true': True, 'yes': True, 'y': True, 'present': True, 'p': True,
+    'false': False, 'no': False, 'n': False, 'absent': False, 'a': False,
+}
+
+_is_present_field = Attendance._meta.get_field('is_present')
+
+
+def resolve_reg_nums(reg_nums):
+    """Returns {reg_num: student_id} for the reg_nums that exist, in one query."""
+    return dict(
+        StudentProfile.objects.filter(reg_num__in=set(reg_nums)).values_list('reg_num', 'pk')
+    )
+
+
+def upsert_attendance(rows, batch_size=ATTENDANCE_BATCH_SIZE, refresh_summaries=True):
+    """
+    Inserts or updates attendance rows keyed on (student, date).
+
+    `rows` is an iterable of (student_id, date, is_present, meal_type).
+    When the same key appears more than once the last row wins, since a
+    single ON CONFLICT statement may not touch a row twice.
+    Callers writing several batches pass refresh_summaries=False and call
+    refresh_monthly_summaries once at the end instead; the daily
+    headcounts move with every batch.
+    With ATTENDANCE_STORAGE = 'bitmap' the rows are packed into
+    AttendanceMonth instead (attendance_bitmap.write_days).
+    Raises ValidationError, writing nothing, when a row falls in an
+    archived month. Returns the number of rows written.
+    """
+    latest = {}
+    for student_id, date, is_present, meal_type in rows:
+        latest[(student_id, date)] = (is_present, meal_type)
+    if latest:
+        validate_not_archived(min(date for _, date in latest), archive_cutoff())
+
+    if bitmap_storage():
+        return write_days(
+            [(student_id, date, *mark) for (student_id, date), mark in latest.items()], batch_size, refresh_summaries,
+        )
+
+    objs = [
+        Attendance(student_id=student_id, date=date, is_present=is_present, meal_type=meal_type)
+        for (student_id, date), (is_present, meal_type) in latest.items()
+    ]
+    with transaction.atomic(savepoint=False):
+        before = _stored_marks(latest.keys(), batch_size)
+        Attendance.objects.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['is_present', 'meal_type'],
+        )
+        # bulk_create sends no signals, so sync the derived tables here.
+        update_daily_headcounts(
+            (date, before.get((student_id, date)), mark) for (student_id, date), mark in latest.items()
+        )
+        if refresh_summaries:
+            refresh_monthly_summaries(latest.keys())
+    return len(objs)
+
+
+def _stored_marks(keys, batch_size):
+    """
+    {(student_id, date): (is_present, meal_type)} of the keys that already
+    have a row. Read once the students are locked: a row lock alone would
+    not cover a key another transaction is inserting, and both writers
+    would count its plate.
+    """
+    keys = set(keys)
+    lock_students(student_id for student_id, _ in keys)
+    marks = {}
+    for chunk in chunks(sorted(keys), batch_size):
+        rows = Attendance.objects.select_for_update().filter(
+            date__in={date for _, date in chunk},
+            student_id__in={student_id for student_id, _ in chunk},
+        ).values_list('student_id', 'date', 'is_present', 'meal_type')
+        marks.update(((student_id, date), (is_present, meal_type))
+                     for student_id, date, is_present, meal_type in rows if (student_id, date) in keys)
+    return marks
+
+
+def bulk_mark_attendance(date, records):
+    """
+    Applies one day's roll call.
+
+    `records` is the bulk_update payload: dicts with reg_num, is_present and
+    meal_type. Unknown reg_nums and invalid meal types are reported per
+    record and skipped; everything else is written in one transaction.
+    Raises ValidationError for a date in an archived month.
+    Returns (written_count, errors).
+    """
+    with transaction.atomic():
+        student_ids = resolve_reg_nums(
+            record.get('reg_num') for record in records if isinstance(record.get('reg_num'), str)
+        )
+        rows, errors = _validate_records(records, student_ids, date)
+        return upsert_attendance(rows), errors
+
+
+def _validate_records(records, student_ids, date):
+    rows = []
+    errors = []
+    for record in records:
+        row, error = _validate_record(record, student_ids, date)
+        if error:
+            errors.append(error)
+        else:
+            rows.append(row)
+    return rows, errors
+
+
+def _validate_record(record, student_ids, date):
+    """Returns (row, None) for a valid record, (None, message) otherwise."""
+    reg_num = record.get('reg_num')
+    # Default to Present=True if not specified, though usually admin specifies
+    is_present = record.get('is_present', True)
+    meal_type = record.get('meal_type', 'Veg')
+
+    if not isinstance(reg_num, str) or reg_num not in student_ids:
+        return None, f"Student with reg_num {reg_num} not found"
+    if meal_type not in MEAL_TYPES:
+        return None, f"Error for {reg_num}: invalid meal_type {meal_type!r}"
+    try:
+        is_present = _is_present_field.to_python(is_present)
+    except ValidationError:
+        return None, f"Error for {reg_num}: invalid is_present {is_present!r}"
+    return (student_ids[reg_num], date, is_present, meal_type), None
+
+
+def import_attendance_csv(lines, batch_size=ATTENDANCE_BATCH_SIZE):
+    """
+    Imports a CSV register with the columns reg_num, date (YYYY-MM-DD) and
+    optionally is_present (default true) and meal_type (default Veg).
+
+    `lines` is any iterable of text lines, e.g. an open file. Bad lines are
+    skipped and reported with their line number; the rest are written in
+    one transaction, batch_size rows per statement. Returns a report dict:
+    rows, written, error_count and errors (at most MAX_IMPORT_ERRORS).
+    """
+    reader = csv.DictReader(lines)
+    missing = {'reg_num', 'date'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV header must include {', '.join(sorted(missing))}")
+
+    report = {'rows': 0, 'written': 0, 'error_count': 0, 'errors': []}
+
+    def add_error(message):
+        report['error_count'] += 1
+        if len(report['errors']) < MAX_IMPORT_ERRORS:
+            report['errors'].append(f"Line {reader.line_num}: {message}")
+
+    with transaction.atomic():
+        # Every reg_num in the hostel, so each line is checked without a query.
+        student_ids = dict(StudentProfile.objects.values_list('reg_num', 'pk'))
+        cutoff = archive_cutoff()
+        batch = []
+        # (student_id, month) pairs to recount once the rows are in; bounded
+        # by students x months, not by the file size.
+        touched = set()
+        for record in reader:
+            report['rows'] += 1
+            record = {key: (value or '').strip() for key, value in record.items() if key in CSV_COLUMNS}
+            date = _parse_csv_date(record['date'])
+            if date is None:
+                add_error(f"Error for {record['reg_num']}: invalid date {record['date']!r}")
+                continue
+            if record.get('is_present'):
+                record['is_present'] = CSV_BOOLEANS.get(record['is_present'].lower(), record['is_present'])
+            else:
+                record.pop('is_present', None)
+            if not record.get('meal_type'):
+                record.pop('meal_type', None)
+
+            row, error = _validate_record(record, student_ids, date)
+            if error:
+                add_error(error)
+                continue
+            try:
+                validate_not_archived(date, cutoff)
+            except ValidationError as exc:
+                add_error(f"Error for {record['reg_num']}: {exc.messages[0]}")
+                continue
+            batch.append(row)
+            touched.add((row[0], date.replace(day=1)))
+            if len(batch) >= batch_size:
+                report['written'] += upsert_attendance(batch, batch_size, refresh_summaries=False)
+                batch = []
+        if batch:
+            report['written'] += upsert_attendance(batch, batch_size, refresh_summaries=False)
+        refresh_monthly_summaries(touched)
+    return report
+
+
+def _parse_csv_date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
@@ -0,0 +1,149 @@
+"""
+JWT authentication without a users-table query on every request.
+
+Tokens issued by the login endpoint carry the account's role claims
+(is_student, is_staff_member and student_profile_id, see role_claims()),
+and ClaimsJWTAuthentication builds a ClaimsUser from the token instead of
+loading the User row. Views read the same attributes from a ClaimsUser as
+from a real User (e.g. under force_authenticate or the admin's session),
+so they work with either.
+
+A token cannot know that its account was deactivated, changed role or
+got a student profile after login. Each request therefore also reads the
+account's current state from the cache (AUTH_STATE_CACHE_SECONDS), which
+is dropped whenever the user or their profile is saved or deleted. A
+cache hit costs no query; where the state and the claims disagree, the
+state wins.
+
+Tokens issued before the claims existed fall back to the regular
+database lookup.
+
+aauthenticate() does the same for the async views (mess_api.async_views)
+with the async cache and ORM.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+ROLE_CLAIMS = ('is_student', 'is_staff_member', 'student_profile_id')
+
+AUTH_STATE_CACHE_SECONDS = 60
+
+AUTH_STATE_KEY = 'mess_api:auth-state:{}'
+
+
+def role_claims(user):
+    return {
+        'is_student': user.is_student,
+        'is_staff_member': user.is_staff_member,
+        'student_profile_id': user.student_profile_id,
+    }
+
+
+def invalidate_auth_state(user_id):
+    cache.delete(AUTH_STATE_KEY.format(user_id))
+
+
+def _auth_state_query(user_id):
+    return (
+        User.objects.filter(pk=user_id)
+        .values_list('is_active', 'is_student', 'is_staff_member', 'studentprofile__pk')
+    )
+
+
+def get_auth_state(user_id):
+    """
+    (is_active, is_student, is_staff_member, student_profile_id) of the
+    account, from the cache or one query. None if the user does not exist.
+    """
+    key = AUTH_STATE_KEY.format(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = _auth_state_query(user_id).first()
+        if row is None:
+            return None
+        state = list(row)
+        cache.set(key, state, AUTH_STATE_CACHE_SECONDS)
+    return state
+
+
+async def aget_auth_state(user_id):
+    key = AUTH_STATE_KEY.format(user_id)
+    state = await cache.aget(key)
+    if state is None:
+        row = await _auth_state_query(user_id).afirst()
+        if row is None:
+            return None
+        state = list(row)
+        await cache.aset(key, state, AUTH_STATE_CACHE_SECONDS)
+    return state
+
+
+class ClaimsUser(TokenUser):
+    """A request user backed by the token's claims and the cached account state."""
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.is_active, self.is_student, self.is_staff_member, self.student_profile_id = state
+
+    @cached_property
+    def id(self):
+        # The user id claim is a string.
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+
+def _has_role_claims(validated_token):
+    return all(claim in validated_token for claim in ROLE_CLAIMS)
+
+
+def _token_user_id(validated_token):
+    try:
+        return int(validated_token[api_settings.USER_ID_CLAIM])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+
+
+def _claims_user(validated_token, state):
+    if state is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not state[0]:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return ClaimsUser(validated_token, state)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if not _has_role_claims(validated_token):
+            return super().get_user(validated_token)
+        return _claims_user(validated_token, get_auth_state(_token_user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """authenticate() for a plain Django request in an async view."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Checking the signature and expiry needs no I/O.
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if not _has_role_claims(validated_token):
+            return await sync_to_async(self._get_user_with_profile)(validated_token)
+        return _claims_user(validated_token, await aget_auth_state(_token_user_id(validated_token)))
+
+    def _get_user_with_profile(self, validated_token):
+        user = super().get_user(validated_token)
+        # Caches the profile (or its absence) so student_profile_id does not
+        # query lazily from the async view.
+        getattr(user, 'studentprofile', None)
+        return user
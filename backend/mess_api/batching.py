@@ -0,0 +1,13 @@
+"""
+Splitting work into fixed-size batches.
+
+The bulk writers (attendance ingest and bitmaps, billing, reconciliation,
+seeding) bound every IN (...) list and multi-row INSERT by a batch size,
+so one statement never grows with the hostel.
+"""
+
+
+def chunks(items, size):
+    """Consecutive slices of the sequence `items`, each at most `size` long."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
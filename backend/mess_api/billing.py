@@ -0,0 +1,125 @@
+"""
+The mess bill formula, in exact decimal arithmetic.
+
+    amount = present_days * daily_rate + nv_days * nv_plate_rate
+             + room_rent + water_charges + electricity_charges
+             + establishment_charges
+
+Rounding rules:
+
+* Every rate is converted to Decimal through its string form (so 65.1
+  stays 65.1, not 65.09999...) and rounded to paise, half up, on input.
+* Day counts are whole numbers, so the amount is then exact; it is
+  quantized to paise (half up) once at the end so every amount carries
+  two decimal places.
+
+Nothing here touches the database: the bill generator, the API and the
+maintenance scripts all call into this module, and it can be tested or
+benchmarked on its own.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+PAISE = Decimal('0.01')
+
+RATE_FIELDS = [
+    'daily_rate',
+    'nv_plate_rate',
+    'room_rent',
+    'water_charges',
+    'electricity_charges',
+    'establishment_charges',
+]
+
+FIXED_CHARGE_FIELDS = RATE_FIELDS[2:]
+
+# Digits each rate may have, two of them paise: the max_digits of its Bill
+# column, so every accepted rate can be stored on the bill it prices.
+RATE_MAX_DIGITS = {
+    'daily_rate': 6,
+    'nv_plate_rate': 6,
+    'room_rent': 8,
+    'water_charges': 8,
+    'electricity_charges': 8,
+    'establishment_charges': 8,
+}
+
+# Used when a bill run does not name its fixed charges.
+DEFAULT_FIXED_CHARGES = {
+    'room_rent': 150,
+    'water_charges': 125,
+    'electricity_charges': 150,
+    'establishment_charges': 275,
+}
+
+
+def to_money(value, max_digits=None):
+    """
+    Converts a number or numeric string to Decimal paise, of at most
+    `max_digits` digits in all when given. Raises ValueError.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{value!r} is not a number.")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"{value!r} is not a valid amount.")
+    try:
+        # Past the context's 28 digits (e.g. 1e30) there is no paise value
+        amount = amount.quantize(PAISE, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"{value!r} is too large.")
+    if max_digits is not None and amount.adjusted() >= max_digits - 2:
+        raise ValueError(f"{value!r} is too large (at most {Decimal(10) ** (max_digits - 2) - PAISE}).")
+    return amount
+
+
+def parse_rates(values):
+    """
+    Reads the RATE_FIELDS from a mapping (request data, a job's stored
+    rates) into Decimals, filling in DEFAULT_FIXED_CHARGES. daily_rate and
+    nv_plate_rate are required, and every rate must fit its Bill column
+    (RATE_MAX_DIGITS). Raises ValueError.
+    """
+    rates = {}
+    for name in RATE_FIELDS:
+        value = values.get(name, DEFAULT_FIXED_CHARGES.get(name))
+        if value is None or value == '':
+            raise ValueError(f"{name} is required.")
+        try:
+            rates[name] = to_money(value, RATE_MAX_DIGITS[name])
+        except ValueError as exc:
+            raise ValueError(f"{name}: {exc}")
+    return rates
+
+
+def fixed_total(rates):
+    return sum((rates[name] for name in FIXED_CHARGE_FIELDS), Decimal(0))
+
+
+def bill_amount(present_days, nv_days, rates):
+    """The amount of one bill. `rates` as returned by parse_rates()."""
+    amount = present_days * rates['daily_rate'] + nv_days * rates['nv_plate_rate'] + fixed_total(rates)
+    return amount.quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def bill_amounts(present_days, nv_days, rates):
+    """
+    The amounts of a batch of bills, one per (present_days[i], nv_days[i])
+    pair; `rates` as returned by parse_rates().
+
+    A month has at most 31 days, so a whole hostel shares a few hundred
+    distinct count pairs at most. Each pair is evaluated once and reused,
+    which keeps a batch of 100k students to a dictionary lookup apiece.
+    """
+    daily_rate = rates['daily_rate']
+    nv_rate = rates['nv_plate_rate']
+    fixed = fixed_total(rates)
+    seen = {}
+    amounts = []
+    for pair in zip(present_days, nv_days):
+        amount = seen.get(pair)
+        if amount is None:
+            amount = (pair[0] * daily_rate + pair[1] * nv_rate + fixed).quantize(PAISE, rounding=ROUND_HALF_UP)
+            seen[pair] = amount
+        amounts.append(amount)
+    return amounts
@@ -0,0 +1,155 @@
+"""
+Set-based bill generation.
+
+Instead of counting attendance student by student, the engine reads the
+present / non-veg day counts for the whole hostel from the monthly summary
+table (one row per student and month) and writes the bills back in chunked
+bulk statements, so the number of round trips does not depend on how many
+students there are. A run may cover a range of months (e.g. after a
+semester break): the counts of the whole range come from one query and
+all the bills go through the same upsert.
+
+rebill_flagged_bills() is the incremental counterpart: it recomputes only
+the bills whose attendance changed after they were generated.
+"""
+from django.db import transaction
+
+from .batching import chunks
+from .billing import RATE_FIELDS, bill_amount, bill_amounts, parse_rates
+from .models import StudentProfile, Bill
+from .periods import format_month, month_range
+from .summaries import monthly_counts, monthly_counts_of
+
+# Rows written per INSERT ... ON CONFLICT statement.
+BILL_CHUNK_SIZE = 1000
+
+# Longest month range one run may bill.
+MAX_BILLING_MONTHS = 12
+
+BILL_RATE_FIELDS = RATE_FIELDS
+
+
+def rate_card(rates, rate_cards, period):
+    """The rates for one month: `rates` overlaid with rate_cards["YYYY-MM"], if any."""
+    overrides = (rate_cards or {}).get(format_month(period))
+    return dict(rates, **overrides) if overrides else rates
+
+
+def build_bills(period, rates, student_ids=None, end_period=None, rate_cards=None):
+    """
+    Computes, without saving, the bill of every student (or just
+    `student_ids`) for one billing period (the first day of the month), or
+    for every month from `period` to `end_period`.
+
+    `rates` holds the BILL_RATE_FIELDS values (numbers or numeric
+    strings); `rate_cards` may override some of them for individual months,
+    keyed "YYYY-MM". Amounts are computed by mess_api.billing. Raises
+    ValueError for invalid rates.
+
+    Returns (bills, existing), the latter being the (student_id, period)
+    pairs that already have a bill.
+    """
+    end_period = end_period or period
+    students = StudentProfile.objects.order_by('pk')
+    if student_ids is not None:
+        students = students.filter(pk__in=student_ids)
+    student_ids = list(students.values_list('pk', flat=True))
+    counts = monthly_counts(period, end_period)
+    # Only needed to report created vs updated; the upsert itself is keyed
+    # on the (student, period) unique constraint.
+    existing = set(
+        Bill.objects.filter(period__gte=period, period__lte=end_period).values_list('student_id', 'period')
+    )
+
+    bills = []
+    for month in month_range(period, end_period):
+        month_rates = parse_rates(rate_card(rates, rate_cards, month))
+        pairs = [counts.get((student_id, month), (0, 0)) for student_id in student_ids]
+        amounts = bill_amounts([present for present, _ in pairs], [nv for _, nv in pairs], month_rates)
+        bills.extend(
+            Bill(student_id=student_id, period=month, amount=amount, **month_rates)
+            for student_id, amount in zip(student_ids, amounts)
+        )
+    return bills, existing.intersection((bill.student_id, bill.period) for bill in bills)
+
+
+def write_bills(bills):
+    """
+    Upserts one chunk of bills on (student, period), clearing needs_rebill.
+
+    The amounts are recomputed from the chunk's summary rows, re-read and
+    locked in the upsert's transaction. build_bills() may have read the
+    counts long before (a job writes its chunks one transaction at a
+    time), and an attendance fix made since then would otherwise be lost
+    together with the flag it set. A fix arriving after the re-read waits
+    for this commit and then flags the bill again.
+    """
+    with transaction.atomic():
+        counts = monthly_counts_of(((bill.student_id, bill.period) for bill in bills), lock=True)
+        groups = {}
+        for bill in bills:
+            rates = tuple(getattr(bill, name) for name in BILL_RATE_FIELDS)
+            groups.setdefault((bill.period, rates), []).append(bill)
+        for (_, rates), group in groups.items():
+            pairs = [counts.get((bill.student_id, bill.period), (0, 0)) for bill in group]
+            amounts = bill_amounts([present for present, _ in pairs], [nv for _, nv in pairs],
+                                   dict(zip(BILL_RATE_FIELDS, rates)))
+            for bill, amount in zip(group, amounts):
+                bill.amount = amount
+                bill.needs_rebill = False
+        Bill.objects.bulk_create(
+            bills,
+            update_conflicts=True,
+            unique_fields=['student', 'period'],
+            update_fields=['amount', 'needs_rebill'] + BILL_RATE_FIELDS,
+        )
+
+
+def generate_monthly_bills(period, rates, chunk_size=BILL_CHUNK_SIZE, student_ids=None,
+                           end_period=None, rate_cards=None):
+    """
+    Creates or refreshes the bill of every student for one billing period
+    (or the months up to `end_period`) in a single transaction. See
+    build_bills() for the arguments.
+
+    Returns (created_count, updated_count).
+    """
+    with transaction.atomic():
+        bills, existing = build_bills(period, rates, student_ids, end_period, rate_cards)
+        for chunk in chunks(bills, chunk_size):
+            write_bills(chunk)
+    return len(bills) - len(existing), len(existing)
+
+
+def rebill_flagged_bills(period=None, chunk_size=BILL_CHUNK_SIZE):
+    """
+    Recomputes the bills flagged needs_rebill (of one period, or all),
+    each with the rates it was generated with, and clears the flag. The
+    work is proportional to the number of flagged bills.
+
+    Returns the number of bills recomputed.
+    """
+    flagged = Bill.objects.filter(needs_rebill=True)
+    if period is not None:
+        flagged = flagged.filter(period=period)
+    rebilled = 0
+    last_pk = 0
+    while True:
+        # Keyset pages, so bills flagged again meanwhile are not revisited.
+        chunk = list(
+            flagged.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'student_id', 'period', *BILL_RATE_FIELDS)[:chunk_size]
+        )
+        if not chunk:
+            return rebilled
+        last_pk = chunk[-1].pk
+        with transaction.atomic():
+            # Read in the transaction that clears the flags; see write_bills().
+            counts = monthly_counts_of(((bill.student_id, bill.period) for bill in chunk), lock=True)
+            for bill in chunk:
+                present_days, nv_days = counts.get((bill.student_id, bill.period), (0, 0))
+                rates = {name: getattr(bill, name) for name in BILL_RATE_FIELDS}
+                bill.amount = bill_amount(present_days, nv_days, rates)
+                bill.needs_rebill = False
+            Bill.objects.bulk_update(chunk, ['amount', 'needs_rebill'])
+        rebilled += len(chunk)
@@ -0,0 +1,83 @@
+"""
+Read-replica routing.
+
+With REPLICA_DATABASE_URL set, settings.py adds a "replica" database and
+installs ReplicaRouter. ReplicaRoutingMiddleware then sends the reads of
+GET / HEAD / OPTIONS requests to the replica; writes, the reads of unsafe
+requests, management commands and the billing worker all use the primary.
+The first write of a request pins the rest of that request to the primary,
+so it reads what it has just written.
+
+Replication lag still applies between requests: a client that writes and
+then immediately reads in a second request may briefly see the old data.
+
+Nothing is migrated on the replica; it gets the schema from the primary.
+For a local setup with two SQLite files, migrate the primary and copy it:
+cp db.sqlite3 replica.sqlite3.
+"""
+import contextlib
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB = 'replica'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The alias reads go to, or None for Django's default choice (the primary).
+_read_db = contextvars.ContextVar('mess_api_read_db', default=None)
+
+
+@contextlib.contextmanager
+def reads_from(alias):
+    token = _read_db.set(alias)
+    try:
+        yield
+    finally:
+        _read_db.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_db.get()
+
+    def db_for_write(self, model, **hints):
+        # Read-after-write: the rest of the request stays on the primary.
+        _read_db.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both sides.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if REPLICA_DB not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = REPLICA_DB if request.method in SAFE_METHODS else None
+        with reads_from(alias):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # The async ORM runs queries in a worker thread with a copy of this
+        # context, and copies changes back, so the pin still applies.
+        alias = REPLICA_DB if request.method in SAFE_METHODS else None
+        with reads_from(alias):
+            return await self.get_response(request)
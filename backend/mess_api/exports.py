@@ -0,0 +1,103 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read in keyset-paginated chunks (WHERE pk > last ORDER BY pk
+LIMIT n) and written out chunk by chunk through a StreamingHttpResponse,
+so memory stays flat however many rows match. Keyset chunks are used
+instead of QuerySet.iterator() because MySQL and SQLite drivers buffer the
+whole result of a single query client-side.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .periods import format_month
+
+# Rows fetched per query.
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column name, lookup, optional formatter)
+BILL_EXPORT_COLUMNS = [
+    ('id', 'pk', None),
+    ('reg_num', 'student__reg_num', None),
+    ('username', 'student__user__username', None),
+    ('month', 'period', format_month),
+    ('amount', 'amount', None),
+    ('daily_rate', 'daily_rate', None),
+    ('nv_plate_rate', 'nv_plate_rate', None),
+    ('room_rent', 'room_rent', None),
+    ('water_charges', 'water_charges', None),
+    ('electricity_charges', 'electricity_charges', None),
+    ('establishment_charges', 'establishment_charges', None),
+    ('is_paid', 'is_paid', None),
+    ('generated_date', 'generated_date', None),
+]
+
+ATTENDANCE_EXPORT_COLUMNS = [
+    ('id', 'pk', None),
+    ('reg_num', 'student__reg_num', None),
+    ('username', 'student__user__username', None),
+    ('date', 'date', None),
+    ('is_present', 'is_present', None),
+    ('meal_type', 'meal_type', None),
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields one tuple of formatted values per row, `chunk_size` rows per query."""
+    lookups = [lookup for _, lookup, _ in columns]
+    formatters = [formatter for _, _, formatter in columns]
+    queryset = queryset.order_by('pk').values_list(*lookups)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield tuple(value if fmt is None or value is None else fmt(value)
+                        for value, fmt in zip(row, formatters))
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def _csv_lines(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(rows, columns):
+    names = [name for name, _, _ in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(queryset, columns, fmt, filename):
+    """
+    Streams `queryset` as CSV or NDJSON. `columns` must start with the pk
+    column, which drives the chunking. Raises ValueError for an unknown format.
+    """
+    if fmt not in EXPORT_CONTENT_TYPES:
+        raise ValueError(fmt)
+    # The body is produced after the view (and the request's database
+    # routing) has returned, so fix the database now.
+    rows = iter_export_rows(queryset.using(queryset.db), columns)
+    lines = _csv_lines(rows, columns) if fmt == 'csv' else _ndjson_lines(rows, columns)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
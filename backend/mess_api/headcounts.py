@@ -0,0 +1,169 @@
+"""
+Maintenance of DailyHeadcount, the kitchen's plates per day and meal type.
+
+Every attendance write reports what it changed to update_daily_headcounts()
+as (date, before, after) marks, in the transaction of the write, and the
+counters move by the difference: UPDATE ... SET plates = plates + n, one
+statement per (day, meal type) whose count changed. Single-row saves and
+deletes arrive through the signals in mess_api.signals, which read the
+previous mark in pre_save; the bulk paths (the roll call, the CSV import,
+the bitmap writes) read the marks they are about to overwrite. No write
+recounts a day, so a self-mark costs the same in a hostel of any size.
+
+rebuild_daily_headcounts() recounts every day from the raw rows and backs
+the rebuild_headcounts command. Like the summaries, counts cover archived
+days (ArchivedAttendance) and bitmap-packed months (AttendanceMonth), so
+archiving or converting the storage layout leaves them unchanged.
+"""
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThan
+
+from .models import Attendance, ArchivedAttendance, AttendanceMonth, DailyHeadcount
+from .periods import month_bounds
+
+MEAL_TYPES = [value for value, _ in Attendance.MEAL_TYPES]
+
+_date_field = Attendance._meta.get_field('date')
+
+
+def _bitmap_counts(period, days):
+    """{(date, meal_type): plates} of `days` (all in `period`) from the month bitmaps, one query."""
+    aggregates = {}
+    for day in days:
+        bit = 1 << (day.day - 1)
+        aggregates[f'present_{day.day}'] = Count('id', filter=GreaterThan(F('present_mask').bitand(bit), 0))
+        aggregates[f'nv_{day.day}'] = Count(
+            'id', filter=GreaterThan(F('present_mask').bitand(F('nv_mask')).bitand(bit), 0),
+        )
+    totals = AttendanceMonth.objects.filter(period=period).exclude(present_mask=0).aggregate(**aggregates)
+
+    counts = {}
+    for day in days:
+        present, nv = totals[f'present_{day.day}'], totals[f'nv_{day.day}']
+        if present - nv:
+            counts[(day, 'Veg')] = present - nv
+        if nv:
+            counts[(day, 'Non-Veg')] = nv
+    return counts
+
+
+def _month_counts(period):
+    """
+    {(date, meal_type): plates} for every day of one month, hot, archived
+    and bitmap days together. Days and meal types without a plate are left
+    out.
+    """
+    start, end = month_bounds(period)
+    days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days)]
+
+    counts = _bitmap_counts(start, days)
+    for model in (Attendance, ArchivedAttendance):
+        for date, meal_type, plates in (
+            model.objects.filter(date__gte=start, date__lt=end, is_present=True)
+            .order_by().values('date', 'meal_type').annotate(plates=Count('id'))
+            .values_list('date', 'meal_type', 'plates')
+        ):
+            counts[(date, meal_type)] = counts.get((date, meal_type), 0) + plates
+    return counts
+
+
+def _write_days(days, counts):
+    """Sets the counters of `days`, both meal types, to `counts` (zero when missing)."""
+    DailyHeadcount.objects.bulk_create(
+        [
+            DailyHeadcount(date=day, meal_type=meal_type, plates=counts.get((day, meal_type), 0))
+            for day in days for meal_type in MEAL_TYPES
+        ],
+        update_conflicts=True,
+        unique_fields=['date', 'meal_type'],
+        update_fields=['plates'],
+    )
+
+
+def update_daily_headcounts(changes):
+    """
+    Moves the counters by a set of attendance changes.
+
+    `changes` is an iterable of (date, before, after), where before and
+    after are the day's (is_present, meal_type) mark, or None when the day
+    has no mark on that side.
+    """
+    deltas = Counter()
+    for date, before, after in changes:
+        date = _date_field.to_python(date)
+        if before and before[0]:
+            deltas[(date, before[1])] -= 1
+        if after and after[0]:
+            deltas[(date, after[1])] += 1
+
+    deltas = {key: delta for key, delta in sorted(deltas.items()) if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        # Zero counters first, so every UPDATE below finds its row.
+        DailyHeadcount.objects.bulk_create(
+            [
+                DailyHeadcount(date=date, meal_type=meal_type, plates=0)
+                for date in sorted({date for date, _ in deltas}) for meal_type in MEAL_TYPES
+            ],
+            ignore_conflicts=True,
+        )
+        # One order for every writer, so two of them cannot deadlock.
+        for (date, meal_type), delta in deltas.items():
+            # Never below zero, even if the counters drifted; rebuild_headcounts repairs them.
+            DailyHeadcount.objects.filter(date=date, meal_type=meal_type).update(
+                plates=Greatest(F('plates') + delta, 0),
+            )
+
+def rebuild_daily_headcounts(dry_run=False):
+    """
+    Recounts every day from Attendance, ArchivedAttendance and
+    AttendanceMonth, one month at a time.
+
+    Returns {'created': n, 'updated': n, 'unchanged': n} counting the
+    counters found missing, wrong or right; with dry_run=True nothing is
+    written, which makes it a consistency check.
+    """
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0}
+    periods = set(Attendance.objects.dates('date', 'month'))
+    periods.update(ArchivedAttendance.objects.dates('date', 'month'))
+    periods.update(AttendanceMonth.objects.dates('period', 'month'))
+    periods.update(DailyHeadcount.objects.dates('date', 'month'))
+
+    for period in sorted(periods):
+        start, end = month_bounds(period)
+        expected = _month_counts(period)
+        stored = {
+            (date, meal_type): plates
+            for date, meal_type, plates in DailyHeadcount.objects
+            .filter(date__gte=start, date__lt=end).values_list('date', 'meal_type', 'plates')
+        }
+
+        changed = set()
+        for key in expected.keys() | stored.keys():
+            plates = expected.get(key, 0)
+            if key not in stored:
+                stats['created'] += 1
+            elif stored[key] != plates:
+                stats['updated'] += 1
+            else:
+                stats['unchanged'] += 1
+                continue
+            changed.add(key[0])
+
+        if not dry_run and changed:
+            with transaction.atomic():
+                _write_days(sorted(changed), expected)
+    return stats
+
+
+def format_headcount(date, rows):
+    """The headcount endpoints' body for `date` from its (meal_type, plates) rows."""
+    plates = dict.fromkeys(MEAL_TYPES, 0)
+    plates.update(rows)
+    return {'date': date, 'plates': plates, 'total': sum(plates.values())}
@@ -0,0 +1,166 @@
+"""
+Database-backed queue for bill generation.
+
+The generate_bills endpoint only records a BillingJob; the
+run_billing_worker command claims and runs it. A claim is a conditional
+UPDATE (... WHERE id = <candidate> AND status/attempts are still what we
+read), so when several workers race for the same job exactly one UPDATE
+matches and the others move on to the next one. That works the same on
+SQLite, MySQL and PostgreSQL and needs nothing but the database.
+
+A running job whose heartbeat is older than STALE_JOB_SECONDS belongs to a
+worker that died. It is handed out again (bills are upserts, so a rerun is
+harmless) until it has been tried MAX_JOB_ATTEMPTS times.
+"""
+import os
+import socket
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .billing import RATE_FIELDS, parse_rates
+from .batching import chunks
+from .billing_engine import BILL_CHUNK_SIZE, MAX_BILLING_MONTHS, build_bills, rate_card, write_bills
+from .models import BillingJob
+from .periods import INVALID_MONTH_MESSAGE, format_month, month_range, parse_month
+
+STALE_JOB_SECONDS = 600
+
+MAX_JOB_ATTEMPTS = 3
+
+
+class JobLost(Exception):
+    """The job was reclaimed by another worker while this one was running it."""
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _rate_strings(rates):
+    return {name: str(value) for name, value in parse_rates(rates).items()}
+
+
+def enqueue_billing_job(period, rates, requested_by_id=None, end_period=None, rate_cards=None):
+    """
+    Queues a bill run for `period`, or for the months from `period` to
+    `end_period`, with `rate_cards` overriding `rates` for some of them
+    ({"YYYY-MM": {field: value}}). The rates are validated now and stored as
+    decimal strings. Raises ValueError.
+    """
+    if end_period is not None:
+        end_period = end_period.replace(day=1)
+        months = list(month_range(period, end_period))
+        if not months:
+            raise ValueError("The end month is before the start month.")
+        if len(months) > MAX_BILLING_MONTHS:
+            raise ValueError(f"At most {MAX_BILLING_MONTHS} months can be billed at once.")
+        if end_period == period:
+            end_period = None
+    else:
+        months = [period]
+
+    if rate_cards is not None and not isinstance(rate_cards, dict):
+        raise ValueError("rate_cards must map months (YYYY-MM) to rates.")
+    cards = {}
+    for month, overrides in (rate_cards or {}).items():
+        try:
+            month = parse_month(month)
+        except (TypeError, ValueError):
+            raise ValueError(f"Rate card {month!r}: {INVALID_MONTH_MESSAGE}")
+        if month not in months:
+            raise ValueError(f"Rate card for {format_month(month)} is outside the months billed.")
+        if not isinstance(overrides, dict) or not set(overrides) <= set(RATE_FIELDS):
+            raise ValueError(f"Rate card for {format_month(month)} must map rate names to amounts.")
+        # Only the overridden rates are stored, validated as they will be used.
+        merged = _rate_strings(rate_card(rates, {format_month(month): overrides}, month))
+        cards[format_month(month)] = {name: merged[name] for name in overrides}
+    return BillingJob.objects.create(
+        period=period,
+        end_period=end_period,
+        rates=_rate_strings(rates),
+        rate_cards=cards,
+        requested_by_id=requested_by_id,
+    )
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=STALE_JOB_SECONDS)
+    return Q(status=BillingJob.QUEUED) | Q(status=BillingJob.RUNNING, heartbeat_at__lt=stale)
+
+
+def claim_next_job(worker):
+    """Claims the oldest waiting (or abandoned) job for `worker`. Returns it, or None."""
+    while True:
+        now = timezone.now()
+        candidate = (
+            BillingJob.objects.filter(_claimable(now))
+            .order_by('created_at', 'pk')
+            .values_list('pk', 'attempts')
+            .first()
+        )
+        if candidate is None:
+            return None
+        pk, attempts = candidate
+        still_claimable = BillingJob.objects.filter(_claimable(now), pk=pk, attempts=attempts)
+
+        if attempts >= MAX_JOB_ATTEMPTS:
+            still_claimable.update(
+                status=BillingJob.FAILED,
+                finished_at=now,
+                errors=[f"Gave up after {attempts} attempts; the worker running it stopped responding."],
+            )
+            continue
+        claimed = still_claimable.update(
+            status=BillingJob.RUNNING,
+            worker=worker,
+            attempts=attempts + 1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            return BillingJob.objects.get(pk=pk)
+        # Another worker got there first; look again.
+
+
+def _save_progress(job, **fields):
+    """Writes `fields` and the heartbeat, as long as `job` is still ours."""
+    fields['heartbeat_at'] = timezone.now()
+    owned = BillingJob.objects.filter(pk=job.pk, worker=job.worker, status=BillingJob.RUNNING)
+    if not owned.update(**fields):
+        raise JobLost(job.pk)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def run_billing_job(job, chunk_size=BILL_CHUNK_SIZE):
+    """
+    Generates the bills of a claimed job. Each chunk is committed on its
+    own and followed by a progress update, so pollers see `processed` grow.
+    """
+    try:
+        bills, existing = build_bills(job.period, job.rates, end_period=job.end_period, rate_cards=job.rate_cards)
+        _save_progress(
+            job,
+            total=len(bills),
+            processed=0,
+            created_count=len(bills) - len(existing),
+            updated_count=len(existing),
+        )
+        for chunk in chunks(bills, chunk_size):
+            with transaction.atomic():
+                write_bills(chunk)
+            _save_progress(job, processed=job.processed + len(chunk))
+        _save_progress(job, status=BillingJob.DONE, finished_at=timezone.now())
+    except JobLost:
+        raise
+    except Exception as exc:
+        _save_progress(
+            job,
+            status=BillingJob.FAILED,
+            finished_at=timezone.now(),
+            errors=job.errors + [f"{type(exc).__name__}: {exc}"],
+        )
+    return job
@@ -0,0 +1,36 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mess_api.archive import ARCHIVE_BATCH_SIZE, academic_year_start, archive_attendance
+
+
+class Command(BaseCommand):
+    help = "Move the attendance of closed academic years into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', type=datetime.date.fromisoformat,
+            help="Archive days before this date, the first of a month "
+                 "(default: the start of the current academic year).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f"Rows moved per transaction (default {ARCHIVE_BATCH_SIZE}).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would move.")
+
+    def handle(self, *args, **options):
+        before = options['before'] or academic_year_start(timezone.localdate())
+        try:
+            stats = archive_attendance(before, options['batch_size'], dry_run=options['dry_run'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options['dry_run']:
+            self.stdout.write(f"{stats['archived']} attendance rows before {before} would be archived.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {stats['archived']} attendance rows before {before} in {stats['batches']} batches."
+            ))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mess_api.attendance_bitmap import BITMAP_BATCH_SIZE, pack_attendance, unpack_attendance
+
+LAYOUTS = {'bitmap': pack_attendance, 'rows': unpack_attendance}
+
+
+class Command(BaseCommand):
+    help = "Move the live attendance between the row and bitmap layouts (see ATTENDANCE_STORAGE)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to', choices=sorted(LAYOUTS), default=settings.ATTENDANCE_STORAGE,
+            help=f"Layout to move to (default: ATTENDANCE_STORAGE, now {settings.ATTENDANCE_STORAGE!r}).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BITMAP_BATCH_SIZE,
+            help=f"Rows (to bitmap) or months (to rows) moved per transaction (default {BITMAP_BATCH_SIZE}).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count the days that would move.")
+
+    def handle(self, *args, **options):
+        layout = options['to']
+        if layout != settings.ATTENDANCE_STORAGE:
+            self.stderr.write(self.style.WARNING(
+                f"ATTENDANCE_STORAGE is {settings.ATTENDANCE_STORAGE!r}: new attendance will still be "
+                f"written as {settings.ATTENDANCE_STORAGE}."
+            ))
+        stats = LAYOUTS[layout](options['batch_size'], dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(f"{stats['days']} attendance days would move to the {layout} layout.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Moved {stats['days']} attendance days to the {layout} layout in {stats['batches']} batches."
+            ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_api.attendance_ingest import ATTENDANCE_BATCH_SIZE, import_attendance_csv
+
+
+class Command(BaseCommand):
+    help = "Import attendance from a CSV register (reg_num, date, is_present, meal_type)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import.")
+        parser.add_argument(
+            '--batch-size', type=int, default=ATTENDANCE_BATCH_SIZE,
+            help=f"Rows per INSERT statement (default {ATTENDANCE_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as register:
+                report = import_attendance_csv(register, options['batch_size'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for error in report['errors']:
+            self.stderr.write(error)
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... and {report['error_count'] - len(report['errors'])} more errors")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['written']} of {report['rows']} rows ({report['error_count']} errors)."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from mess_api.summaries import rebuild_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute MonthlyAttendanceSummary from Attendance (backfill / repair), or check it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report differences; exit with status 1 if the summaries are out of sync.",
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        stats = rebuild_monthly_summaries(dry_run=verify)
+        drift = stats['created'] + stats['updated'] + stats['deleted']
+
+        summary = ", ".join(f"{key}={value}" for key, value in stats.items())
+        if not verify:
+            self.stdout.write(self.style.SUCCESS(f"Summaries rebuilt: {summary}"))
+        elif drift:
+            self.stderr.write(self.style.ERROR(f"Summaries out of sync: {summary}"))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Summaries in sync: {summary}"))
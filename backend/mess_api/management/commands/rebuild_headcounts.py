@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from mess_api.headcounts import rebuild_daily_headcounts
+
+
+class Command(BaseCommand):
+    help = "Recompute DailyHeadcount from the attendance rows (backfill / repair), or check it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report differences; exit with status 1 if the headcounts are out of sync.",
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        stats = rebuild_daily_headcounts(dry_run=verify)
+        drift = stats['created'] + stats['updated']
+
+        summary = ", ".join(f"{key}={value}" for key, value in stats.items())
+        if not verify:
+            self.stdout.write(self.style.SUCCESS(f"Headcounts rebuilt: {summary}"))
+        elif drift:
+            self.stderr.write(self.style.ERROR(f"Headcounts out of sync: {summary}"))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Headcounts in sync: {summary}"))
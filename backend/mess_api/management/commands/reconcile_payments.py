@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_api.reconciliation import RECONCILE_BATCH_SIZE, reconcile_statement
+
+
+class Command(BaseCommand):
+    help = "Mark bills paid from a bank / UPI statement CSV (amount and reg_num + month, or a narration)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Statement CSV file.")
+        parser.add_argument('--dry-run', action='store_true', help="Report the matches without marking bills paid.")
+        parser.add_argument(
+            '--batch-size', type=int, default=RECONCILE_BATCH_SIZE,
+            help=f"Bills per UPDATE statement (default {RECONCILE_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as statement:
+                report = reconcile_statement(statement, options['dry_run'], options['batch_size'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for outcome in ('ambiguous', 'unmatched'):
+            for entry in report[outcome]:
+                self.stderr.write(
+                    f"Line {entry['line']} ({outcome}): {entry['reg_num'] or '-'} {entry['month'] or '-'} "
+                    f"{entry['amount']}: {entry['reason']}"
+                )
+        summary = (
+            f"{len(report['matched'])} matched, {len(report['ambiguous'])} ambiguous, "
+            f"{len(report['unmatched'])} unmatched of {report['lines']} lines"
+        )
+        if report['dry_run']:
+            self.stdout.write(f"Dry run: {summary}; no bills marked paid.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{summary}; {report['paid']} bills marked paid (total {report['total_paid']})."
+            ))
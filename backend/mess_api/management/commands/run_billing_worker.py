@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mess_api.jobs import JobLost, claim_next_job, run_billing_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run queued bill generation jobs. Several workers may run side by side."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit once the queue is empty instead of waiting for new jobs.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to wait between checks of an empty queue (default 2).",
+        )
+
+    def handle(self, *args, **options):
+        name = worker_name()
+        self.stdout.write(f"Billing worker {name} started.")
+        try:
+            while True:
+                job = claim_next_job(name)
+                if job is None:
+                    if options['once']:
+                        break
+                    # Drop broken or expired connections while idle, as
+                    # the request cycle would.
+                    close_old_connections()
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Job {job.pk}: billing {job.period:%Y-%m}")
+                try:
+                    run_billing_job(job)
+                except JobLost:
+                    self.stderr.write(f"Job {job.pk} was taken over by another worker.")
+                    continue
+                if job.status == job.DONE:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Job {job.pk}: {job.created_count} created, {job.updated_count} updated"
+                    ))
+                else:
+                    self.stderr.write(self.style.ERROR(f"Job {job.pk} failed: {job.errors[-1]}"))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Billing worker {name} stopped.")
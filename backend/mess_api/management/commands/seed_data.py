@@ -0,0 +1,39 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_api.periods import parse_month
+from mess_api.seeding import SEED_PASSWORD, SEED_STAFF_USERNAME, seed_hostel
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic students, attendance and bills for load testing (scratch databases only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help="Number of students (default 2000).")
+        parser.add_argument('--days', type=int, default=90, help="Days of attendance per student (default 90).")
+        parser.add_argument('--months', type=int, default=3, help="Months of bills per student (default 3).")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (default 42).")
+        parser.add_argument(
+            '--start-month', default='2025-01',
+            help="YYYY-MM of the first attendance day and bill (default 2025-01).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start_month'])
+        except ValueError:
+            raise CommandError("--start-month must be YYYY-MM")
+
+        began = time.perf_counter()
+        counts = seed_hostel(
+            options['students'], options['days'], options['months'], seed=options['seed'], start=start,
+        )
+        elapsed = datetime.timedelta(seconds=round(time.perf_counter() - began))
+
+        summary = ", ".join(f"{key}={value}" for key, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed}."))
+        self.stdout.write(
+            f"Log in as {SEED_STAFF_USERNAME} or seed_000000 (student) with password {SEED_PASSWORD!r}."
+        )
@@ -0,0 +1,66 @@
+"""
+Versioned cache for the weekly menu.
+
+The menu is read on every dashboard load but only changes when staff edit
+it, so the serialized list is kept in the cache together with an ETag and
+a Last-Modified time. Every Menu save/delete bumps the version (see
+mess_api.signals), which orphans the old entry; the next read rebuilds it.
+
+Entries also expire after MENU_CACHE_TIMEOUT seconds, which bounds how long
+a worker with a process-local cache can serve a menu edited through another
+worker. The version itself never expires, so an unchanged menu keeps its
+Last-Modified and conditional GETs keep hitting; a rebuild whose ETag
+differs from the one the version was served with (an edit this cache was
+not told about) moves Last-Modified forward.
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+MENU_CACHE_TIMEOUT = 300
+
+MENU_VERSION_KEY = 'menu:version'
+
+
+def _menu_state():
+    """Returns the current {'version', 'modified'} pair, starting one if the cache is cold."""
+    state = cache.get(MENU_VERSION_KEY)
+    if state is None:
+        state = {'version': uuid.uuid4().hex, 'modified': int(time.time())}
+        if not cache.add(MENU_VERSION_KEY, state, None):
+            # Another request started one first; use theirs.
+            state = cache.get(MENU_VERSION_KEY, state)
+    return state
+
+
+def invalidate_menu_cache():
+    """Moves the menu to a new version so the next read rebuilds it."""
+    cache.set(MENU_VERSION_KEY, {'version': uuid.uuid4().hex, 'modified': int(time.time())}, None)
+
+
+def get_cached_menu(build):
+    """
+    Returns {'data', 'etag', 'last_modified'} for the current menu version.
+
+    `build` is called on a miss and must return the serialized menu list.
+    The ETag is a hash of that payload, so it stays the same across cache
+    flushes as long as the menu itself does not change.
+    """
+    state = _menu_state()
+    key = f"menu:data:{state['version']}"
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+        etag = '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest()
+        if state.get('etag') != etag:
+            modified = state['modified'] if 'etag' not in state else int(time.time())
+            state = {'version': state['version'], 'modified': modified, 'etag': etag}
+            cache.set(MENU_VERSION_KEY, state, None)
+        entry = {'data': data, 'etag': etag, 'last_modified': state['modified']}
+        cache.set(key, entry, MENU_CACHE_TIMEOUT)
+    return entry
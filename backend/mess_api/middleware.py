@@ -0,0 +1,184 @@
+"""
+Opt-in per-request instrumentation.
+
+RequestTimingMiddleware counts the SQL queries of each request and times
+them, the serializers and the whole request. The numbers go out as a
+Server-Timing header (visible in the browser's network panel) and as one
+JSON log line on the "mess_api.timing" logger. Requests over
+REQUEST_TIMING_QUERY_BUDGET queries or REQUEST_TIMING_LATENCY_BUDGET_MS are
+logged as warnings together with their most repeated SQL statements, which
+is usually enough to spot an N+1.
+
+With REQUEST_TIMING_ENABLED off the middleware raises MiddlewareNotUsed,
+so Django drops it from the chain and nothing is patched.
+
+Streaming responses are timed up to the point the view returns; rows
+fetched while the body streams are not counted.
+
+The middleware here is sync and async capable, so under ASGI the async
+views (mess_api.async_views) run without a hop through a worker thread.
+WhiteNoise 6.6 is sync only; StaticFilesMiddleware adds the async path.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger('mess_api.timing')
+
+# Statements listed for a request that went over budget.
+TOP_QUERIES = 5
+
+_current = contextvars.ContextVar('mess_api_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+
+def _instrument_serializers():
+    """Wraps BaseSerializer.data once so serializer time is added to the current request."""
+    data = serializers.BaseSerializer.data
+    if getattr(data.fget, 'timed', False):
+        return
+
+    def timed_data(self):
+        stats = _current.get()
+        if stats is None:
+            return data.fget(self)
+        start = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - start
+
+    timed_data.timed = True
+    serializers.BaseSerializer.data = property(timed_data)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.query_budget = settings.REQUEST_TIMING_QUERY_BUDGET
+        self.latency_budget_ms = settings.REQUEST_TIMING_LATENCY_BUDGET_MS
+        _instrument_serializers()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with self.instrumented(stats):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        # Connections are per thread, and the async ORM queries from a worker
+        # thread; wrap that thread's connections (two extra hops, when enabled).
+        stack = await sync_to_async(self.instrumented)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.report(request, response, stats, start)
+
+    @staticmethod
+    def instrumented(stats):
+        stack = contextlib.ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def report(self, request, response, stats, start):
+        total_ms = (time.perf_counter() - start) * 1000
+
+        db_ms = stats.db_seconds * 1000
+        serializer_ms = stats.serializer_seconds * 1000
+        response['Server-Timing'] = (
+            f'db;desc="{stats.queries} queries";dur={db_ms:.1f}, '
+            f'serialize;dur={serializer_ms:.1f}, '
+            f'total;dur={total_ms:.1f}'
+        )
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'db_ms': round(db_ms, 1),
+            'serializer_ms': round(serializer_ms, 1),
+            'total_ms': round(total_ms, 1),
+        }
+        if stats.queries > self.query_budget or total_ms > self.latency_budget_ms:
+            record['top_queries'] = [
+                {'count': count, 'sql': sql} for sql, count in stats.statements.most_common(TOP_QUERIES)
+            ]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware that also runs natively in an async chain."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        # The same lookup as WhiteNoise's __call__; without autorefresh it is
+        # a dict lookup, and serve() only opens the file.
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0007_remove_attendance_non_veg_plate_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'is_present', 'meal_type', 'student'], name='attendance_day_idx'),
+        ),
+        # Both nullable while 0009 converts between them, so the migrations
+        # can be applied and unapplied on tables with rows in them.
+        migrations.AlterField(
+            model_name='bill',
+            name='month',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='period',
+            field=models.DateField(null=True),
+        ),
+    ]
@@ -0,0 +1,77 @@
+"""
+Fills Bill.period from the free-text Bill.month.
+
+Older rows were written in several formats ("2025-01" by generate_bills,
+"December 2025" by populate_data.py). Rows whose month cannot be parsed
+fall back to the month they were generated in.
+
+If two bills of the same student end up in the same period, the (student,
+period) unique constraint in 0010 cannot be created. No bill is deleted or
+merged to make room: the migration stops before writing anything and lists
+the colliding bill ids with their amounts and paid status. Resolve them by
+hand (e.g. delete the unpaid duplicate, or fix its month text) and migrate
+again.
+"""
+import datetime
+
+from django.db import migrations
+
+MONTH_FORMATS = ['%Y-%m', '%Y-%m-%d', '%B %Y', '%b %Y', '%m/%Y', '%m-%Y', '%B-%Y', '%b-%Y']
+
+
+def parse_period(month, fallback):
+    text = (month or '').strip()
+    for fmt in MONTH_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date().replace(day=1)
+        except ValueError:
+            continue
+    return fallback.replace(day=1)
+
+
+def forwards(apps, schema_editor):
+    Bill = apps.get_model('mess_api', 'Bill')
+    periods = {}
+    by_key = {}
+    for bill in Bill.objects.order_by('id').only('id', 'student_id', 'month', 'generated_date').iterator():
+        period = parse_period(bill.month, bill.generated_date)
+        periods[bill.pk] = period
+        by_key.setdefault((bill.student_id, period), []).append(bill.pk)
+
+    collisions = {key: ids for key, ids in by_key.items() if len(ids) > 1}
+    if collisions:
+        details = {
+            pk: (amount, is_paid) for pk, amount, is_paid in Bill.objects
+            .filter(pk__in=[pk for ids in collisions.values() for pk in ids])
+            .values_list('pk', 'amount', 'is_paid')
+        }
+        lines = [
+            f"  student {student_id}, {period:%Y-%m}: " + ", ".join(
+                f"bill {pk} ({details[pk][0]}, {'paid' if details[pk][1] else 'unpaid'})" for pk in ids
+            )
+            for (student_id, period), ids in sorted(collisions.items(), key=lambda item: (item[0][0], item[0][1]))
+        ]
+        raise RuntimeError(
+            "Several bills of one student fall in the same month, so Bill.period cannot be unique. "
+            "No bill was changed; resolve these by hand and migrate again:\n" + "\n".join(lines)
+        )
+
+    for pk, period in periods.items():
+        Bill.objects.filter(pk=pk).update(period=period)
+
+
+def backwards(apps, schema_editor):
+    Bill = apps.get_model('mess_api', 'Bill')
+    for bill in Bill.objects.only('id', 'period').iterator():
+        Bill.objects.filter(pk=bill.pk).update(month=bill.period.strftime('%Y-%m'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0008_attendance_day_idx_bill_period'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
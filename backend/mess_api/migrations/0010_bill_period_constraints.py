@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0009_populate_bill_period'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='bill',
+            name='month',
+        ),
+        migrations.AlterField(
+            model_name='bill',
+            name='period',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='bill',
+            constraint=models.UniqueConstraint(fields=('student', 'period'), name='unique_bill_student_period'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['period', 'is_paid'], name='bill_period_paid_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0010_bill_period_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('nv_days', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mess_api.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'student', 'present_days', 'nv_days'], name='summary_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'period'), name='unique_summary_student_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+"""
+Fills MonthlyAttendanceSummary from existing Attendance rows with one
+grouped query. `manage.py rebuild_attendance_summaries --verify` can be used
+afterwards to check it.
+"""
+from django.db import migrations
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+BATCH_SIZE = 1000
+
+
+def forwards(apps, schema_editor):
+    Attendance = apps.get_model('mess_api', 'Attendance')
+    MonthlyAttendanceSummary = apps.get_model('mess_api', 'MonthlyAttendanceSummary')
+
+    rows = (
+        Attendance.objects.filter(is_present=True)
+        .annotate(period=TruncMonth('date'))
+        .order_by()
+        .values('student_id', 'period')
+        .annotate(present_days=Count('id'), nv_days=Count('id', filter=Q(meal_type='Non-Veg')))
+    )
+    batch = []
+    for row in rows.iterator():
+        batch.append(MonthlyAttendanceSummary(**row))
+        if len(batch) >= BATCH_SIZE:
+            MonthlyAttendanceSummary.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        MonthlyAttendanceSummary.objects.bulk_create(batch)
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('mess_api', 'MonthlyAttendanceSummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0011_monthlyattendancesummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0013_billingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billingjob',
+            name='end_period',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='billingjob',
+            name='rate_cards',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
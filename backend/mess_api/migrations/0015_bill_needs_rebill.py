@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0014_billingjob_month_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='needs_rebill',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['needs_rebill', 'period'], name='bill_needs_rebill_idx'),
+        ),
+    ]
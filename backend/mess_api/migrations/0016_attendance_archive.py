@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Plain SQL that SQLite, MySQL and PostgreSQL all accept.
+CREATE_HISTORY_VIEW = '''
+CREATE VIEW mess_api_attendance_history AS
+    SELECT id, student_id, date, is_present, meal_type, FALSE AS archived FROM mess_api_attendance
+    UNION ALL
+    SELECT id, student_id, date, is_present, meal_type, TRUE AS archived FROM mess_api_archivedattendance
+'''
+
+DROP_HISTORY_VIEW = 'DROP VIEW mess_api_attendance_history'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0015_bill_needs_rebill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('is_present', models.BooleanField()),
+                ('meal_type', models.CharField(choices=[('Veg', 'Veg'), ('Non-Veg', 'Non-Veg')], max_length=10)),
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'mess_api_attendance_history',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('is_present', models.BooleanField(default=True)),
+                ('meal_type', models.CharField(choices=[('Veg', 'Veg'), ('Non-Veg', 'Non-Veg')], default='Veg', max_length=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mess_api.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'is_present', 'meal_type', 'student'], name='archived_attendance_day_idx')],
+                'unique_together': {('student', 'date')},
+            },
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW, DROP_HISTORY_VIEW),
+    ]
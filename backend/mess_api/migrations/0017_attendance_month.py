@@ -0,0 +1,70 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Days 1 to 31, to expand a month's bitmasks into one row per marked day.
+MONTH_DAYS = ' UNION ALL '.join(f'SELECT {day} AS day' for day in range(1, 32))
+
+# period + (day - 1) days, which each backend spells its own way.
+DAY_DATE = {
+    'sqlite': "date(m.period, '+' || (d.day - 1) || ' days')",
+    'postgresql': 'm.period + (d.day - 1)',
+    'mysql': 'DATE_ADD(m.period, INTERVAL d.day - 1 DAY)',
+}
+
+ROW_HISTORY = '''
+    SELECT id, student_id, date, is_present, meal_type, FALSE AS archived FROM mess_api_attendance
+    UNION ALL
+    SELECT id, student_id, date, is_present, meal_type, TRUE AS archived FROM mess_api_archivedattendance
+'''
+
+# Bitmap days get the id -(month id * 32 + day); see attendance_bitmap.history_id.
+BITMAP_HISTORY = '''
+    UNION ALL
+    SELECT -(m.id * 32 + d.day) AS id, m.student_id, {date} AS date,
+           (m.present_mask & (1 << (d.day - 1))) <> 0 AS is_present,
+           CASE WHEN (m.nv_mask & (1 << (d.day - 1))) <> 0 THEN 'Non-Veg' ELSE 'Veg' END AS meal_type,
+           FALSE AS archived
+    FROM mess_api_attendancemonth m
+    INNER JOIN ({days}) d ON (m.marked_mask & (1 << (d.day - 1))) <> 0
+'''
+
+
+def create_history_view(apps, schema_editor):
+    date = DAY_DATE[schema_editor.connection.vendor]
+    schema_editor.execute('DROP VIEW mess_api_attendance_history')
+    schema_editor.execute(
+        'CREATE VIEW mess_api_attendance_history AS' + ROW_HISTORY + BITMAP_HISTORY.format(date=date, days=MONTH_DAYS)
+    )
+
+
+def drop_bitmap_history(apps, schema_editor):
+    schema_editor.execute('DROP VIEW mess_api_attendance_history')
+    schema_editor.execute('CREATE VIEW mess_api_attendance_history AS' + ROW_HISTORY)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0016_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('marked_mask', models.PositiveIntegerField(default=0)),
+                ('present_mask', models.PositiveIntegerField(default=0)),
+                ('nv_mask', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mess_api.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'student', 'present_mask', 'nv_mask'], name='attendance_month_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'period'), name='unique_attendance_month')],
+            },
+        ),
+        migrations.RunPython(create_history_view, drop_bitmap_history),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:05
+"""
+Creates DailyHeadcount and fills it from the existing attendance: the hot
+and archived rows with one grouped query each, the bitmap months counted
+here. `manage.py rebuild_headcounts --verify` can be used afterwards to
+check it.
+"""
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def forwards(apps, schema_editor):
+    DailyHeadcount = apps.get_model('mess_api', 'DailyHeadcount')
+    plates = Counter()
+    for name in ('Attendance', 'ArchivedAttendance'):
+        rows = (
+            apps.get_model('mess_api', name).objects.filter(is_present=True).order_by()
+            .values('date', 'meal_type').annotate(plates=Count('id'))
+            .values_list('date', 'meal_type', 'plates')
+        )
+        for date, meal_type, count in rows.iterator():
+            plates[(date, meal_type)] += count
+
+    months = apps.get_model('mess_api', 'AttendanceMonth').objects.exclude(present_mask=0)
+    for period, present_mask, nv_mask in months.values_list('period', 'present_mask', 'nv_mask').iterator():
+        for day in range(1, 32):
+            bit = 1 << (day - 1)
+            if present_mask & bit:
+                plates[(period.replace(day=day), 'Non-Veg' if nv_mask & bit else 'Veg')] += 1
+
+    DailyHeadcount.objects.bulk_create(
+        [DailyHeadcount(date=date, meal_type=meal_type, plates=count) for (date, meal_type), count in plates.items()],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('mess_api', 'DailyHeadcount').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_api', '0017_attendance_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyHeadcount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('meal_type', models.CharField(choices=[('Veg', 'Veg'), ('Non-Veg', 'Non-Veg')], max_length=10)),
+                ('plates', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'meal_type'), name='unique_headcount_date_meal')],
+            },
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -8,6 +8,12 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @property
+    def student_profile_id(self):
+        """PK of the user's StudentProfile, or None (the same attribute as ClaimsUser's)."""
+        profile = getattr(self, 'studentprofile', None)
+        return profile.pk if profile else None
+
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
     reg_num = models.CharField(max_length=20, unique=True)
@@ -48,16 +54,145 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('student', 'date')
+        indexes = [
+            # Covers billing (date range + is_present, grouped by student and
+            # meal_type) and the per-day roster, without touching the table.
+            models.Index(fields=['date', 'is_present', 'meal_type', 'student'], name='attendance_day_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.reg_num} - {self.date}"
 
+class ArchivedAttendance(models.Model):
+    """
+    Attendance of closed academic years, moved out of Attendance by the
+    archive_attendance command so the hot table only holds recent days.
+
+    Rows keep their Attendance id and are read-only; the monthly summaries
+    (and therefore the bills) count them together with the hot rows.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    date = models.DateField()
+    is_present = models.BooleanField(default=True)
+    meal_type = models.CharField(max_length=10, choices=Attendance.MEAL_TYPES, default='Veg')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student', 'date')
+        indexes = [
+            models.Index(fields=['date', 'is_present', 'meal_type', 'student'], name='archived_attendance_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.date} (archived)"
+
+class AttendanceMonth(models.Model):
+    """
+    One student's attendance for one month as day bitmasks (bit 0 is the
+    1st), the compact layout used when ATTENDANCE_STORAGE is 'bitmap'.
+
+    A day is marked when its bit is set in marked_mask; present_mask and
+    nv_mask then hold is_present and meal_type == 'Non-Veg' for it. Written
+    and read through mess_api.attendance_bitmap.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    # First day of the month, same convention as Bill.period
+    period = models.DateField()
+    marked_mask = models.PositiveIntegerField(default=0)
+    present_mask = models.PositiveIntegerField(default=0)
+    nv_mask = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'period'], name='unique_attendance_month'),
+        ]
+        indexes = [
+            # Counting a month reads the masks from the index alone.
+            models.Index(fields=['period', 'student', 'present_mask', 'nv_mask'], name='attendance_month_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.period:%Y-%m}"
+
+class AttendanceHistory(models.Model):
+    """
+    Every attendance day, hot, archived and bitmap-packed: a database view
+    (created in migration 0016, extended in 0017) over Attendance UNION ALL
+    ArchivedAttendance UNION ALL the marked days of AttendanceMonth. The
+    attendance list and export read it so archiving and the storage layout
+    change nothing for their callers. Bitmap days get negative ids (see
+    attendance_bitmap.history_id).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(StudentProfile, on_delete=models.DO_NOTHING, db_constraint=False)
+    date = models.DateField()
+    is_present = models.BooleanField()
+    meal_type = models.CharField(max_length=10, choices=Attendance.MEAL_TYPES)
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'mess_api_attendance_history'
+
+class MonthlyAttendanceSummary(models.Model):
+    """
+    Present / non-veg day counts per student per month.
+
+    Derived from Attendance and kept in sync by mess_api.summaries on every
+    write path, so billing and dashboards read one row per student instead
+    of one per day. Months without a present day have no row.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    # First day of the month, same convention as Bill.period
+    period = models.DateField()
+    present_days = models.PositiveIntegerField(default=0)
+    nv_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'period'], name='unique_summary_student_period'),
+        ]
+        indexes = [
+            # Billing reads a whole month: period range + the counts, index only.
+            models.Index(fields=['period', 'student', 'present_days', 'nv_days'], name='summary_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.period:%Y-%m}: {self.present_days} ({self.nv_days} NV)"
+
+class DailyHeadcount(models.Model):
+    """
+    Plates to cook per day and meal type: the students marked present with
+    that meal_type.
+
+    Derived from Attendance (all layouts) and moved by mess_api.headcounts
+    in the same transaction as every attendance write, so the kitchen reads
+    two rows instead of counting the roll call. A day that was ever written
+    has a row per meal type, zero included.
+    """
+    date = models.DateField()
+    meal_type = models.CharField(max_length=10, choices=Attendance.MEAL_TYPES)
+    plates = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'meal_type'], name='unique_headcount_date_meal'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.meal_type}: {self.plates}"
+
 class Bill(models.Model):
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
-    month = models.CharField(max_length=20) # e.g., "January 2025" or a date field
+    # First day of the billed month, e.g. 2025-01-01 for January 2025
+    period = models.DateField()
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     is_paid = models.BooleanField(default=False)
     generated_date = models.DateField(auto_now_add=True)
+    # Set when the student's attendance for the month changes after the bill
+    # was generated (see mess_api.summaries); cleared when it is recomputed.
+    needs_rebill = models.BooleanField(default=False)
     
     # Snapshot of rates used for calculation
     # Snapshot of rates used for calculation
@@ -70,5 +205,74 @@ class Bill(models.Model):
     electricity_charges = models.DecimalField(max_digits=8, decimal_places=2, default=0.0)
     establishment_charges = models.DecimalField(max_digits=8, decimal_places=2, default=0.0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'period'], name='unique_bill_student_period'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'is_paid'], name='bill_period_paid_idx'),
+            models.Index(fields=['needs_rebill', 'period'], name='bill_needs_rebill_idx'),
+        ]
+
+    @property
+    def month(self):
+        """The billing period as "YYYY-MM"."""
+        return self.period.strftime('%Y-%m')
+
     def __str__(self):
         return f"{self.student.reg_num} - {self.month} - {self.amount}"
+
+class BillingJob(models.Model):
+    """
+    A queued run of bill generation for one month.
+
+    Created by the generate_bills endpoint and executed by the
+    run_billing_worker command (see mess_api.jobs), so the request returns
+    straight away and the client polls for progress.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    # First day of the month to bill, same convention as Bill.period
+    period = models.DateField()
+    # Last month of a multi-month run; null when only `period` is billed
+    end_period = models.DateField(null=True, blank=True)
+    # The BILL_RATE_FIELDS values the bills are generated with, as decimal strings
+    rates = models.JSONField()
+    # Per-month overrides of `rates`, {"YYYY-MM": {field: value}}
+    rate_cards = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+
+    # Set by the worker that claimed the job; heartbeat_at moves with every
+    # chunk so a crashed worker's job can be picked up again.
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: oldest job in a given status.
+            models.Index(fields=['status', 'created_at'], name='billing_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        if self.end_period and self.end_period != self.period:
+            return f"Bills {self.period:%Y-%m} to {self.end_period:%Y-%m} ({self.status})"
+        return f"Bills {self.period:%Y-%m} ({self.status})"
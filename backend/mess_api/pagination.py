@@ -0,0 +1,129 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination for the large list endpoints.
+
+    Pages are located with a WHERE on the ordering column instead of an
+    OFFSET, so fetching page 500 costs the same as page 1. The default page
+    size comes from REST_FRAMEWORK['PAGE_SIZE']; clients may ask for a
+    different one with ?page_size= up to max_page_size.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class CompositeKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination on a multi-column ordering whose last column is
+    unique, e.g. ('-date', '-id').
+
+    CursorPagination positions on the first column only and pages through
+    rows sharing it with an OFFSET capped at offset_cutoff, so a value
+    shared by more rows than that (one date of a big roll call) never lets
+    the cursor advance. Here the cursor holds the whole ordering key of a
+    page's edge row and the next page starts strictly after it, with no
+    offset at all.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self._parse_position(self.cursor.position) if self.cursor else None
+
+        ordering = tuple(field[1:] if field.startswith('-') else '-' + field for field in self.ordering) \
+            if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # An empty backwards page means nothing precedes its cursor: the
+        # next page is the first one.
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            str(instance[field.lstrip('-')] if isinstance(instance, dict) else getattr(instance, field.lstrip('-')))
+            for field in ordering
+        ])
+
+    def _parse_position(self, position):
+        if position is None:
+            return None
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _after(ordering, position):
+        """Rows strictly after `position` in `ordering`: (a, b) > (x, y) spelled out per column."""
+        condition = Q()
+        for index, field in reversed(list(enumerate(ordering))):
+            beyond = Q(**{field.lstrip('-') + ('__lt' if field.startswith('-') else '__gt'): position[index]})
+            # Past this column, or level with it and past the rest
+            condition = beyond | (Q(**{field.lstrip('-'): position[index]}) & condition) if condition else beyond
+        return condition
+
+
+class AttendancePagination(CompositeKeysetPagination):
+    # Newest days first; ties within a day are broken by id.
+    ordering = ('-date', '-id')
+
+
+class BillPagination(KeysetPagination):
+    ordering = '-id'
+
+
+class StudentProfilePagination(KeysetPagination):
+    ordering = 'reg_num'
+
+
+class RosterPagination(KeysetPagination):
+    # One row per student, so the roster pages like the profiles list.
+    ordering = 'reg_num'
+
+
+class MonthlyAttendanceSummaryPagination(CompositeKeysetPagination):
+    ordering = ('-period', '-id')
+
+
+class BillingJobPagination(KeysetPagination):
+    ordering = '-id'
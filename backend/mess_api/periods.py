@@ -0,0 +1,43 @@
+"""
+Billing periods.
+
+A billing period is stored as the first day of its month (2025-01-01 for
+January 2025) so that month filters become plain date range scans. On the
+API it is written as "YYYY-MM".
+"""
+import datetime
+
+# The error for a month that parse_month() rejects, wherever one is read.
+INVALID_MONTH_MESSAGE = 'Expected a month in YYYY-MM format.'
+
+
+def parse_month(value):
+    """Parses "YYYY-MM" into the first day of that month. Raises ValueError."""
+    if isinstance(value, datetime.date):
+        return value.replace(day=1)
+    year, month = (int(part) for part in str(value).split('-'))
+    return datetime.date(year, month, 1)
+
+
+def format_month(period):
+    return period.strftime('%Y-%m')
+
+
+def next_month(period):
+    if period.month == 12:
+        return datetime.date(period.year + 1, 1, 1)
+    return datetime.date(period.year, period.month + 1, 1)
+
+
+def month_bounds(period):
+    """Returns the [first day, first day of next month) range of a period."""
+    period = period.replace(day=1)
+    return period, next_month(period)
+
+
+def month_range(first, last):
+    """The periods from `first` to `last`, both included."""
+    period = first.replace(day=1)
+    while period <= last:
+        yield period
+        period = next_month(period)
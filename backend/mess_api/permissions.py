@@ -12,3 +12,11 @@ class IsStaffOrReadOnly(permissions.BasePermission):
 
         # Write permissions are only allowed to the staff.
         return request.user and request.user.is_authenticated and request.user.is_staff_member
+
+
+class IsStaffMember(permissions.BasePermission):
+    """
+    Only allows staff members, for reads as well as writes.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_staff_member)
@@ -0,0 +1,166 @@
+"""
+Bill payments from bank / UPI statement files.
+
+A statement is a CSV with one payment per line. It needs an amount column
+(or credit) and either reg_num, with month as YYYY-MM, or a free-text
+narration / description / remarks column that contains them, e.g.
+"UPI/SVU MESS/REG00012 2025-01". An optional reference column (UTR,
+transaction id) is echoed in the report. Header names are case-insensitive.
+
+Every unpaid bill is loaded once into a dict of {reg_num: {period: bill}},
+so each line costs a couple of dictionary lookups whatever the hostel
+size. A line is
+
+* matched   - it names exactly one unpaid bill and pays its amount
+* ambiguous - it points at a student's unpaid bills but cannot settle one
+              on its own: the amount differs, the month is missing and
+              several bills fit, or an earlier line already paid that bill
+* unmatched - there is no unpaid bill to pay: unknown reg_num, no unpaid
+              bill for the month, or a line that could not be read
+
+The matched bills are marked paid with one UPDATE per
+RECONCILE_BATCH_SIZE bills, all in one transaction.
+"""
+import csv
+import re
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from .billing import to_money
+from .batching import chunks
+from .models import Bill
+from .periods import format_month, parse_month
+
+# Bills per UPDATE statement.
+RECONCILE_BATCH_SIZE = 1000
+
+# Other bank spellings of the columns read here.
+STATEMENT_COLUMN_ALIASES = {'credit': 'amount', 'reg_no': 'reg_num', 'period': 'month'}
+
+NARRATION_COLUMNS = ('narration', 'description', 'remarks')
+
+_NARRATION_MONTH = re.compile(r'\b\d{4}-\d{2}\b')
+_NARRATION_SEPARATORS = re.compile(r'[\s/|,;:]+')
+
+
+def outstanding_bills():
+    """Every unpaid bill as {reg_num: {period: (bill_id, amount)}}, in one query."""
+    index = defaultdict(dict)
+    rows = Bill.objects.filter(is_paid=False).values_list('student__reg_num', 'period', 'pk', 'amount')
+    for reg_num, period, pk, amount in rows.iterator(chunk_size=RECONCILE_BATCH_SIZE):
+        index[reg_num][period] = (pk, amount)
+    return dict(index)
+
+
+def reconcile_statement(lines, dry_run=False, batch_size=RECONCILE_BATCH_SIZE):
+    """
+    Matches a statement (any iterable of CSV text lines, e.g. an open
+    file) against the unpaid bills and marks the matched ones paid, unless
+    `dry_run`. Returns a report dict: lines, paid, total_paid and the
+    matched, ambiguous and unmatched lines. Raises ValueError when the
+    header lacks the columns needed.
+    """
+    reader = csv.DictReader(lines)
+    columns = [(name or '').strip().lower() for name in reader.fieldnames or ()]
+    reader.fieldnames = [STATEMENT_COLUMN_ALIASES.get(name, name) for name in columns]
+    narration_columns = [name for name in NARRATION_COLUMNS if name in reader.fieldnames]
+    if 'amount' not in reader.fieldnames or not ('reg_num' in reader.fieldnames or narration_columns):
+        raise ValueError("Statement header must include amount and either reg_num or a narration column")
+
+    report = {'lines': 0, 'paid': 0, 'total_paid': Decimal(0), 'dry_run': dry_run,
+              'matched': [], 'ambiguous': [], 'unmatched': []}
+    # bill_id -> line that paid it
+    claimed = {}
+
+    with transaction.atomic():
+        index = outstanding_bills()
+        for record in reader:
+            report['lines'] += 1
+            record = {key: (value or '').strip() for key, value in record.items() if key}
+            narration = ' '.join(record[name] for name in narration_columns if record.get(name))
+            entry = {
+                'line': reader.line_num,
+                'reg_num': record.get('reg_num') or _narration_reg_num(narration, index),
+                'month': record.get('month') or _narration_month(narration),
+                'amount': record.get('amount', ''),
+                'reference': record.get('reference', ''),
+            }
+            outcome, detail = _match(entry, index, claimed)
+            if outcome == 'matched':
+                entry['bill'] = detail
+                report['total_paid'] += Decimal(entry['amount'])
+            else:
+                entry['reason'] = detail
+            report[outcome].append(entry)
+
+        if not dry_run:
+            for chunk in chunks(list(claimed), batch_size):
+                report['paid'] += Bill.objects.filter(pk__in=chunk, is_paid=False).update(is_paid=True)
+
+    report['total_paid'] = f"{report['total_paid']:.2f}"
+    return report
+
+
+def _narration_reg_num(narration, index):
+    # The first word, or hyphen-separated part of one (NEFT-REG00012-...),
+    # that is the reg_num of a student with unpaid bills.
+    for word in _NARRATION_SEPARATORS.split(narration):
+        for candidate in (word, *word.split('-')):
+            if candidate in index:
+                return candidate
+    return ''
+
+
+def _narration_month(narration):
+    match = _NARRATION_MONTH.search(narration)
+    return match.group(0) if match else ''
+
+
+def _match(entry, index, claimed):
+    """
+    Returns ('matched', bill_id) or ('ambiguous' | 'unmatched', reason).
+    Normalizes entry['amount'], and fills in entry['month'] when the amount
+    alone picks the bill.
+    """
+    try:
+        amount = to_money(entry['amount'].replace(',', ''))
+    except ValueError:
+        return 'unmatched', f"invalid amount {entry['amount']!r}"
+    entry['amount'] = f"{amount:.2f}"
+    period = None
+    if entry['month']:
+        try:
+            period = parse_month(entry['month'])
+        except ValueError:
+            return 'unmatched', f"invalid month {entry['month']!r}"
+
+    reg_num = entry['reg_num']
+    if not reg_num:
+        return 'unmatched', "no reg_num"
+    bills = index.get(reg_num)
+    if not bills:
+        return 'unmatched', f"no unpaid bills for {reg_num}"
+
+    if period is not None:
+        if period not in bills:
+            return 'unmatched', f"no unpaid bill for {reg_num} in {entry['month']}"
+        bill_id, due = bills[period]
+        if due != amount:
+            return 'ambiguous', f"amount {amount} does not match the bill's {due}"
+    else:
+        fits = sorted(month for month, (_, due) in bills.items() if due == amount)
+        if len(fits) != 1:
+            unpaid = ', '.join(format_month(month) for month in sorted(fits or bills))
+            if fits:
+                return 'ambiguous', f"no month given and several unpaid bills of {amount}: {unpaid}"
+            return 'ambiguous', f"no month given and no unpaid bill of {amount} (unpaid: {unpaid})"
+        period = fits[0]
+        entry['month'] = format_month(period)
+        bill_id = bills[period][0]
+
+    if bill_id in claimed:
+        return 'ambiguous', f"bill already matched by line {claimed[bill_id]}"
+    claimed[bill_id] = entry['line']
+    return 'matched', bill_id
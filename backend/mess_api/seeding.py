@@ -0,0 +1,128 @@
+"""
+Synthetic hostel data for load testing.
+
+seed_hostel() creates N students, D days of attendance and M months of
+bills with bulk statements, drawing every random choice from one seeded
+generator so the same arguments always produce the same data. Seeded
+accounts are named seed_* and all share one password, hashed once.
+
+Meant for scratch and benchmark databases: the rows are real and are not
+cleaned up.
+"""
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .attendance_ingest import upsert_attendance
+from .batching import chunks
+from .billing_engine import generate_monthly_bills
+from .models import User, StudentProfile, Menu, Bill
+from .periods import next_month
+from .summaries import rebuild_monthly_summaries
+
+SEED_USERNAME_PREFIX = 'seed_'
+SEED_STAFF_USERNAME = 'seed_staff'
+SEED_PASSWORD = 'seedpass123'
+
+SEED_BATCH_SIZE = 1000
+
+BRANCHES = ['CSE', 'ECE', 'EEE', 'MECH', 'CIVIL', 'CHEM']
+
+SEED_RATES = {
+    'daily_rate': 65,
+    'nv_plate_rate': 27,
+    'room_rent': 150,
+    'water_charges': 125,
+    'electricity_charges': 150,
+    'establishment_charges': 275,
+}
+
+WEEKLY_MENU = {
+    'Monday': ('Idli, Vada, Sambar', 'Rice, Dal, Veg Curry, Curd', 'Chapati, Paneer Butter Masala, Rice'),
+    'Tuesday': ('Upma, Chutney', 'Rice, Sambar, Poriyal, Curd', 'Chapati, Chana Masala, Rice'),
+    'Wednesday': ('Dosa, Chutney', 'Veg Biryani, Raita', 'Chapati, Mixed Veg, Rice'),
+    'Thursday': ('Poha, Tea', 'Rice, Rasam, Fry, Curd', 'Puri, Aloo Curry, Rice'),
+    'Friday': ('Pongal, Vada', 'Rice, Dal Tadka, Curd', 'Chapati, Egg Curry, Rice'),
+    'Saturday': ('Bread, Omelette', 'Rice, Sambar, Papad, Curd', 'Fried Rice, Manchurian'),
+    'Sunday': ('Puri, Bhaji', 'Chicken Biryani, Raita', 'Chapati, Dal Fry, Rice'),
+}
+
+
+def seed_reg_num(index):
+    return f'SEED{index:06d}'
+
+
+def seed_hostel(students, days, months, seed=42, start=datetime.date(2025, 1, 1),
+                present_rate=0.85, non_veg_rate=0.3, paid_rate=0.7):
+    """
+    Seeds `students` students with `days` days of attendance from `start`
+    and bills for `months` months from start's month (billed from the
+    seeded attendance), plus the weekly menu and a staff account.
+
+    Existing seed_* data is kept and updated in place, so re-running with
+    the same arguments gives the same database. Returns row counts.
+    """
+    rng = random.Random(seed)
+    password = make_password(SEED_PASSWORD)
+
+    with transaction.atomic():
+        Menu.objects.bulk_create(
+            [Menu(day=day, breakfast=b, lunch=l, dinner=d) for day, (b, l, d) in WEEKLY_MENU.items()],
+            ignore_conflicts=True,
+        )
+        User.objects.bulk_create(
+            [User(username=SEED_STAFF_USERNAME, password=password, is_staff_member=True)],
+            ignore_conflicts=True,
+        )
+
+        usernames = [f'{SEED_USERNAME_PREFIX}{i:06d}' for i in range(students)]
+        for chunk in chunks(usernames, SEED_BATCH_SIZE):
+            User.objects.bulk_create(
+                [User(username=name, password=password, is_student=True) for name in chunk],
+                ignore_conflicts=True,
+            )
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+        profiles = [
+            StudentProfile(
+                user_id=user_ids[name],
+                reg_num=seed_reg_num(i),
+                branch=rng.choice(BRANCHES),
+                year=rng.randint(1, 4),
+                phone=f'9{rng.randrange(10 ** 9):09d}',
+            )
+            for i, name in enumerate(usernames)
+        ]
+        for chunk in chunks(profiles, SEED_BATCH_SIZE):
+            StudentProfile.objects.bulk_create(chunk, ignore_conflicts=True)
+        student_ids = [profile.user_id for profile in profiles]
+
+        attendance = 0
+        for offset in range(days):
+            date = start + datetime.timedelta(days=offset)
+            rows = [
+                (student_id, date, rng.random() < present_rate,
+                 'Non-Veg' if rng.random() < non_veg_rate else 'Veg')
+                for student_id in student_ids
+            ]
+            attendance += upsert_attendance(rows, SEED_BATCH_SIZE, refresh_summaries=False)
+        # One grouped pass per month instead of per written batch.
+        rebuild_monthly_summaries()
+
+        bills = 0
+        period = start.replace(day=1)
+        for _ in range(months):
+            created, updated = generate_monthly_bills(period, SEED_RATES, student_ids=student_ids)
+            bills += created + updated
+            period = next_month(period)
+
+        paid = [
+            pk for pk in Bill.objects.filter(student_id__in=student_ids).order_by('pk').values_list('pk', flat=True)
+            if rng.random() < paid_rate
+        ]
+        for chunk in chunks(paid, SEED_BATCH_SIZE):
+            Bill.objects.filter(pk__in=chunk).update(is_paid=True)
+
+    return {'students': len(student_ids), 'attendance': attendance, 'bills': bills, 'paid_bills': len(paid)}
+
@@ -1,5 +1,69 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
-from .models import User, StudentProfile, Menu, Attendance, Bill
+from .archive import archive_cutoff, validate_not_archived
+from .models import User, StudentProfile, Menu, Attendance, Bill, MonthlyAttendanceSummary, BillingJob
+from .periods import INVALID_MONTH_MESSAGE, parse_month, format_month
+
+
+def _relation_paths(serializer, model, prefix=''):
+    """
+    Walks a serializer's fields and yields ('select' | 'prefetch', path) for
+    every relation its dotted sources or nested serializers will touch.
+    """
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        nested = getattr(field, 'child', None) if isinstance(field, serializers.ListSerializer) else field
+        attrs = field.source_attrs if isinstance(nested, serializers.BaseSerializer) else field.source_attrs[:-1]
+
+        current_model, path, kind = model, prefix, 'select'
+        for attr in attrs:
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+            if model_field.one_to_many or model_field.many_to_many:
+                kind = 'prefetch'
+            path = f'{path}__{attr}' if path else attr
+            current_model = model_field.related_model
+            yield kind, path
+        else:
+            if isinstance(nested, serializers.BaseSerializer) and path != prefix:
+                for sub_kind, sub_path in _relation_paths(nested, current_model, path):
+                    yield ('prefetch' if kind == 'prefetch' else sub_kind), sub_path
+
+
+class EagerLoadingMixin:
+    """
+    Lets a ModelSerializer prepare its own queryset.
+
+    The select_related / prefetch_related paths are derived from the declared
+    field sources (e.g. source='student.user.username' -> 'student__user')
+    and nested serializers, so listing N objects stays a fixed number of
+    queries as fields are added.
+    """
+    _eager_paths = None
+
+    @classmethod
+    def get_eager_paths(cls):
+        if cls.__dict__.get('_eager_paths') is None:
+            select, prefetch = set(), set()
+            for kind, path in _relation_paths(cls(), cls.Meta.model):
+                (prefetch if kind == 'prefetch' else select).add(path)
+            cls._eager_paths = (sorted(select), sorted(prefetch))
+        return cls._eager_paths
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        select, prefetch = cls.get_eager_paths()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -12,7 +76,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
-class StudentProfileSerializer(serializers.ModelSerializer):
+class StudentProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
 
@@ -25,12 +89,31 @@ class MenuSerializer(serializers.ModelSerializer):
         model = Menu
         fields = '__all__'
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = '__all__'
 
-class BillSerializer(serializers.ModelSerializer):
+    def validate_date(self, value):
+        validate_not_archived(value, archive_cutoff())
+        return value
+
+class BillingMonthField(serializers.Field):
+    """A billing period (first day of the month) read and written as "YYYY-MM"."""
+    default_error_messages = {'invalid': INVALID_MONTH_MESSAGE}
+
+    def to_representation(self, value):
+        return format_month(value)
+
+    def to_internal_value(self, data):
+        try:
+            return parse_month(data)
+        except (TypeError, ValueError):
+            self.fail('invalid')
+
+
+class BillSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    month = BillingMonthField(source='period')
     student_reg_num = serializers.CharField(source='student.reg_num', read_only=True)
     student_name = serializers.CharField(source='student.user.username', read_only=True)
     
@@ -42,3 +125,36 @@ class BillSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bill
         fields = '__all__'
+        read_only_fields = ('period',)
+
+
+class MonthlyAttendanceSummarySerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    month = BillingMonthField(source='period', read_only=True)
+
+    class Meta:
+        model = MonthlyAttendanceSummary
+        fields = ('id', 'student', 'month', 'period', 'present_days', 'nv_days')
+
+
+class BillingJobSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    month = BillingMonthField(source='period', read_only=True)
+    end_month = BillingMonthField(source='end_period', read_only=True)
+
+    class Meta:
+        model = BillingJob
+        fields = (
+            'id', 'month', 'end_month', 'status', 'total', 'processed', 'created_count', 'updated_count',
+            'errors', 'rates', 'rate_cards', 'requested_by', 'attempts', 'created_at', 'started_at', 'finished_at',
+        )
+        read_only_fields = fields
+
+
+class RosterEntrySerializer(serializers.Serializer):
+    """One student's line on a day's roll call; is_present/meal_type are null until marked."""
+    student = serializers.IntegerField()
+    reg_num = serializers.CharField()
+    name = serializers.CharField()
+    branch = serializers.CharField()
+    year = serializers.IntegerField()
+    is_present = serializers.BooleanField(allow_null=True)
+    meal_type = serializers.CharField(allow_null=True)
@@ -0,0 +1,105 @@
+"""
+Signal handlers that keep derived tables in sync with single-row writes.
+
+Covers every save()/delete() of an Attendance, Menu, User or StudentProfile
+row: the API, the admin (including list_editable and delete actions) and
+cascades from deleted students. Bulk paths bypass signals and call mess_api.summaries
+and mess_api.headcounts directly, and archiving (which moves rows without changing any count)
+suspends the attendance handlers with attendance_signals_suspended().
+"""
+import contextlib
+import contextvars
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_auth_state
+from .menu_cache import invalidate_menu_cache
+from .headcounts import update_daily_headcounts
+from .models import User, StudentProfile, Attendance, AttendanceMonth, Menu
+from .summaries import lock_students, refresh_monthly_summaries
+
+_suspended = contextvars.ContextVar('mess_api_attendance_signals_suspended', default=False)
+
+
+@contextlib.contextmanager
+def attendance_signals_suspended():
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, raw=False, **kwargs):
+    # An edit may move a row to another student or month, whose month needs
+    # recounting too, and the old mark leaves the day's headcount.
+    instance._previous = None
+    if instance.pk and not raw and not _suspended.get():
+        previous = Attendance.objects.filter(pk=instance.pk)
+        if transaction.get_connection().in_atomic_block:
+            # Student first, as the bulk writers lock, then the row
+            lock_students([instance.student_id])
+            previous = previous.select_for_update()
+        instance._previous = previous.values_list('student_id', 'date', 'is_present', 'meal_type').first()
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, raw=False, **kwargs):
+    if raw or _suspended.get():
+        return
+    keys = {(instance.student_id, instance.date)}
+    changes = [(instance.date, None, (instance.is_present, instance.meal_type))]
+    previous = getattr(instance, '_previous', None)
+    if previous:
+        keys.add(previous[:2])
+        changes.append((previous[1], previous[2:], None))
+    with transaction.atomic():
+        update_daily_headcounts(changes)
+        refresh_monthly_summaries(keys)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    with transaction.atomic():
+        update_daily_headcounts([(instance.date, (instance.is_present, instance.meal_type), None)])
+        refresh_monthly_summaries([(instance.student_id, instance.date)])
+
+
+@receiver(post_delete, sender=AttendanceMonth)
+def attendance_month_deleted(sender, instance, **kwargs):
+    # Months are only deleted once empty, except when a student is deleted
+    # and the cascade takes their bitmaps (and summaries) with them. Their
+    # present days leave the headcounts.
+    if _suspended.get() or not instance.present_mask:
+        return
+    update_daily_headcounts(
+        (instance.period.replace(day=day), (True, 'Non-Veg' if instance.nv_mask & bit else 'Veg'), None)
+        for day, bit in ((day, 1 << (day - 1)) for day in range(1, 32))
+        if instance.present_mask & bit
+    )
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def menu_changed(sender, **kwargs):
+    # Wait for the commit, otherwise a concurrent read could cache the old
+    # rows under the new version.
+    transaction.on_commit(invalidate_menu_cache)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_auth_state(instance.pk))
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def student_profile_changed(sender, instance, **kwargs):
+    # The profile's pk is the user's, and the auth state carries it.
+    transaction.on_commit(lambda: invalidate_auth_state(instance.pk))
@@ -0,0 +1,217 @@
+"""
+Maintenance of MonthlyAttendanceSummary.
+
+Every path that writes Attendance reports the (student_id, date) keys it
+touched to refresh_monthly_summaries(), which recomputes just those
+(student, month) rows from the raw table: one grouped aggregate and one
+read of the stored rows per month touched, then an upsert and a delete of
+the rows whose counts changed. Single-row saves and deletes (the API,
+the admin, cascades) arrive through the signals in mess_api.signals; the
+bulk paths call it directly. rebuild_monthly_summaries() recomputes
+everything and backs the rebuild_attendance_summaries command.
+
+Counts cover the archived days (ArchivedAttendance) and the bitmap-packed
+months (AttendanceMonth, popcounted) as well as the hot table, so neither
+archiving a year nor changing ATTENDANCE_STORAGE changes a summary or a
+bill.
+
+Both also flag the bills of the (student, month) pairs whose counts
+changed with Bill.needs_rebill, so rebill_flagged_bills() can later recompute just
+those instead of the whole hostel.
+
+refresh_monthly_summaries() locks the students' profile rows before it
+counts. Two transactions writing the same student's month then recount
+one after the other, the second seeing the first's committed rows, so
+neither can store a count that misses the other's write.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .batching import chunks
+from .models import Attendance, ArchivedAttendance, AttendanceMonth, Bill, MonthlyAttendanceSummary, StudentProfile
+from .periods import month_bounds
+
+# Students per IN (...) when recomputing a month.
+SUMMARY_BATCH_SIZE = 1000
+
+_date_field = Attendance._meta.get_field('date')
+
+
+def _count_rows(queryset):
+    return queryset.filter(is_present=True).order_by().annotate(
+        present_days=Count('id'),
+        nv_days=Count('id', filter=Q(meal_type='Non-Veg')),
+    )
+
+
+def _month_counts(start, end, student_ids=None):
+    """{student_id: (present_days, nv_days)} for one month, hot, archived and bitmap days together."""
+    counts = {}
+
+    def add(student_id, present_days, nv_days):
+        present, nv = counts.get(student_id, (0, 0))
+        counts[student_id] = (present + present_days, nv + nv_days)
+
+    for model in (Attendance, ArchivedAttendance):
+        queryset = model.objects.filter(date__gte=start, date__lt=end)
+        if student_ids is not None:
+            queryset = queryset.filter(student_id__in=student_ids)
+        for row in _count_rows(queryset.values('student_id')):
+            add(row['student_id'], row['present_days'], row['nv_days'])
+
+    months = AttendanceMonth.objects.filter(period=start).exclude(present_mask=0)
+    if student_ids is not None:
+        months = months.filter(student_id__in=student_ids)
+    for student_id, present_mask, nv_mask in months.values_list('student_id', 'present_mask', 'nv_mask'):
+        add(student_id, present_mask.bit_count(), (present_mask & nv_mask).bit_count())
+    return counts
+
+
+def _write_month(period, student_ids, counts):
+    """Upserts the non-empty counts and drops rows of students that now have none."""
+    MonthlyAttendanceSummary.objects.bulk_create(
+        [
+            MonthlyAttendanceSummary(student_id=student_id, period=period, present_days=present, nv_days=nv)
+            for student_id, (present, nv) in counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['student', 'period'],
+        update_fields=['present_days', 'nv_days'],
+    )
+    emptied = [student_id for student_id in student_ids if student_id not in counts]
+    if emptied:
+        MonthlyAttendanceSummary.objects.filter(period=period, student_id__in=emptied).delete()
+
+
+def _stored_counts(period, student_ids):
+    """{student_id: (present_days, nv_days)} of the stored summaries of `student_ids` for one month."""
+    return {
+        student_id: (present, nv)
+        for student_id, present, nv in MonthlyAttendanceSummary.objects
+        .filter(period=period, student_id__in=student_ids).values_list('student_id', 'present_days', 'nv_days')
+    }
+
+
+def _flag_bills(period, student_ids):
+    """Marks the month's bills of `student_ids` as out of date. Usually a no-op: the month is not billed yet."""
+    Bill.objects.filter(period=period, student_id__in=student_ids, needs_rebill=False).update(needs_rebill=True)
+
+
+def lock_students(student_ids):
+    """
+    Locks the students' profile rows (in pk order, so two writers cannot
+    deadlock) until the end of the current transaction.
+    """
+    for batch in chunks(sorted(set(student_ids)), SUMMARY_BATCH_SIZE):
+        list(StudentProfile.objects.select_for_update().filter(pk__in=batch).order_by('pk').values_list('pk', flat=True))
+
+
+def refresh_monthly_summaries(keys):
+    """
+    Recomputes the summaries touched by a set of attendance writes.
+
+    `keys` is an iterable of (student_id, date); any date in a month marks
+    that whole (student, month) for recomputation.
+    """
+    by_period = {}
+    for student_id, date in keys:
+        # to_python() also accepts the strings a caller may have assigned
+        period = _date_field.to_python(date).replace(day=1)
+        by_period.setdefault(period, set()).add(student_id)
+    if not by_period:
+        return
+
+    with transaction.atomic():
+        lock_students(set().union(*by_period.values()))
+        for period, student_ids in by_period.items():
+            start, end = month_bounds(period)
+            student_ids = sorted(student_ids)
+            for i in range(0, len(student_ids), SUMMARY_BATCH_SIZE):
+                batch = student_ids[i:i + SUMMARY_BATCH_SIZE]
+                counts = _month_counts(start, end, batch)
+                stored = _stored_counts(period, batch)
+                # Re-saving an unchanged day (the staff screen saves the
+                # whole roster) leaves the summaries and the bills alone.
+                changed = [student_id for student_id in batch if counts.get(student_id) != stored.get(student_id)]
+                if changed:
+                    _write_month(period, changed, {student_id: counts[student_id]
+                                                   for student_id in changed if student_id in counts})
+                    _flag_bills(period, changed)
+
+
+def rebuild_monthly_summaries(dry_run=False):
+    """
+    Recomputes every summary from Attendance, ArchivedAttendance and
+    AttendanceMonth, one month at a time.
+
+    Returns {'created': n, 'updated': n, 'deleted': n, 'unchanged': n}
+    describing the differences found; with dry_run=True nothing is written,
+    which makes it a consistency check.
+    """
+    stats = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    periods = set(Attendance.objects.dates('date', 'month'))
+    periods.update(ArchivedAttendance.objects.dates('date', 'month'))
+    periods.update(AttendanceMonth.objects.dates('period', 'month'))
+    periods.update(MonthlyAttendanceSummary.objects.dates('period', 'month'))
+
+    for period in sorted(periods):
+        start, end = month_bounds(period)
+        expected = _month_counts(start, end)
+        stored = {
+            student_id: (present, nv)
+            for student_id, present, nv in MonthlyAttendanceSummary.objects
+            .filter(period=period).values_list('student_id', 'present_days', 'nv_days')
+        }
+
+        changed = list(stored.keys() - expected.keys())
+        for student_id, counts in expected.items():
+            if student_id not in stored:
+                stats['created'] += 1
+            elif stored[student_id] != counts:
+                stats['updated'] += 1
+            else:
+                stats['unchanged'] += 1
+                continue
+            changed.append(student_id)
+        stats['deleted'] += len(stored.keys() - expected.keys())
+
+        if not dry_run and changed:
+            with transaction.atomic():
+                _write_month(period, list(stored.keys() | expected.keys()), expected)
+                for i in range(0, len(changed), SUMMARY_BATCH_SIZE):
+                    _flag_bills(period, changed[i:i + SUMMARY_BATCH_SIZE])
+    return stats
+
+
+def monthly_counts(first_period, last_period):
+    """
+    Returns {(student_id, period): (present_days, nv_days)} for every month
+    from first_period to last_period (inclusive), read from the summary
+    table in one query.
+    """
+    return {
+        (student_id, period): (present, nv)
+        for student_id, period, present, nv in MonthlyAttendanceSummary.objects
+        .filter(period__gte=first_period, period__lte=last_period)
+        .values_list('student_id', 'period', 'present_days', 'nv_days')
+    }
+
+
+def monthly_counts_of(keys, lock=False):
+    """
+    Like monthly_counts(), for a set of (student_id, period) pairs. With
+    lock=True the summary rows are read FOR UPDATE, so a concurrent
+    refresh of them waits for the caller's transaction.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = MonthlyAttendanceSummary.objects.filter(
+        student_id__in={student_id for student_id, _ in keys},
+        period__in={period for _, period in keys},
+    )
+    if lock:
+        rows = rows.select_for_update().order_by('student_id', 'period')
+    rows = rows.values_list('student_id', 'period', 'present_days', 'nv_days')
+    return {(student_id, period): (present, nv) for student_id, period, present, nv in rows
+            if (student_id, period) in keys}
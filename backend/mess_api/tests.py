@@ -1,3 +1,1801 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import tempfile
+import time
+from unittest import mock, skipUnless
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.sites import site as admin_site
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.forms import modelform_factory
+from django.http import HttpResponse
+from django.db import connection, transaction
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import admin as mess_admin, archive, attendance_bitmap, attendance_ingest, billing, billing_engine, exports, jobs, menu_cache, reconciliation, summaries
+from .billing_engine import build_bills, generate_monthly_bills
+from .db_router import REPLICA_DB, ReplicaRouter, ReplicaRoutingMiddleware
+from .menu_cache import invalidate_menu_cache
+from .middleware import RequestTimingMiddleware
+from .models import User, StudentProfile, Menu, Attendance, ArchivedAttendance, AttendanceMonth, Bill, MonthlyAttendanceSummary, DailyHeadcount, BillingJob
+from .summaries import monthly_counts
+from .views import CustomTokenObtainPairSerializer
+
+
+def make_student(index, **extra):
+    user = User.objects.create(username=f'student{index}', is_student=True)
+    fields = dict({'branch': 'CSE', 'year': 2}, **extra)
+    return StudentProfile.objects.create(user=user, reg_num=f'REG{index:05d}', **fields)
+
+
+def make_staff(username='staff'):
+    return User.objects.create(username=username, is_staff_member=True)
+
+
+class GenerateBillsTests(APITestCase):
+    url = '/api/bills/generate_bills/'
+    payload = {
+        'month': '2025-01',
+        'daily_rate': 65,
+        'nv_plate_rate': 27,
+        'room_rent': 150,
+        'water_charges': 125,
+        'electricity_charges': 150,
+        'establishment_charges': 275,
+    }
+
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+
+    def generate(self, **changes):
+        """Queues a run through the API, works the queue and returns the job's status."""
+        response = self.client.post(self.url, dict(self.payload, **changes), format='json')
+        self.assertEqual(response.status_code, 202)
+        call_command('run_billing_worker', once=True, stdout=StringIO())
+        return self.client.get(f"/api/billing-jobs/{response.data['job_id']}/").data
+
+    def add_students(self, start, count):
+        for i in range(start, start + count):
+            student = make_student(i)
+            for day in range(1, 11):
+                Attendance.objects.create(student=student, date=datetime.date(2025, 1, day))
+            for day in range(11, 13):
+                Attendance.objects.create(student=student, date=datetime.date(2025, 1, day), meal_type='Non-Veg')
+            # Absent days and other months are not billed.
+            Attendance.objects.create(student=student, date=datetime.date(2025, 1, 20), is_present=False)
+            Attendance.objects.create(student=student, date=datetime.date(2025, 2, 1))
+
+    def test_amounts_and_counts(self):
+        self.add_students(0, 3)
+        make_student(99)  # no attendance at all, pays fixed charges only
+
+        job = self.generate()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['processed'], job['total']), (4, 4))
+        self.assertEqual((job['created_count'], job['updated_count']), (4, 0))
+
+        bill = Bill.objects.get(student__reg_num='REG00000', period=datetime.date(2025, 1, 1))
+        # 12 present days * 65 + 2 NV days * 27 + 700 fixed
+        self.assertEqual(bill.amount, Decimal('1534.00'))
+        self.assertEqual(bill.nv_plate_rate, Decimal('27.00'))
+        self.assertEqual(Bill.objects.get(student__reg_num='REG00099').amount, Decimal('700.00'))
+
+        job = self.generate(daily_rate=70)
+        self.assertEqual((job['created_count'], job['updated_count']), (0, 4))
+        self.assertEqual(Bill.objects.count(), 4)
+        self.assertEqual(Bill.objects.get(student__reg_num='REG00000').amount, Decimal('1594.00'))
+
+    def test_query_count_independent_of_student_count(self):
+        # Each measured run both refreshes existing bills and creates new ones.
+        self.add_students(0, 3)
+        self.generate()
+        self.add_students(3, 2)
+        with CaptureQueriesContext(connection) as small:
+            self.generate()
+
+        self.add_students(5, 40)
+        with CaptureQueriesContext(connection) as large:
+            job = self.generate()
+
+        self.assertEqual((job['created_count'], job['updated_count']), (40, 5))
+        self.assertEqual(len(small), len(large))
+
+    def test_bills_expose_month_as_text(self):
+        self.add_students(0, 1)
+        self.generate()
+        row = self.client.get('/api/bills/').data['results'][0]
+        self.assertEqual(row['month'], '2025-01')
+        self.assertEqual(row['period'], '2025-01-01')
+
+    def test_invalid_month(self):
+        response = self.client.post(self.url, dict(self.payload, month='2025-13'), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rates_must_fit_the_bill_columns(self):
+        for changes in ({'daily_rate': '1e30'}, {'daily_rate': '100000'}, {'nv_plate_rate': '10000'},
+                        {'room_rent': '1000000'}):
+            response = self.client.post(self.url, dict(self.payload, **changes), format='json')
+            self.assertEqual(response.status_code, 400, changes)
+        self.assertFalse(BillingJob.objects.exists())
+        # The largest rates each column holds are billed and read back
+        self.add_students(0, 1)
+        job = self.generate(daily_rate='9999.99', room_rent='999999.99')
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(Bill.objects.get().daily_rate, Decimal('9999.99'))
+
+
+class BulkAttendanceTests(APITestCase):
+    url = '/api/attendance/bulk_update/'
+
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+
+    def records(self, start, count, **fields):
+        return [dict({'reg_num': f'REG{i:05d}'}, **fields) for i in range(start, start + count)]
+
+    def test_creates_updates_and_reports_unknown(self):
+        students = [make_student(i) for i in range(3)]
+        Attendance.objects.create(student=students[0], date=datetime.date(2025, 3, 1), is_present=False)
+
+        payload = {
+            'date': '2025-03-01',
+            'records': self.records(0, 3, is_present=True, meal_type='Non-Veg') + [
+                {'reg_num': 'NOPE', 'is_present': True},
+                {'reg_num': 'REG00001', 'meal_type': 'Fish'},
+            ],
+        }
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['errors'], [
+            'Student with reg_num NOPE not found',
+            "Error for REG00001: invalid meal_type 'Fish'",
+        ])
+        self.assertEqual(Attendance.objects.filter(date='2025-03-01').count(), 3)
+        first = Attendance.objects.get(student=students[0])
+        self.assertTrue(first.is_present)
+        self.assertEqual(first.meal_type, 'Non-Veg')
+
+    def test_invalid_date(self):
+        make_student(0)
+        for date in ('03/01/2025', '2025-02-30', 20250301):
+            response = self.client.post(self.url, {'date': date, 'records': self.records(0, 1)}, format='json')
+            self.assertEqual(response.status_code, 400, date)
+
+    def test_invalid_records(self):
+        make_student(0)
+        for records in ('abc', {'reg_num': 'REG00000'}, ['REG00000'], [{'reg_num': 'REG00000'}, None]):
+            response = self.client.post(self.url, {'date': '2025-03-01', 'records': records}, format='json')
+            self.assertEqual(response.status_code, 400, records)
+        # A reg_num that is not a string is reported like an unknown one
+        response = self.client.post(self.url, {'date': '2025-03-01', 'records': [{'reg_num': ['REG00000']}]},
+                                    format='json')
+        self.assertEqual(response.data['errors'], ["Student with reg_num ['REG00000'] not found"])
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_query_count_independent_of_payload_size(self):
+        for i in range(60):
+            make_student(i)
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'date': '2025-03-01', 'records': self.records(0, 5)}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {'date': '2025-03-02', 'records': self.records(0, 60)}, format='json')
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Attendance.objects.filter(date='2025-03-02').count(), 60)
+
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.students = [make_student(i) for i in range(5)]
+        for student in self.students:
+            for day in range(1, 4):
+                Attendance.objects.create(student=student, date=datetime.date(2025, 1, day))
+
+    def collect(self, url):
+        rows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows += response.data['results']
+            url = response.data['next']
+        return rows
+
+    def test_attendance_pages_newest_first(self):
+        rows = self.collect('/api/attendance/?page_size=4')
+        self.assertEqual(len(rows), 15)
+        self.assertEqual(len({row['id'] for row in rows}), 15)
+        self.assertEqual([row['date'] for row in rows], sorted((row['date'] for row in rows), reverse=True))
+
+    def test_pages_through_a_day_with_more_rows_than_the_offset_cutoff(self):
+        # One roll call bigger than CursorPagination's offset_cutoff (1000)
+        day = datetime.date(2025, 2, 1)
+        users = User.objects.bulk_create(User(username=f'bulk{i}', is_student=True) for i in range(1100))
+        profiles = StudentProfile.objects.bulk_create(
+            StudentProfile(user=user, reg_num=f'BULK{i:05d}', branch='CSE', year=2) for i, user in enumerate(users)
+        )
+        Attendance.objects.bulk_create(Attendance(student=profile, date=day) for profile in profiles)
+
+        rows = self.collect('/api/attendance/?page_size=100')
+        self.assertEqual(len(rows), 1115)
+        self.assertEqual(len({row['id'] for row in rows}), 1115)
+        self.assertEqual([(row['date'], row['id']) for row in rows],
+                         sorted(((row['date'], row['id']) for row in rows), reverse=True))
+
+        # And back again from the last page
+        url, pages = '/api/attendance/?page_size=500', []
+        while url:
+            pages.append(self.client.get(url).data)
+            url = pages[-1]['next']
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual(previous['results'], pages[-2]['results'])
+        self.assertEqual(self.client.get(previous['next']).data['results'], pages[-1]['results'])
+        self.assertEqual(self.client.get('/api/attendance/?cursor=cD14').status_code, 404)
+
+    def test_profiles_ordered_by_reg_num(self):
+        response = self.client.get('/api/profiles/?page_size=2')
+        self.assertEqual([row['reg_num'] for row in response.data['results']], ['REG00000', 'REG00001'])
+        rows = self.collect('/api/profiles/?page_size=2')
+        self.assertEqual([row['reg_num'] for row in rows], [f'REG{i:05d}' for i in range(5)])
+
+    def test_attendance_date_range_filter(self):
+        response = self.client.get('/api/attendance/?start_date=2025-01-02&end_date=2025-01-02')
+        self.assertEqual(len(response.data['results']), 5)
+        response = self.client.get('/api/attendance/?start_date=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryCountTests(APITestCase):
+    """
+    Every list endpoint must cost the same number of queries for 2 rows as
+    for 12, and every retrieve endpoint a fixed number, so N+1 patterns in
+    serializers get caught here.
+    """
+    list_urls = ['/api/profiles/', '/api/attendance/', '/api/bills/', '/api/menu/', '/api/attendance-summaries/',
+                 '/api/billing-jobs/']
+
+    def setUp(self):
+        self.staff = make_staff()
+        self.next_index = 0
+
+    def seed(self, count):
+        for _ in range(count):
+            student = make_student(self.next_index)
+            Attendance.objects.create(student=student, date=datetime.date(2025, 1, 1 + self.next_index))
+            Bill.objects.create(student=student, period=datetime.date(2025, 1, 1), amount=700)
+            Menu.objects.create(day=Menu.DAYS[self.next_index % 7][0] + str(self.next_index),
+                                breakfast='Idli', lunch='Rice', dinner='Chapati')
+            self.next_index += 1
+        return student
+
+    def count_queries(self, url):
+        # Measure the menu's cache-miss path; MenuCacheTests covers hits.
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_list_endpoints_as_staff(self):
+        self.client.force_authenticate(self.staff)
+        self.seed(2)
+        small = {url: self.count_queries(url) for url in self.list_urls}
+        self.seed(10)
+        large = {url: self.count_queries(url) for url in self.list_urls}
+        self.assertEqual(small, large)
+
+    def test_list_endpoints_as_student(self):
+        student = self.seed(1)
+        self.client.force_authenticate(student.user)
+        for day in range(2, 4):
+            Attendance.objects.create(student=student, date=datetime.date(2025, 2, day))
+        small = {url: self.count_queries(url) for url in self.list_urls + ['/api/me/']}
+        for day in range(4, 20):
+            Attendance.objects.create(student=student, date=datetime.date(2025, 2, day))
+            Bill.objects.create(student=student, period=datetime.date(2000 + day, 1, 1), amount=700)
+        large = {url: self.count_queries(url) for url in self.list_urls + ['/api/me/']}
+        self.assertEqual(small, large)
+
+    def test_retrieve_endpoints(self):
+        self.client.force_authenticate(self.staff)
+        student = self.seed(3)
+        bill = Bill.objects.get(student=student)
+        attendance = Attendance.objects.get(student=student)
+        menu = Menu.objects.first()
+
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/profiles/{student.pk}/')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/bills/{bill.pk}/')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/attendance/{attendance.pk}/')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/menu/{menu.pk}/')
+
+
+class MonthlySummaryTests(APITestCase):
+    def setUp(self):
+        self.student = make_student(0)
+        self.other = make_student(1)
+
+    def summary(self, student=None, period=datetime.date(2025, 1, 1)):
+        row = MonthlyAttendanceSummary.objects.filter(student=student or self.student, period=period).first()
+        return (row.present_days, row.nv_days) if row else None
+
+    def assert_in_sync(self):
+        out = StringIO()
+        call_command('rebuild_attendance_summaries', verify=True, stdout=out)
+        self.assertIn('in sync', out.getvalue())
+
+    def test_refresh_locks_the_students_before_counting(self):
+        calls = []
+        with mock.patch.object(summaries, 'lock_students', side_effect=lambda ids: calls.append(('lock', set(ids)))), \
+                mock.patch.object(summaries, '_month_counts', side_effect=lambda *args: calls.append(('count',)) or {}):
+            summaries.refresh_monthly_summaries([(self.student.pk, datetime.date(2025, 1, 3)),
+                                                 (self.other.pk, datetime.date(2025, 2, 3))])
+        self.assertEqual(calls, [('lock', {self.student.pk, self.other.pk}), ('count',), ('count',)])
+
+    def test_student_create_via_api(self):
+        self.client.force_authenticate(self.student.user)
+        response = self.client.post('/api/attendance/', {'student': self.student.pk, 'date': '2025-01-05', 'meal_type': 'Non-Veg'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.summary(), (1, 1))
+        self.assert_in_sync()
+
+    def test_bulk_update(self):
+        self.client.force_authenticate(make_staff())
+        records = [{'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}, {'reg_num': 'REG00001'}]
+        self.client.post('/api/attendance/bulk_update/', {'date': '2025-01-05', 'records': records}, format='json')
+        self.client.post('/api/attendance/bulk_update/', {'date': '2025-01-06', 'records': records}, format='json')
+        self.assertEqual(self.summary(), (2, 2))
+        self.assertEqual(self.summary(self.other), (2, 0))
+
+        records = [{'reg_num': 'REG00000', 'is_present': False}]
+        self.client.post('/api/attendance/bulk_update/', {'date': '2025-01-06', 'records': records}, format='json')
+        self.assertEqual(self.summary(), (1, 1))
+        self.assert_in_sync()
+
+    def test_admin_list_editable_and_moves(self):
+        row = Attendance.objects.create(student=self.student, date=datetime.date(2025, 1, 5))
+        self.assertEqual(self.summary(), (1, 0))
+
+        # list_editable saves through ModelAdmin.save_model
+        row.meal_type = 'Non-Veg'
+        admin_site._registry[Attendance].save_model(RequestFactory().post('/'), row, None, True)
+        self.assertEqual(self.summary(), (1, 1))
+
+        # Moving a row to another month recounts both months
+        row.date = datetime.date(2025, 2, 5)
+        row.save()
+        self.assertIsNone(self.summary())
+        self.assertEqual(self.summary(period=datetime.date(2025, 2, 1)), (1, 1))
+        self.assert_in_sync()
+
+    def test_deletes(self):
+        for day in (5, 6):
+            Attendance.objects.create(student=self.student, date=datetime.date(2025, 1, day))
+        Attendance.objects.filter(date=datetime.date(2025, 1, 5)).delete()
+        self.assertEqual(self.summary(), (1, 0))
+        Attendance.objects.all().delete()
+        self.assertIsNone(self.summary())
+
+        Attendance.objects.create(student=self.student, date=datetime.date(2025, 1, 7))
+        self.student.delete()
+        self.assertFalse(MonthlyAttendanceSummary.objects.exists())
+
+    def test_rebuild_repairs_drift(self):
+        Attendance.objects.create(student=self.student, date=datetime.date(2025, 1, 5))
+        MonthlyAttendanceSummary.objects.update(present_days=9)
+        MonthlyAttendanceSummary.objects.create(student=self.other, period=datetime.date(2024, 1, 1), present_days=3)
+
+        with self.assertRaises(SystemExit):
+            call_command('rebuild_attendance_summaries', verify=True, stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_attendance_summaries', stdout=StringIO())
+        self.assertEqual(self.summary(), (1, 0))
+        self.assertIsNone(self.summary(self.other, datetime.date(2024, 1, 1)))
+        self.assert_in_sync()
+
+    def test_summary_endpoint_scoped_to_student(self):
+        Attendance.objects.create(student=self.student, date=datetime.date(2025, 1, 5))
+        Attendance.objects.create(student=self.other, date=datetime.date(2025, 1, 5))
+        self.client.force_authenticate(self.student.user)
+        rows = self.client.get('/api/attendance-summaries/?month=2025-01').data['results']
+        self.assertEqual([(row['student'], row['month'], row['present_days']) for row in rows],
+                         [(self.student.pk, '2025-01', 1)])
+
+
+class MenuCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.menu = Menu.objects.create(day='Monday', breakfast='Idli', lunch='Rice', dinner='Chapati')
+
+    def get_menu(self, **headers):
+        return self.client.get('/api/menu/', headers=headers)
+
+    def test_cached_reads_skip_the_database(self):
+        first = self.get_menu()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data[0]['lunch'], 'Rice')
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            second = self.get_menu()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_conditional_requests_get_304(self):
+        first = self.get_menu()
+        with self.assertNumQueries(0):
+            response = self.get_menu(if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+        response = self.get_menu(if_modified_since=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.get_menu(if_none_match='"stale"').status_code, 200)
+
+    def test_reads_ignore_the_token(self):
+        # Reads are public; a student's token is not even decoded.
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.get_menu().status_code, 200)
+        response = self.client.patch(f'/api/menu/{self.menu.pk}/', {'lunch': 'Biryani'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_api_writes_invalidate(self):
+        etag = self.get_menu()['ETag']
+        self.client.force_authenticate(make_staff())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/menu/{self.menu.pk}/', {'lunch': 'Biryani'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get_menu(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['lunch'], 'Biryani')
+        self.assertNotEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/menu/{self.menu.pk}/')
+        self.assertEqual(self.get_menu().data, [])
+
+    def test_admin_edits_invalidate(self):
+        self.get_menu()
+        admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/admin/mess_api/menu/{self.menu.pk}/change/', {
+                'day': 'Monday', 'breakfast': 'Dosa', 'lunch': 'Rice', 'dinner': 'Chapati',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.client.logout()
+        self.assertEqual(self.get_menu().data[0]['breakfast'], 'Dosa')
+
+    def test_unchanged_menu_keeps_its_etag(self):
+        etag = self.get_menu()['ETag']
+        invalidate_menu_cache()
+        self.assertEqual(self.get_menu(if_none_match=etag).status_code, 304)
+
+    def test_expired_entries_keep_last_modified_until_the_menu_changes(self):
+        first = self.get_menu()
+
+        def expire_entry():
+            # As after MENU_CACHE_TIMEOUT: the entry is gone, the version stays
+            cache.delete(f"menu:data:{cache.get(menu_cache.MENU_VERSION_KEY)['version']}")
+
+        later = time.time() + 2 * menu_cache.MENU_CACHE_TIMEOUT
+        with mock.patch('time.time', return_value=later):
+            expire_entry()
+            second = self.get_menu()
+            self.assertEqual(second['Last-Modified'], first['Last-Modified'])
+            self.assertEqual(self.get_menu(if_modified_since=first['Last-Modified']).status_code, 304)
+
+            # Edited where no signal reached this cache
+            Menu.objects.filter(pk=self.menu.pk).update(lunch='Biryani')
+            expire_entry()
+            third = self.get_menu(if_modified_since=first['Last-Modified'])
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual(third['Last-Modified'], http_date(later))
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.staff = make_staff()
+        self.students = [make_student(i) for i in range(3)]
+        for student in self.students:
+            for day in (5, 20):
+                Attendance.objects.create(student=student, date=datetime.date(2025, 1, day),
+                                          meal_type='Non-Veg' if day == 20 else 'Veg')
+            for month in (1, 2):
+                Bill.objects.create(student=student, period=datetime.date(2025, month, 1), amount=700)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_bills_csv_for_a_month(self):
+        self.client.force_authenticate(self.staff)
+        rows = list(csv.DictReader(self.export('/api/bills/export/?month=2025-01').splitlines()))
+        self.assertEqual([row['reg_num'] for row in rows], ['REG00000', 'REG00001', 'REG00002'])
+        self.assertEqual(rows[0]['month'], '2025-01')
+        self.assertEqual(rows[0]['amount'], '700.00')
+        self.assertEqual(self.client.get('/api/bills/export/?month=2025-13').status_code, 400)
+
+    def test_attendance_ndjson_scoped_to_student(self):
+        self.client.force_authenticate(self.students[1].user)
+        body = self.export('/api/attendance/export/?fmt=ndjson&start_date=2025-01-10&end_date=2025-01-31')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(rows, [{
+            'id': rows[0]['id'], 'reg_num': 'REG00001', 'username': self.students[1].user.username,
+            'date': '2025-01-20', 'is_present': True, 'meal_type': 'Non-Veg',
+        }])
+        self.assertEqual(self.client.get('/api/attendance/export/?fmt=xml').status_code, 400)
+
+    def test_rows_are_fetched_in_chunks(self):
+        rows = exports.iter_export_rows(Attendance.objects.all(), exports.ATTENDANCE_EXPORT_COLUMNS, chunk_size=2)
+        with CaptureQueriesContext(connection) as queries:
+            ids = [row[0] for row in rows]
+        self.assertEqual(ids, sorted(Attendance.objects.values_list('pk', flat=True)))
+        # 6 rows in chunks of 2, plus the empty read that ends the stream
+        self.assertEqual(len(queries), 4)
+
+
+class AttendanceImportTests(APITestCase):
+    register = (
+        "reg_num,date,is_present,meal_type\n"
+        "REG00000,2025-03-01,yes,Non-Veg\n"
+        "REG00001,2025-03-01,absent,\n"
+        "NOPE,2025-03-01,yes,Veg\n"
+        "REG00000,2025-03-02,,\n"
+        "REG00001,2025-03-32,yes,Veg\n"
+        "REG00001,2025-03-02,maybe,Veg\n"
+        "REG00000,2025-03-01,no,Veg\n"
+    )
+
+    def setUp(self):
+        self.students = [make_student(i) for i in range(2)]
+        Attendance.objects.create(student=self.students[1], date=datetime.date(2025, 3, 1))
+
+    def upload(self, text):
+        self.client.force_authenticate(make_staff())
+        upload = SimpleUploadedFile('register.csv', text.encode(), content_type='text/csv')
+        return self.client.post('/api/attendance/import/', {'file': upload}, format='multipart')
+
+    def marks(self):
+        return set(Attendance.objects.values_list('student__reg_num', 'date', 'is_present', 'meal_type'))
+
+    def test_imports_and_reports_lines(self):
+        response = self.upload(self.register)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['rows'], response.data['error_count']), (7, 3))
+        self.assertEqual(response.data['errors'], [
+            'Line 4: Student with reg_num NOPE not found',
+            "Line 6: Error for REG00001: invalid date '2025-03-32'",
+            "Line 7: Error for REG00001: invalid is_present 'maybe'",
+        ])
+        # Later lines for the same day win; blank columns take the defaults
+        self.assertEqual(self.marks(), {
+            ('REG00000', datetime.date(2025, 3, 1), False, 'Veg'),
+            ('REG00001', datetime.date(2025, 3, 1), False, 'Veg'),
+            ('REG00000', datetime.date(2025, 3, 2), True, 'Veg'),
+        })
+        self.assertEqual(
+            MonthlyAttendanceSummary.objects.get(student=self.students[0]).present_days, 1)
+
+    def test_queries_grow_per_batch_not_per_row(self):
+        lines = ["reg_num,date"] + [f"REG0000{i},2025-03-{day:02d}" for day in range(1, 9) for i in range(2)]
+
+        def import_queries(row_count):
+            # From an empty roll call each time: re-importing the same days moves no headcount.
+            Attendance.objects.all().delete()
+            with CaptureQueriesContext(connection) as queries:
+                report = attendance_ingest.import_attendance_csv(lines[:1 + row_count], batch_size=4)
+            self.assertEqual(report['written'], row_count)
+            return len(queries)
+
+        one_batch, two_batches, four_batches = import_queries(4), import_queries(8), import_queries(16)
+        self.assertEqual(four_batches, one_batch + 3 * (two_batches - one_batch))
+
+    def test_rejects_bad_uploads(self):
+        self.assertEqual(self.upload("name,day\nx,y\n").status_code, 400)
+        self.client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.client.post('/api/attendance/import/', {}, format='multipart').status_code, 403)
+
+    def test_management_command(self):
+        out, err = StringIO(), StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as register:
+            register.write(self.register)
+            register.flush()
+            call_command('import_attendance', register.name, batch_size=2, stdout=out, stderr=err)
+        self.assertIn('Imported 4 of 7 rows (3 errors)', out.getvalue())
+        self.assertIn('Line 4: Student with reg_num NOPE not found', err.getvalue())
+        self.assertEqual(len(self.marks()), 3)
+
+
+
+class ReconciliationTests(APITestCase):
+    statement = (
+        "Reg_Num,Month,Amount,Reference\n"
+        "REG00000,2025-01,900.50,A1\n"
+        "REG00000,2025-01,900.50,A2\n"       # the same bill twice
+        "REG00001,2025-01,\"1,000\",A3\n"   # wrong amount
+        "REG00001,,850,A4\n"                # month picked by the amount
+        "REG00002,2025-01,700,A5\n"         # already paid
+        "NOPE,2025-01,10,A6\n"
+        "REG00001,2025-01,abc,A7\n"
+        "REG00001,2025-01,1e30,A8\n"
+    )
+
+    def setUp(self):
+        self.students = [make_student(i) for i in range(3)]
+        jan, feb = datetime.date(2025, 1, 1), datetime.date(2025, 2, 1)
+        self.bills = {
+            ('REG00000', jan): Bill.objects.create(student=self.students[0], period=jan, amount=Decimal('900.50')),
+            ('REG00000', feb): Bill.objects.create(student=self.students[0], period=feb, amount=Decimal('900.50')),
+            ('REG00001', jan): Bill.objects.create(student=self.students[1], period=jan, amount=Decimal('850')),
+            ('REG00002', jan): Bill.objects.create(student=self.students[2], period=jan, amount=700, is_paid=True),
+        }
+
+    def upload(self, text, **data):
+        self.client.force_authenticate(make_staff())
+        upload = SimpleUploadedFile('statement.csv', text.encode(), content_type='text/csv')
+        return self.client.post('/api/bills/reconcile/', {'file': upload, **data}, format='multipart')
+
+    def paid(self):
+        return {key for key, bill in self.bills.items() if Bill.objects.get(pk=bill.pk).is_paid}
+
+    def test_matches_and_reports_each_line(self):
+        response = self.upload(self.statement)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual((data['lines'], data['paid'], data['total_paid']), (8, 2, '1750.50'))
+        self.assertEqual([(e['line'], e['bill'], e['month'], e['reference']) for e in data['matched']], [
+            (2, self.bills['REG00000', datetime.date(2025, 1, 1)].pk, '2025-01', 'A1'),
+            (5, self.bills['REG00001', datetime.date(2025, 1, 1)].pk, '2025-01', 'A4'),
+        ])
+        self.assertEqual([(e['line'], e['reason']) for e in data['ambiguous']], [
+            (3, 'bill already matched by line 2'),
+            (4, "amount 1000.00 does not match the bill's 850.00"),
+        ])
+        self.assertEqual([(e['line'], e['reason']) for e in data['unmatched']], [
+            (6, 'no unpaid bills for REG00002'),
+            (7, 'no unpaid bills for NOPE'),
+            (8, "invalid amount 'abc'"),
+            (9, "invalid amount '1e30'"),
+        ])
+        self.assertEqual(self.paid(), {('REG00000', datetime.date(2025, 1, 1)), ('REG00001', datetime.date(2025, 1, 1)),
+                                       ('REG00002', datetime.date(2025, 1, 1))})
+
+    def test_narration_lines_and_month_from_amount(self):
+        statement = (
+            "Date,Narration,Ref No,Credit\n"
+            "03/02/2025,UPI/SVU MESS/REG00001/JAN FEES,U1,850.00\n"
+            "03/02/2025,NEFT-REG00000-2025-02 MESS,U2,900.50\n"
+            "04/02/2025,UPI/REG00000,U3,900.50\n"
+            "05/02/2025,UPI/CANTEEN,U4,40\n"
+        )
+        report = reconciliation.reconcile_statement(statement.splitlines(keepends=True))
+        self.assertEqual([(e['reg_num'], e['month']) for e in report['matched']],
+                         [('REG00001', '2025-01'), ('REG00000', '2025-02')])
+        # January and February were both 900.50 when the file was read
+        self.assertEqual(report['ambiguous'][0]['reason'],
+                         'no month given and several unpaid bills of 900.50: 2025-01, 2025-02')
+        self.assertEqual(report['unmatched'][0]['reason'], 'no reg_num')
+        self.assertEqual(len(self.paid()), 3)
+
+    def test_dry_run_marks_nothing(self):
+        response = self.upload(self.statement, dry_run='true')
+        self.assertEqual((len(response.data['matched']), response.data['paid']), (2, 0))
+        self.assertEqual(self.paid(), {('REG00002', datetime.date(2025, 1, 1))})
+
+    def test_queries_do_not_grow_with_the_statement(self):
+        lines = ["reg_num,month,amount"] + ["REG00000,2025-01,900.50"] * 200
+
+        def reconcile_queries(count):
+            with CaptureQueriesContext(connection) as queries:
+                reconciliation.reconcile_statement(lines[:1 + count], dry_run=True)
+            return len(queries)
+
+        self.assertEqual(reconcile_queries(1), reconcile_queries(200))
+
+    def test_rejects_bad_uploads(self):
+        self.assertEqual(self.upload("date,narration\nx,y\n").status_code, 400)
+        self.client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.client.post('/api/bills/reconcile/', {}, format='multipart').status_code, 403)
+
+    def test_management_command(self):
+        out, err = StringIO(), StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as statement:
+            statement.write(self.statement)
+            statement.flush()
+            call_command('reconcile_payments', statement.name, dry_run=True, stdout=out, stderr=err)
+            self.assertIn('Dry run: 2 matched, 2 ambiguous, 4 unmatched of 8 lines', out.getvalue())
+            self.assertEqual(len(self.paid()), 1)
+            call_command('reconcile_payments', statement.name, stdout=out, stderr=err)
+        self.assertIn('2 bills marked paid (total 1750.50)', out.getvalue())
+        self.assertIn('Line 3 (ambiguous): REG00000 2025-01 900.50: bill already matched by line 2', err.getvalue())
+
+class BillingFormulaTests(SimpleTestCase):
+    rates = billing.parse_rates({'daily_rate': 65.1, 'nv_plate_rate': '27.005'})
+
+    def test_rates_are_exact_and_rounded_half_up(self):
+        self.assertEqual(self.rates['daily_rate'], Decimal('65.10'))
+        self.assertEqual(self.rates['nv_plate_rate'], Decimal('27.01'))
+        self.assertEqual(self.rates['room_rent'], Decimal('150.00'))
+        self.assertEqual(billing.fixed_total(self.rates), Decimal('700.00'))
+        # 3 * 0.1 is 0.30000000000000004 in floats
+        dime = billing.parse_rates(dict(dict.fromkeys(billing.RATE_FIELDS, 0), daily_rate=0.1))
+        self.assertEqual(billing.bill_amount(3, 0, dime), Decimal('0.30'))
+
+    def test_batch_matches_single_bills(self):
+        present, nv = [0, 31, 12, 12, 5], [0, 31, 2, 2, 0]
+        amounts = billing.bill_amounts(present, nv, self.rates)
+        self.assertEqual(amounts, [billing.bill_amount(p, n, self.rates) for p, n in zip(present, nv)])
+        self.assertEqual(amounts[2], Decimal('12') * Decimal('65.10') + 2 * Decimal('27.01') + 700)
+        self.assertEqual(billing.bill_amounts([], [], self.rates), [])
+
+    def test_invalid_rates(self):
+        for values in ({'nv_plate_rate': 27}, {'daily_rate': 'abc', 'nv_plate_rate': 27},
+                       {'daily_rate': -1, 'nv_plate_rate': 27}, {'daily_rate': 'NaN', 'nv_plate_rate': 27},
+                       {'daily_rate': '1e30', 'nv_plate_rate': 27}, {'daily_rate': 10000, 'nv_plate_rate': 27}):
+            with self.assertRaises(ValueError):
+                billing.parse_rates(values)
+        with self.assertRaises(ValueError):
+            billing.to_money('1e30')
+
+    def test_rate_limits_match_the_bill_columns(self):
+        for name, max_digits in billing.RATE_MAX_DIGITS.items():
+            field = Bill._meta.get_field(name)
+            self.assertEqual((field.max_digits, field.decimal_places), (max_digits, 2), name)
+
+
+class BillingJobTests(APITestCase):
+    rates = {
+        'daily_rate': 65, 'nv_plate_rate': 27, 'room_rent': 150,
+        'water_charges': 125, 'electricity_charges': 150, 'establishment_charges': 275,
+    }
+    period = datetime.date(2025, 1, 1)
+
+    def setUp(self):
+        for i in range(5):
+            make_student(i)
+
+    def test_request_returns_before_any_bill_exists(self):
+        self.client.force_authenticate(make_staff())
+        response = self.client.post('/api/bills/generate_bills/', dict(self.rates, month='2025-01'), format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertFalse(Bill.objects.exists())
+        job = self.client.get(f"/api/billing-jobs/{response.data['job_id']}/").data
+        self.assertEqual((job['month'], job['status'], job['processed']), ('2025-01', 'queued', 0))
+        # Rates are queued as exact decimal strings
+        self.assertEqual(job['rates']['daily_rate'], '65.00')
+        bad = self.client.post('/api/bills/generate_bills/', dict(self.rates, month='2025-01', room_rent=-5), format='json')
+        self.assertEqual(bad.status_code, 400)
+
+        # Students cannot see the queue
+        self.client.force_authenticate(StudentProfile.objects.first().user)
+        self.assertEqual(self.client.get(f"/api/billing-jobs/{response.data['job_id']}/").status_code, 404)
+
+    def test_a_job_is_claimed_once(self):
+        first = jobs.enqueue_billing_job(self.period, self.rates)
+        second = jobs.enqueue_billing_job(self.period, self.rates)
+        self.assertEqual(jobs.claim_next_job('worker-a').pk, first.pk)
+        self.assertEqual(jobs.claim_next_job('worker-b').pk, second.pk)
+        self.assertIsNone(jobs.claim_next_job('worker-c'))
+
+    def test_progress_is_saved_per_chunk(self):
+        job = jobs.enqueue_billing_job(self.period, self.rates)
+        job = jobs.claim_next_job('worker-a')
+        seen = []
+        original = jobs._save_progress
+
+        def record(job, **fields):
+            original(job, **fields)
+            seen.append(BillingJob.objects.values_list('processed', 'total').get(pk=job.pk))
+
+        jobs._save_progress = record
+        try:
+            jobs.run_billing_job(job, chunk_size=2)
+        finally:
+            jobs._save_progress = original
+        self.assertEqual(seen, [(0, 5), (2, 5), (4, 5), (5, 5), (5, 5)])
+        self.assertEqual(Bill.objects.count(), 5)
+
+    def test_abandoned_jobs_are_retried_then_failed(self):
+        job = jobs.enqueue_billing_job(self.period, self.rates)
+        jobs.claim_next_job('worker-a')
+        self.assertIsNone(jobs.claim_next_job('worker-b'))
+
+        stale = timezone.now() - datetime.timedelta(seconds=jobs.STALE_JOB_SECONDS + 1)
+        BillingJob.objects.update(heartbeat_at=stale)
+        reclaimed = jobs.claim_next_job('worker-b')
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (job.pk, 2))
+        # The first worker notices it lost the job at its next progress update
+        with self.assertRaises(jobs.JobLost):
+            jobs.run_billing_job(BillingJob(pk=job.pk, worker='worker-a', period=self.period, rates=self.rates))
+
+        BillingJob.objects.update(attempts=jobs.MAX_JOB_ATTEMPTS, heartbeat_at=stale)
+        self.assertIsNone(jobs.claim_next_job('worker-c'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, BillingJob.FAILED)
+        self.assertIn('Gave up after 3 attempts', job.errors[0])
+
+    def test_month_range_in_one_job(self):
+        students = list(StudentProfile.objects.order_by('pk'))
+        for month in (1, 2, 3):
+            Attendance.objects.create(student=students[0], date=datetime.date(2025, month, 5), meal_type='Non-Veg')
+        self.client.force_authenticate(make_staff())
+        response = self.client.post('/api/bills/generate_bills/', dict(
+            self.rates, month='2025-01', end_month='2025-03', rate_cards={'2025-02': {'daily_rate': '70'}},
+        ), format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['message'], 'Bill generation for 2025-01 to 2025-03 queued.')
+
+        call_command('run_billing_worker', once=True, stdout=StringIO())
+        job = BillingJob.objects.get()
+        self.assertEqual((job.status, job.total, job.created_count), (BillingJob.DONE, 15, 15))
+        amounts = dict(
+            Bill.objects.filter(student=students[0]).values_list('period', 'amount')
+        )
+        self.assertEqual(amounts, {
+            datetime.date(2025, 1, 1): Decimal('792.00'),
+            datetime.date(2025, 2, 1): Decimal('797.00'),
+            datetime.date(2025, 3, 1): Decimal('792.00'),
+        })
+        self.assertEqual(Bill.objects.get(student=students[0], period=datetime.date(2025, 2, 1)).daily_rate, 70)
+
+        # The counts of all months come from one query
+        with CaptureQueriesContext(connection) as one_month:
+            build_bills(self.period, self.rates)
+        with CaptureQueriesContext(connection) as three_months:
+            build_bills(self.period, self.rates, end_period=datetime.date(2025, 3, 1))
+        self.assertEqual(len(one_month), len(three_months))
+
+    def test_month_range_validation(self):
+        self.client.force_authenticate(make_staff())
+        for extra in ({'end_month': '2024-12'}, {'end_month': '2026-01'},
+                      {'end_month': '2025-02', 'rate_cards': {'2025-03': {'daily_rate': 70}}},
+                      {'rate_cards': {'2025-01': {'daily_rate': 'x'}}}, {'rate_cards': {'2025-01': {'tip': 5}}}):
+            response = self.client.post('/api/bills/generate_bills/', dict(self.rates, month='2025-01', **extra), format='json')
+            self.assertEqual(response.status_code, 400, extra)
+        for month in ('January', '2025-1x', '2025-13'):
+            response = self.client.post('/api/bills/generate_bills/', dict(
+                self.rates, month='2025-01', rate_cards={month: {'daily_rate': 70}},
+            ), format='json')
+            self.assertEqual(response.status_code, 400, month)
+            self.assertEqual(response.data['error'], f"Rate card {month!r}: Expected a month in YYYY-MM format.")
+        self.assertFalse(BillingJob.objects.exists())
+
+    def test_errors_are_recorded(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue_billing_job(self.period, {'daily_rate': 65})
+        # e.g. a job queued before rates were validated on enqueue
+        BillingJob.objects.create(period=self.period, rates={'daily_rate': 65})
+        job = jobs.run_billing_job(jobs.claim_next_job('worker-a'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, BillingJob.FAILED)
+        self.assertEqual(job.errors, ["ValueError: nv_plate_rate is required."])
+        self.assertFalse(Bill.objects.exists())
+
+
+class SeedDataTests(APITestCase):
+    def snapshot(self):
+        return (
+            list(StudentProfile.objects.order_by('reg_num').values_list('reg_num', 'branch', 'year', 'phone')),
+            list(Attendance.objects.order_by('student__reg_num', 'date')
+                 .values_list('student__reg_num', 'date', 'is_present', 'meal_type')),
+            list(Bill.objects.order_by('student__reg_num', 'period')
+                 .values_list('student__reg_num', 'period', 'amount', 'is_paid')),
+        )
+
+    def test_seed_is_deterministic_and_consistent(self):
+        out = StringIO()
+        call_command('seed_data', students=6, days=40, months=2, seed=7, stdout=out)
+        self.assertIn('students=6, attendance=240, bills=12', out.getvalue())
+        first = self.snapshot()
+
+        # Re-seeding with the same arguments leaves the same data
+        call_command('seed_data', students=6, days=40, months=2, seed=7, stdout=StringIO())
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(call_command('rebuild_attendance_summaries', verify=True, stdout=StringIO()), None)
+
+        # Bills match the seeded attendance
+        summary = MonthlyAttendanceSummary.objects.get(student__reg_num='SEED000000', period=datetime.date(2025, 1, 1))
+        bill = Bill.objects.get(student__reg_num='SEED000000', period=datetime.date(2025, 1, 1))
+        self.assertEqual(bill.amount, summary.present_days * 65 + summary.nv_days * 27 + 700)
+
+        # Seeded accounts can log in
+        response = self.client.post('/api/login/', {'username': 'seed_staff', 'password': 'seedpass123', 'role': 'staff'})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_QUERY_BUDGET=5, REQUEST_TIMING_LATENCY_BUDGET_MS=10_000)
+class RequestTimingTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+
+    def test_server_timing_and_log_line(self):
+        make_student(0)
+        with self.assertLogs('mess_api.timing', 'INFO') as logs:
+            response = self.client.get('/api/profiles/')
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;desc="1 queries";dur=[\d.]+, serialize;dur=[\d.]+, total;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual((record['path'], record['status'], record['queries']), ('/api/profiles/', 200, 1))
+        self.assertGreater(record['serializer_ms'], 0)
+        self.assertNotIn('top_queries', record)
+
+    def test_requests_over_budget_list_repeated_sql(self):
+        students = [make_student(i) for i in range(8)]
+
+        def n_plus_one_view(request):
+            for student in students:
+                StudentProfile.objects.get(pk=student.pk)
+            User.objects.count()
+            return HttpResponse()
+
+        middleware = RequestTimingMiddleware(n_plus_one_view)
+        with self.assertLogs('mess_api.timing', 'WARNING') as logs:
+            middleware(RequestFactory().get('/slow/'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 9)
+        self.assertEqual(record['top_queries'][0]['count'], 8)
+        self.assertIn('mess_api_studentprofile', record['top_queries'][0]['sql'])
+        self.assertEqual(record['top_queries'][1]['count'], 1)
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_disabled_is_out_of_the_chain(self):
+        response = self.client.get('/api/menu/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class RosterTests(APITestCase):
+    url = '/api/attendance/roster/'
+
+    def setUp(self):
+        self.students = [make_student(i, branch='ECE' if i % 2 else 'CSE', year=1 + i % 3) for i in range(6)]
+        Attendance.objects.create(student=self.students[0], date=datetime.date(2025, 1, 5), meal_type='Non-Veg')
+        Attendance.objects.create(student=self.students[1], date=datetime.date(2025, 1, 5), is_present=False)
+        Attendance.objects.create(student=self.students[2], date=datetime.date(2025, 1, 6))
+        self.client.force_authenticate(make_staff())
+
+    def test_every_student_with_the_days_mark_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'date': '2025-01-05'})
+        rows = response.data['results']
+        self.assertEqual([row['reg_num'] for row in rows], [f'REG{i:05d}' for i in range(6)])
+        self.assertEqual(rows[0], {
+            'student': self.students[0].pk, 'reg_num': 'REG00000', 'name': self.students[0].user.username,
+            'branch': 'CSE', 'year': 1, 'is_present': True, 'meal_type': 'Non-Veg',
+        })
+        self.assertEqual((rows[1]['is_present'], rows[1]['meal_type']), (False, 'Veg'))
+        # Marked on another day only: unmarked here
+        self.assertEqual((rows[2]['is_present'], rows[2]['meal_type']), (None, None))
+
+    def test_filters_and_pages(self):
+        rows = self.client.get(self.url, {'date': '2025-01-05', 'branch': 'ECE', 'year': 2}).data['results']
+        self.assertEqual([row['reg_num'] for row in rows], ['REG00001'])
+
+        first = self.client.get(self.url, {'date': '2025-01-05', 'page_size': 4}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(first['results']) + len(second['results']), 6)
+        self.assertIsNone(second['next'])
+
+    def test_requires_staff_and_a_date(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'date': '2025-01-05', 'year': 'x'}).status_code, 400)
+        self.client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.client.get(self.url, {'date': '2025-01-05'}).status_code, 403)
+
+
+class StudentDashboardTests(APITestCase):
+    url = '/api/dashboard/'
+    today = datetime.date(2025, 3, 12)  # a Wednesday
+
+    def setUp(self):
+        cache.clear()
+        self.student = make_student(0)
+        Menu.objects.create(day='Wednesday', breakfast='Dosa', lunch='Biryani', dinner='Chapati')
+        Menu.objects.create(day='Thursday', breakfast='Poha', lunch='Rice', dinner='Puri')
+        self.client.force_authenticate(self.student.user)
+
+    def add_history(self, months):
+        for month in months:
+            for day in (1, 2, 3):
+                Attendance.objects.create(student=self.student, date=datetime.date(2025, month, day),
+                                          meal_type='Non-Veg' if day == 3 else 'Veg')
+            Bill.objects.create(student=self.student, period=datetime.date(2025, month, 1),
+                                amount=Decimal('900.50'), is_paid=month == 1)
+
+    def get(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=self.today):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_summary(self):
+        self.add_history([1, 2])
+        Attendance.objects.create(student=self.student, date=datetime.date(2025, 3, 10))
+        data = self.get()
+        self.assertEqual((data['profile']['reg_num'], data['profile']['user']['username']),
+                         (self.student.reg_num, self.student.user.username))
+        self.assertEqual(data['menu']['lunch'], 'Biryani')
+        self.assertEqual((data['month'], data['attendance']), ('2025-03', {'present_days': 1, 'nv_days': 0}))
+        self.assertEqual(data['latest_bill']['month'], '2025-02')
+        self.assertEqual(data['latest_bill_attendance'], {'present_days': 3, 'nv_days': 1})
+        self.assertEqual(data['unpaid'], {'count': 1, 'total': '900.50'})
+
+    def test_new_student(self):
+        data = self.get()
+        self.assertIsNone(data['latest_bill'])
+        self.assertEqual(data['attendance'], {'present_days': 0, 'nv_days': 0})
+        self.assertEqual(data['unpaid'], {'count': 0, 'total': '0.00'})
+
+    def test_queries_do_not_grow_with_history(self):
+        self.add_history([1])
+        self.get()  # warm the menu cache
+        with CaptureQueriesContext(connection) as short:
+            self.get()
+        self.add_history([2, 3, 4, 5, 6])
+        with CaptureQueriesContext(connection) as long:
+            self.get()
+        self.assertEqual(len(short), len(long))
+        self.assertLessEqual(len(long), 5)
+
+    def test_staff_have_no_dashboard(self):
+        self.client.force_authenticate(make_staff())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = make_student(0)
+        self.student.user.set_password('pass12345')
+        self.student.user.save()
+
+    def login(self, username='student0', role='student'):
+        response = self.client.post('/api/login/', {'username': username, 'password': 'pass12345', 'role': role})
+        self.assertEqual(response.status_code, 200)
+        return response.data['access']
+
+    def use(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login_token_carries_role_claims(self):
+        token = AccessToken(self.login())
+        self.assertEqual(
+            (token['username'], token['is_student'], token['is_staff_member'], token['student_profile_id']),
+            ('student0', True, False, self.student.pk),
+        )
+        refreshed = self.client.post('/api/token/refresh/', {'refresh': str(RefreshToken.for_user(self.student.user))})
+        self.assertEqual(refreshed.status_code, 200)
+
+    def test_scoped_lists_make_no_user_queries(self):
+        Bill.objects.create(student=self.student, period=datetime.date(2025, 1, 1), amount=100)
+        self.use(self.login())
+        self.client.get('/api/attendance-summaries/')  # caches the account state
+        for url in ('/api/attendance-summaries/', '/api/attendance/', '/api/dashboard/'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertFalse([q for q in queries if 'FROM "mess_api_user"' in q['sql']], url)
+
+    def test_deactivated_account_is_rejected(self):
+        self.use(self.login())
+        self.assertEqual(self.client.get('/api/bills/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.user.is_active = False
+            self.student.user.save()
+        self.assertEqual(self.client.get('/api/bills/').status_code, 401)
+
+    def test_profile_created_after_login(self):
+        user = User.objects.create_user('newcomer', password='pass12345', is_student=True)
+        self.use(self.login('newcomer'))
+        self.assertEqual(self.client.get('/api/dashboard/').status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/profiles/', {'reg_num': 'NEW001', 'branch': 'ECE', 'year': 1})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get('/api/dashboard/').status_code, 200)
+        self.assertEqual(StudentProfile.objects.get(reg_num='NEW001').user, user)
+
+    def test_tokens_without_claims_load_the_user(self):
+        self.use(AccessToken.for_user(self.student.user))
+        self.assertEqual(self.client.get('/api/me/').data['username'], 'student0')
+        self.assertEqual(self.client.get('/api/dashboard/').status_code, 200)
+
+    def test_staff_job_records_requester(self):
+        staff = make_staff()
+        staff.set_password('pass12345')
+        staff.save()
+        self.use(self.login('staff', 'staff'))
+        response = self.client.post('/api/bills/generate_bills/', {'month': '2025-01', 'daily_rate': 65, 'nv_plate_rate': 27})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(BillingJob.objects.get().requested_by, staff)
+
+
+class IncrementalRebillTests(APITestCase):
+    rates = {'daily_rate': 65, 'nv_plate_rate': 27}
+    period = datetime.date(2025, 1, 1)
+
+    def setUp(self):
+        self.students = [make_student(i) for i in range(4)]
+        generate_monthly_bills(self.period, self.rates)
+        self.client.force_authenticate(make_staff())
+
+    def flagged(self):
+        return set(Bill.objects.filter(needs_rebill=True).values_list('student__reg_num', flat=True))
+
+    def test_every_write_path_flags_the_bill(self):
+        mark = Attendance.objects.create(student=self.students[0], date=datetime.date(2025, 1, 3))
+        self.assertEqual(self.flagged(), {'REG00000'})
+        attendance_ingest.bulk_mark_attendance(datetime.date(2025, 1, 4), [
+            {'reg_num': 'REG00001', 'is_present': True, 'meal_type': 'Veg'},
+        ])
+        attendance_ingest.import_attendance_csv(['reg_num,date,is_present,meal_type', 'REG00002,2025-01-05,yes,Veg'])
+        self.assertEqual(self.flagged(), {'REG00000', 'REG00001', 'REG00002'})
+
+        # Changes in months without bills flag nothing
+        Attendance.objects.create(student=self.students[3], date=datetime.date(2025, 2, 1))
+        self.assertEqual(len(self.flagged()), 3)
+
+        # Regenerating clears the flags
+        generate_monthly_bills(self.period, self.rates)
+        self.assertEqual(self.flagged(), set())
+        mark.delete()
+        self.assertEqual(self.flagged(), {'REG00000'})
+
+    def test_unchanged_counts_flag_nothing(self):
+        attendance_ingest.bulk_mark_attendance(datetime.date(2025, 1, 4), [
+            {'reg_num': 'REG00000'}, {'reg_num': 'REG00001', 'is_present': False},
+        ])
+        generate_monthly_bills(self.period, self.rates)
+        # The staff screen saves the whole roster again, unchanged
+        attendance_ingest.bulk_mark_attendance(datetime.date(2025, 1, 4), [
+            {'reg_num': 'REG00000'}, {'reg_num': 'REG00001', 'is_present': False},
+        ])
+        Attendance.objects.get(student=self.students[0]).save()
+        # An absent day marked absent again, or a new absent day, counts nothing either
+        Attendance.objects.create(student=self.students[2], date=datetime.date(2025, 1, 5), is_present=False)
+        self.assertEqual(self.flagged(), set())
+
+        attendance_ingest.bulk_mark_attendance(datetime.date(2025, 1, 4), [
+            {'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}, {'reg_num': 'REG00001', 'is_present': False},
+        ])
+        self.assertEqual(self.flagged(), {'REG00000'})
+
+    def test_rebill_recomputes_only_flagged_bills(self):
+        Bill.objects.filter(student=self.students[1]).update(daily_rate=80)
+        for day in (3, 4):
+            Attendance.objects.create(student=self.students[1], date=datetime.date(2025, 1, day), meal_type='Non-Veg')
+        self.assertEqual(self.client.get('/api/bills/rebill/').data, {'pending': 1, 'months': {'2025-01': 1}})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/bills/rebill/')
+        self.assertEqual(response.data['rebilled'], 1)
+        self.assertLessEqual(len(queries), 6)
+        # Recomputed with the rates the bill was generated with
+        self.assertEqual(Bill.objects.get(student=self.students[1]).amount, Decimal('914.00'))
+        self.assertEqual(Bill.objects.get(student=self.students[0]).amount, Decimal('700.00'))
+        self.assertEqual(self.client.get('/api/bills/rebill/').data['pending'], 0)
+
+        self.client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.client.post('/api/bills/rebill/').status_code, 403)
+
+    def test_fix_between_build_and_write_is_billed(self):
+        # A job builds every bill up front and writes the chunks later
+        Attendance.objects.create(student=self.students[0], date=datetime.date(2025, 1, 3))
+        bills, _ = build_bills(self.period, self.rates)
+        Attendance.objects.create(student=self.students[0], date=datetime.date(2025, 1, 4))
+        self.assertEqual(self.flagged(), {'REG00000'})
+
+        billing_engine.write_bills([bill for bill in bills if bill.student_id == self.students[0].pk])
+        bill = Bill.objects.get(student=self.students[0])
+        self.assertEqual((bill.amount, bill.needs_rebill), (Decimal('830.00'), False))
+
+
+class AttendanceArchiveTests(APITestCase):
+    def setUp(self):
+        self.student = make_student(0)
+        self.other = make_student(1)
+        for day in (datetime.date(2024, 5, 30), datetime.date(2024, 5, 31), datetime.date(2024, 6, 1), datetime.date(2024, 6, 2)):
+            Attendance.objects.create(student=self.student, date=day, meal_type='Non-Veg' if day.day == 31 else 'Veg')
+        Attendance.objects.create(student=self.other, date=datetime.date(2024, 5, 30))
+        generate_monthly_bills(datetime.date(2024, 5, 1), {'daily_rate': 65, 'nv_plate_rate': 27})
+        self.client.force_authenticate(self.student.user)
+
+    def summaries(self):
+        return list(MonthlyAttendanceSummary.objects.order_by('pk').values_list('student_id', 'period', 'present_days', 'nv_days'))
+
+    def history(self, url='/api/attendance/?page_size=2'):
+        dates = []
+        while url:
+            page = self.client.get(url).data
+            dates += [row['date'] for row in page['results']]
+            url = page['next']
+        return dates
+
+    def test_archiving_moves_rows_in_batches(self):
+        summaries = self.summaries()
+        bills = list(Bill.objects.order_by('pk').values_list('amount', 'needs_rebill'))
+        history = self.history()
+
+        out = StringIO()
+        call_command('archive_attendance', before=datetime.date(2024, 6, 1), batch_size=2, stdout=out)
+        self.assertIn('Archived 3 attendance rows before 2024-06-01 in 2 batches', out.getvalue())
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(ArchivedAttendance.objects.count(), 3)
+
+        # Summaries, bills and the audit check are untouched
+        self.assertEqual(self.summaries(), summaries)
+        self.assertEqual(list(Bill.objects.order_by('pk').values_list('amount', 'needs_rebill')), bills)
+        call_command('rebuild_attendance_summaries', verify=True, stdout=StringIO())
+
+        # The history reads both tables, across page boundaries
+        self.assertEqual(self.history(), history)
+        self.assertEqual(history, ['2024-06-02', '2024-06-01', '2024-05-31', '2024-05-30'])
+        self.assertEqual(self.history('/api/attendance/?start_date=2024-05-31&end_date=2024-06-01'), ['2024-06-01', '2024-05-31'])
+        rows = list(csv.DictReader(self.client.get('/api/attendance/export/').getvalue().decode().splitlines()))
+        self.assertEqual(len(rows), 4)
+
+    def test_archived_months_are_read_only(self):
+        archive.archive_attendance(datetime.date(2024, 6, 1))
+        self.assertEqual(archive.archive_cutoff(), datetime.date(2024, 6, 1))
+        may = datetime.date(2024, 5, 1)
+        summaries = [row for row in self.summaries() if row[1] == may]
+        message = 'Attendance before 2024-06-01 is archived and read-only.'
+
+        self.client.force_authenticate(make_staff())
+        response = self.client.post('/api/attendance/bulk_update/', {
+            'date': '2024-05-30', 'records': [{'reg_num': 'REG00001'}],
+        }, format='json')
+        self.assertEqual((response.status_code, response.data), (400, {'error': message}))
+        report = attendance_ingest.import_attendance_csv(['reg_num,date', 'REG00001,2024-05-30', 'REG00001,2024-06-03'])
+        self.assertEqual((report['written'], report['errors']), (1, [f'Line 2: Error for REG00001: {message}']))
+
+        self.client.force_authenticate(self.other.user)
+        response = self.client.post('/api/attendance/', {'student': self.other.pk, 'date': '2024-05-29'}, format='json')
+        self.assertEqual((response.status_code, response.data['date']), (400, [message]))
+        form = modelform_factory(Attendance, form=mess_admin.AttendanceForm, fields='__all__')(data={
+            'student': self.other.pk, 'date': '2024-05-29', 'is_present': 'on', 'meal_type': 'Veg',
+        })
+        self.assertEqual(form.errors['date'], [message])
+
+        # Nothing landed in the hot table for an archived day
+        self.assertFalse(Attendance.objects.filter(date__lt=datetime.date(2024, 6, 1)).exists())
+        self.assertEqual([row for row in self.summaries() if row[1] == may], summaries)
+        call_command('rebuild_attendance_summaries', verify=True, stdout=StringIO())
+        call_command('rebuild_headcounts', verify=True, stdout=StringIO())
+
+    def test_refuses_pending_rebills_and_split_months(self):
+        Bill.objects.filter(student=self.other).update(needs_rebill=True)
+        with self.assertRaisesMessage(ValueError, 'need rebilling first'):
+            archive.archive_attendance(datetime.date(2024, 6, 1))
+        with self.assertRaisesMessage(ValueError, 'first day of a month'):
+            archive.archive_attendance(datetime.date(2024, 6, 15))
+        self.assertFalse(ArchivedAttendance.objects.exists())
+
+    @override_settings(ACADEMIC_YEAR_START_MONTH=6)
+    def test_academic_year_start(self):
+        self.assertEqual(archive.academic_year_start(datetime.date(2025, 3, 1)), datetime.date(2024, 6, 1))
+        self.assertEqual(archive.academic_year_start(datetime.date(2025, 6, 1)), datetime.date(2025, 6, 1))
+
+
+
+@override_settings(ATTENDANCE_STORAGE='bitmap')
+class BitmapAttendanceTests(APITestCase):
+    def setUp(self):
+        self.students = [make_student(i) for i in range(3)]
+        self.staff = make_staff()
+        self.client.force_authenticate(self.staff)
+
+    def mark(self, date, records):
+        response = self.client.post('/api/attendance/bulk_update/', {'date': date, 'records': records}, format='json')
+        self.assertEqual(response.data['errors'], [])
+
+    def summaries(self):
+        return list(MonthlyAttendanceSummary.objects.order_by('student_id', 'period')
+                    .values_list('student_id', 'period', 'present_days', 'nv_days'))
+
+    def history(self, url='/api/attendance/?page_size=2'):
+        rows = []
+        while url:
+            page = self.client.get(url).data
+            rows += [(row['student'], row['date'], row['is_present'], row['meal_type']) for row in page['results']]
+            url = page['next']
+        return rows
+
+    def test_writes_pack_days_into_month_rows(self):
+        self.mark('2025-01-01', [{'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}, {'reg_num': 'REG00001', 'is_present': False}])
+        self.mark('2025-01-31', [{'reg_num': 'REG00000'}, {'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}])
+        # A later roll call overwrites the day; other days keep their bits
+        self.mark('2025-01-01', [{'reg_num': 'REG00001', 'meal_type': 'Non-Veg'}])
+        self.mark('2025-02-03', [{'reg_num': 'REG00000', 'is_present': False, 'meal_type': 'Non-Veg'}])
+
+        self.assertFalse(Attendance.objects.exists())
+        masks = {
+            (student_id, period): masks for student_id, period, *masks in
+            AttendanceMonth.objects.values_list('student_id', 'period', 'marked_mask', 'present_mask', 'nv_mask')
+        }
+        jan, feb = datetime.date(2025, 1, 1), datetime.date(2025, 2, 1)
+        first, last = 1, 1 << 30
+        self.assertEqual(masks, {
+            (self.students[0].pk, jan): [first | last, first | last, first | last],
+            (self.students[1].pk, jan): [first, first, first],
+            (self.students[0].pk, feb): [1 << 2, 0, 1 << 2],
+        })
+        self.assertEqual(list(attendance_bitmap.unpack(feb, *masks[(self.students[0].pk, feb)])),
+                         [(datetime.date(2025, 2, 3), False, 'Non-Veg')])
+
+        # Popcounts match the summaries the bills are priced from
+        self.assertEqual(self.summaries(), [(self.students[0].pk, jan, 2, 2), (self.students[1].pk, jan, 1, 1)])
+        self.assertEqual(attendance_bitmap.monthly_counts(jan, feb), monthly_counts(jan, feb))
+        call_command('rebuild_attendance_summaries', verify=True, stdout=StringIO())
+
+    def test_reads_match_the_row_layout(self):
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            self.mark('2025-01-05', [{'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}, {'reg_num': 'REG00001', 'is_present': False}])
+            self.mark('2025-01-06', [{'reg_num': 'REG00000'}])
+            self.mark('2025-02-01', [{'reg_num': 'REG00002', 'meal_type': 'Non-Veg'}])
+            history = self.history()
+            roster = self.client.get('/api/attendance/roster/', {'date': '2025-01-05'}).data['results']
+            export = self.client.get('/api/attendance/export/', {'fmt': 'ndjson'}).getvalue()
+            summaries = self.summaries()
+
+        out = StringIO()
+        call_command('convert_attendance', batch_size=2, stdout=out)
+        self.assertIn('Moved 4 attendance days to the bitmap layout in 2 batches', out.getvalue())
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(AttendanceMonth.objects.count(), 3)
+
+        self.assertEqual(self.summaries(), summaries)
+        # Newest first; days of one date follow the ids, which are new
+        self.assertEqual([row[1] for row in self.history()], [row[1] for row in history])
+        self.assertCountEqual(self.history(), history)
+        self.assertCountEqual(self.history('/api/attendance/?date=2025-01-05'), history[2:4])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/attendance/roster/', {'date': '2025-01-05'}).data['results'], roster)
+        # Same rows, new ids
+        strip_ids = lambda body: [dict(json.loads(line), id=None) for line in body.splitlines()]
+        self.assertCountEqual(strip_ids(self.client.get('/api/attendance/export/', {'fmt': 'ndjson'}).getvalue()), strip_ids(export))
+
+        # And back
+        out = StringIO()
+        call_command('convert_attendance', to='rows', stdout=out, stderr=StringIO())
+        self.assertIn('Moved 4 attendance days to the rows layout', out.getvalue())
+        self.assertFalse(AttendanceMonth.objects.exists())
+        self.assertEqual(self.summaries(), summaries)
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            self.assertCountEqual(self.history(), history)
+
+    def test_single_day_endpoints(self):
+        student = self.students[0]
+        self.client.force_authenticate(student.user)
+        response = self.client.post('/api/attendance/', {'student': student.pk, 'date': '2025-01-05', 'meal_type': 'Non-Veg'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(response.data['id'], 0)
+        self.assertEqual((response.data['date'], response.data['is_present']), ('2025-01-05', True))
+        duplicate = self.client.post('/api/attendance/', {'student': student.pk, 'date': '2025-01-05'}, format='json')
+        self.assertEqual(duplicate.status_code, 400)
+
+        url = f"/api/attendance/{response.data['id']}/"
+        self.assertEqual(self.client.get(url).data['meal_type'], 'Non-Veg')
+        # Moving the day to another month clears it in the old one
+        moved = self.client.patch(url, {'date': '2025-02-07', 'meal_type': 'Veg'}, format='json')
+        self.assertEqual(moved.status_code, 200)
+        self.assertEqual((moved.data['date'], moved.data['meal_type']), ('2025-02-07', 'Veg'))
+        self.assertFalse(AttendanceMonth.objects.filter(period=datetime.date(2025, 1, 1)).exists())
+        self.assertEqual(self.summaries(), [(student.pk, datetime.date(2025, 2, 1), 1, 0)])
+
+        self.assertEqual(self.client.delete(f"/api/attendance/{moved.data['id']}/").status_code, 204)
+        self.assertFalse(AttendanceMonth.objects.exists())
+        self.assertEqual(self.summaries(), [])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_days_cannot_exist_in_both_layouts(self):
+        student = self.students[0]
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            Attendance.objects.create(student=student, date=datetime.date(2025, 1, 5))
+        self.client.force_authenticate(student.user)
+        duplicate = self.client.post('/api/attendance/', {'student': student.pk, 'date': '2025-01-05'}, format='json')
+        self.assertEqual(duplicate.status_code, 400)
+        self.assertFalse(AttendanceMonth.objects.exists())
+
+        # The admin cannot add Attendance rows next to the bitmaps
+        request = RequestFactory().get('/admin/')
+        request.user = User.objects.create(username='root', is_staff=True, is_superuser=True)
+        attendance_admin = mess_admin.AttendanceAdmin(Attendance, admin_site)
+        inline = mess_admin.AttendanceInline(StudentProfile, admin_site)
+        self.assertEqual(
+            (attendance_admin.has_add_permission(request), attendance_admin.has_change_permission(request),
+             attendance_admin.has_delete_permission(request), inline.has_add_permission(request, None)),
+            (False, False, False, False),
+        )
+        self.assertTrue(attendance_admin.has_view_permission(request))
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            self.assertTrue(attendance_admin.has_add_permission(request))
+            self.assertTrue(inline.has_change_permission(request))
+        self.assertEqual(monthly_counts(datetime.date(2025, 1, 1), datetime.date(2025, 1, 1)),
+                         {(student.pk, datetime.date(2025, 1, 1)): (1, 0)})
+
+    def test_bills_and_rebill_flags(self):
+        self.mark('2025-01-05', [{'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}, {'reg_num': 'REG00001'}])
+        generate_monthly_bills(datetime.date(2025, 1, 1), {'daily_rate': 65, 'nv_plate_rate': 27})
+        self.assertEqual(
+            list(Bill.objects.order_by('student_id').values_list('amount', 'needs_rebill')),
+            [(Decimal('792.00'), False), (Decimal('765.00'), False), (Decimal('700.00'), False)],
+        )
+        self.mark('2025-01-06', [{'reg_num': 'REG00001'}])
+        self.assertEqual(list(Bill.objects.filter(needs_rebill=True).values_list('student_id', flat=True)), [self.students[1].pk])
+
+
+
+class AdminScalingTests(APITestCase):
+    changelists = ['/admin/mess_api/attendance/', '/admin/mess_api/bill/', '/admin/mess_api/studentprofile/',
+                   '/admin/mess_api/monthlyattendancesummary/']
+
+    def setUp(self):
+        self.client.force_login(User.objects.create(username='admin', is_staff=True, is_superuser=True))
+        self.today = timezone.localdate()
+
+    def add_students(self, start, count):
+        for i in range(start, start + count):
+            student = make_student(i)
+            Attendance.objects.create(student=student, date=self.today)
+            Bill.objects.create(student=student, period=self.today.replace(day=1), amount=100)
+
+    def changelist_queries(self):
+        counts = []
+        for url in self.changelists:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            counts.append(len(queries))
+        return counts
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_students(0, 3)
+        few = self.changelist_queries()
+        self.add_students(3, 30)
+        self.assertEqual(self.changelist_queries(), few)
+        # Change forms pick the student by autocomplete, not a <select> of all of them
+        for url in ('/admin/mess_api/attendance/add/', '/admin/mess_api/bill/add/'):
+            self.assertNotContains(self.client.get(url), 'REG00001')
+
+    def test_student_page_shows_recent_attendance_only(self):
+        student = make_student(0)
+        Attendance.objects.create(student=student, date=self.today)
+        Attendance.objects.create(student=student, date=self.today - datetime.timedelta(days=60))
+        response = self.client.get(f'/admin/mess_api/studentprofile/{student.pk}/change/')
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual([form.instance.date for form in formset.initial_forms], [self.today])
+
+    def test_large_tables_show_the_estimate(self):
+        self.add_students(0, 3)
+        with mock.patch.object(mess_admin, 'estimated_row_count', return_value=5_000_000):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/admin/mess_api/attendance/')
+            self.assertEqual(response.context['cl'].result_count, 5_000_000)
+            self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+            # Filtered lists count, up to the limit
+            response = self.client.get('/admin/mess_api/attendance/', {'is_present__exact': '1'})
+            self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_pages_past_the_count_limit_stay_reachable(self):
+        self.add_students(0, 5)
+        url = '/admin/mess_api/attendance/'
+        filtered = {'is_present__exact': '1'}
+        with mock.patch.object(mess_admin, 'ADMIN_COUNT_LIMIT', 2), \
+                mock.patch.object(mess_admin.AttendanceAdmin, 'list_per_page', 1):
+            # Counted to the end of the next page, so there is always one more
+            self.assertEqual(self.client.get(url, filtered).context['cl'].result_count, 2)
+            response = self.client.get(url, {**filtered, 'p': 2})
+            self.assertEqual((response.context['cl'].result_count, len(response.context['cl'].result_list)), (3, 1))
+            # The last page, straight from a link or a typed URL
+            response = self.client.get(url, {**filtered, 'p': 5})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['cl'].result_count, 5)
+            self.assertEqual(response.context['cl'].result_list[0].student.reg_num, 'REG00000')
+
+    @skipUnless(connection.vendor == 'sqlite', "reads SQLite's ANALYZE statistics")
+    def test_estimated_row_count(self):
+        self.add_students(0, 3)
+        self.assertIsNone(mess_admin.estimated_row_count(Attendance, 'default'))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(mess_admin.estimated_row_count(Attendance, 'default'), 3)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def reads_during(self, method, write=False):
+        """Where a view's reads go, before and after it writes (if `write`)."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Attendance))
+            if write:
+                self.assertEqual(self.router.db_for_write(Attendance), 'default')
+                seen.append(self.router.db_for_read(Attendance))
+            return HttpResponse()
+
+        with mock.patch.dict(settings.DATABASES, {REPLICA_DB: {}}):
+            middleware = ReplicaRoutingMiddleware(view)
+        middleware(RequestFactory().generic(method, '/api/bills/'))
+        return seen
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.reads_during('GET'), [REPLICA_DB])
+        self.assertEqual(self.reads_during('HEAD'), [REPLICA_DB])
+
+    def test_writes_pin_the_request_to_the_primary(self):
+        # None lets Django use the default (primary) database
+        self.assertEqual(self.reads_during('GET', write=True), [REPLICA_DB, None])
+        self.assertEqual(self.reads_during('POST'), [None])
+        # Outside a request (commands, the billing worker) nothing is routed
+        self.assertIsNone(self.router.db_for_read(Attendance))
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'mess_api'))
+        self.assertFalse(self.router.allow_migrate(REPLICA_DB, 'mess_api'))
+
+    async def test_async_requests_are_routed(self):
+        seen = []
+
+        async def view(request):
+            seen.append(await sync_to_async(self.router.db_for_read)(Attendance))
+            # A write in the ORM's worker thread still pins the request
+            await sync_to_async(self.router.db_for_write)(Attendance)
+            seen.append(self.router.db_for_read(Attendance))
+            return HttpResponse()
+
+        with mock.patch.dict(settings.DATABASES, {REPLICA_DB: {}}):
+            middleware = ReplicaRoutingMiddleware(view)
+        await middleware(RequestFactory().get('/api/bills/'))
+        self.assertEqual(seen, [REPLICA_DB, None])
+
+    def test_middleware_is_dropped_without_a_replica(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+class AsyncEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = make_student(0)
+        Menu.objects.create(day='Monday', breakfast='Idli', lunch='Rice', dinner='Chapati')
+        for day in (3, 4, 5):
+            Attendance.objects.create(student=self.student, date=datetime.date(2025, 1, day), meal_type='Non-Veg')
+        Attendance.objects.create(student=self.student, date=datetime.date(2025, 2, 1))
+        for month in (1, 2):
+            Bill.objects.create(student=self.student, period=datetime.date(2025, month, 1), amount=Decimal('900.50'))
+        self.staff = make_staff()
+
+    def use(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_student_reads_match_the_sync_endpoints(self):
+        self.use(self.student.user)
+        self.assertEqual(self.client.get('/api/async/me/').json(), self.client.get('/api/me/').json())
+
+        attendance = self.client.get('/api/async/attendance/', {'month': '2025-01'}).json()
+        expected = self.client.get('/api/attendance/', {'start_date': '2025-01-01', 'end_date': '2025-01-31'}).json()
+        self.assertEqual(attendance, {'month': '2025-01', 'results': expected['results']})
+
+        self.assertEqual(self.client.get('/api/async/bills/').json()['results'],
+                         self.client.get('/api/bills/').json()['results'])
+        bills = self.client.get('/api/async/bills/', {'month': '2025-02'}).json()['results']
+        self.assertEqual([bill['month'] for bill in bills], ['2025-02'])
+
+    def test_menu_shares_the_cache_and_etag(self):
+        expected = self.client.get('/api/menu/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/async/menu/')
+        self.assertEqual((response.json(), response['ETag']), (expected.json(), expected['ETag']))
+        cache.clear()
+        response = self.client.get('/api/async/menu/', headers={'if-none-match': expected['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_roster_pages_by_reg_num(self):
+        for i in range(1, 6):
+            make_student(i)
+        self.use(self.staff)
+        expected = self.client.get('/api/attendance/roster/', {'date': '2025-01-03'}).json()['results']
+        first = self.client.get('/api/async/roster/', {'date': '2025-01-03', 'page_size': 4}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(first['results'] + second['results'], expected)
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get('/api/async/roster/').status_code, 400)
+
+    def test_auth_and_permission_errors(self):
+        response = self.client.get('/api/async/bills/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get('/api/async/me/').status_code, 401)
+
+        self.use(self.student.user)
+        self.assertEqual(self.client.get('/api/async/roster/', {'date': '2025-01-03'}).status_code, 403)
+        self.assertEqual(self.client.post('/api/async/bills/').status_code, 405)
+        self.use(self.staff)
+        response = self.client.get('/api/async/attendance/')
+        self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Student profile not found.'}))
+
+    def test_tokens_without_claims_load_the_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student.user)}')
+        self.assertEqual(len(self.client.get('/api/async/bills/').json()['results']), 2)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_QUERY_BUDGET=5, REQUEST_TIMING_LATENCY_BUDGET_MS=10_000)
+    async def test_async_chain(self):
+        token = await sync_to_async(CustomTokenObtainPairSerializer.get_token)(self.student.user)
+        with self.assertLogs('mess_api.timing', 'INFO'):
+            response = await self.async_client.get(
+                '/api/async/bills/', headers={'authorization': f'Bearer {token.access_token}'},
+            )
+        self.assertEqual(response.status_code, 200)
+        # The account state lookup and the bills
+        self.assertIn('db;desc="2 queries"', response['Server-Timing'])
+
+
+class HeadcountTests(APITestCase):
+    def setUp(self):
+        self.students = [make_student(i) for i in range(3)]
+        self.staff = make_staff()
+        self.client.force_authenticate(self.staff)
+
+    def mark(self, date, records):
+        response = self.client.post('/api/attendance/bulk_update/', {'date': date, 'records': records}, format='json')
+        self.assertEqual(response.data['errors'], [])
+
+    def plates(self, date):
+        return self.client.get('/api/attendance/headcount/', {'date': date}).data['plates']
+
+    def assert_in_sync(self):
+        out = StringIO()
+        call_command('rebuild_headcounts', verify=True, stdout=out)
+        self.assertIn('in sync', out.getvalue())
+
+    def test_every_write_path_moves_the_counters(self):
+        self.mark('2025-01-05', [
+            {'reg_num': 'REG00000', 'meal_type': 'Non-Veg'},
+            {'reg_num': 'REG00001'},
+            {'reg_num': 'REG00002', 'is_present': False},
+        ])
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 1, 'Non-Veg': 1})
+
+        # A later roll call overwrites the day instead of adding to it
+        self.mark('2025-01-05', [{'reg_num': 'REG00000'}, {'reg_num': 'REG00002'}])
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 3, 'Non-Veg': 0})
+
+        # Single rows: the student's own mark, an edit and a delete
+        self.client.force_authenticate(self.students[0].user)
+        response = self.client.post('/api/attendance/', {'student': self.students[0].pk, 'date': '2025-01-06', 'meal_type': 'Non-Veg'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get('/api/attendance/headcount/').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.plates('2025-01-06'), {'Veg': 0, 'Non-Veg': 1})
+        row = Attendance.objects.get(student=self.students[1], date=datetime.date(2025, 1, 5))
+        row.is_present = False
+        row.save()
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 2, 'Non-Veg': 0})
+        self.client.delete(f'/api/attendance/{response.data["id"]}/')
+        self.assertEqual(self.plates('2025-01-06'), {'Veg': 0, 'Non-Veg': 0})
+
+        upload = SimpleUploadedFile('register.csv', b"reg_num,date,meal_type\nREG00001,2025-01-07,Non-Veg\n"
+                                                   b"REG00002,2025-02-01,Veg\n", content_type='text/csv')
+        self.client.post('/api/attendance/import/', {'file': upload}, format='multipart')
+        self.assertEqual(self.plates('2025-01-07'), {'Veg': 0, 'Non-Veg': 1})
+        self.assertEqual(self.plates('2025-02-01'), {'Veg': 1, 'Non-Veg': 0})
+        self.assert_in_sync()
+
+    def test_counters_roll_back_with_the_write(self):
+        self.mark('2025-01-05', [{'reg_num': 'REG00000'}])
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            attendance_ingest.upsert_attendance([(self.students[1].pk, datetime.date(2025, 1, 5), True, 'Veg')])
+            self.assertEqual(DailyHeadcount.objects.get(date=datetime.date(2025, 1, 5), meal_type='Veg').plates, 2)
+            raise RuntimeError
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 1, 'Non-Veg': 0})
+
+    def test_single_write_moves_the_counters_without_recounting(self):
+        self.mark('2025-01-05', [{'reg_num': 'REG00000'}, {'reg_num': 'REG00001'}, {'reg_num': 'REG00002'}])
+        row = Attendance.objects.get(student=self.students[0], date=datetime.date(2025, 1, 5))
+        row.meal_type = 'Non-Veg'
+        with CaptureQueriesContext(connection) as queries:
+            row.save()
+        statements = [query['sql'] for query in queries]
+        headcount_table = DailyHeadcount._meta.db_table
+        # Veg - 1 and Non-Veg + 1; the only counting left is the student's own monthly summary
+        self.assertEqual(sum(sql.startswith('UPDATE') and headcount_table in sql for sql in statements), 2)
+        self.assertFalse([sql for sql in statements if 'COUNT(' in sql and '"student_id" IN (' not in sql])
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 2, 'Non-Veg': 1})
+        self.assert_in_sync()
+
+    def test_concurrent_writers_of_a_new_day_count_one_plate(self):
+        day, student = datetime.date(2025, 1, 5), self.students[0].pk
+        for module in (attendance_ingest, attendance_bitmap):
+            with self.subTest(module=module.__name__), \
+                    override_settings(ATTENDANCE_STORAGE='bitmap' if module is attendance_bitmap else 'rows'):
+                Attendance.objects.all().delete()
+                AttendanceMonth.objects.all().delete()
+                DailyHeadcount.objects.all().delete()
+                raced = []
+
+                def other_writer_commits_first(student_ids, lock=module.lock_students):
+                    # The other request wrote the same new day while this one
+                    # waited for the student lock.
+                    if not raced:
+                        raced.append(True)
+                        attendance_ingest.upsert_attendance([(student, day, True, 'Veg')])
+                    lock(student_ids)
+
+                with mock.patch.object(module, 'lock_students', side_effect=other_writer_commits_first):
+                    attendance_ingest.upsert_attendance([(student, day, True, 'Veg')])
+                self.assertEqual(self.plates('2025-01-05'), {'Veg': 1, 'Non-Veg': 0})
+                self.assert_in_sync()
+
+    @override_settings(ATTENDANCE_STORAGE='bitmap')
+    def test_bitmap_storage_and_student_deletion(self):
+        self.mark('2025-01-05', [{'reg_num': 'REG00000', 'meal_type': 'Non-Veg'}, {'reg_num': 'REG00001'}])
+        self.mark('2025-01-31', [{'reg_num': 'REG00000'}])
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 1, 'Non-Veg': 1})
+        self.assert_in_sync()
+
+        # The cascade drops the student's month without going through clear_days()
+        self.students[0].user.delete()
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 1, 'Non-Veg': 0})
+        self.assertEqual(self.plates('2025-01-31'), {'Veg': 0, 'Non-Veg': 0})
+        self.assert_in_sync()
+
+        # Changing the layout moves no plate
+        call_command('convert_attendance', to='rows', stdout=StringIO(), stderr=StringIO())
+        self.assert_in_sync()
+
+    def test_endpoint_reads_one_day_in_one_query(self):
+        self.mark('2025-01-05', [{'reg_num': 'REG00000'}, {'reg_num': 'REG00001', 'meal_type': 'Non-Veg'}])
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/attendance/headcount/', {'date': '2025-01-05'})
+        self.assertEqual(response.data, {
+            'date': datetime.date(2025, 1, 5), 'plates': {'Veg': 1, 'Non-Veg': 1}, 'total': 2,
+        })
+        self.assertEqual(self.client.get('/api/attendance/headcount/', {'date': '2025-13-01'}).status_code, 400)
+        # Today by default, zero before the roll call
+        self.assertEqual(self.client.get('/api/attendance/headcount/').data['total'], 0)
+
+        token = CustomTokenObtainPairSerializer.get_token(self.staff).access_token
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/async/headcount/', {'date': '2025-01-05'}).json(),
+                         {'date': '2025-01-05', 'plates': {'Veg': 1, 'Non-Veg': 1}, 'total': 2})
+
+    def test_rebuild_repairs_drift(self):
+        self.mark('2025-01-05', [{'reg_num': 'REG00000'}, {'reg_num': 'REG00001'}])
+        DailyHeadcount.objects.filter(meal_type='Veg').update(plates=7)
+        DailyHeadcount.objects.create(date=datetime.date(2024, 12, 31), meal_type='Veg', plates=3)
+        DailyHeadcount.objects.filter(date=datetime.date(2025, 1, 5), meal_type='Non-Veg').delete()
+
+        with self.assertRaises(SystemExit):
+            call_command('rebuild_headcounts', verify=True, stdout=StringIO(), stderr=StringIO())
+        out = StringIO()
+        call_command('rebuild_headcounts', stdout=out)
+        self.assertIn('created=0, updated=2, unchanged=0', out.getvalue())
+        self.assertEqual(self.plates('2025-01-05'), {'Veg': 2, 'Non-Veg': 0})
+        self.assertEqual(self.plates('2024-12-31'), {'Veg': 0, 'Non-Veg': 0})
+        self.assert_in_sync()
@@ -1,18 +1,33 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView, StudentProfileViewSet, MenuViewSet, AttendanceViewSet, BillViewSet, MeView, CustomTokenObtainPairView
+from .views import RegisterView, StudentProfileViewSet, MenuViewSet, AttendanceViewSet, BillViewSet, MeView, CustomTokenObtainPairView, MonthlyAttendanceSummaryViewSet, BillingJobViewSet, StudentDashboardView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'profiles', StudentProfileViewSet)
 router.register(r'menu', MenuViewSet)
 router.register(r'attendance', AttendanceViewSet)
 router.register(r'bills', BillViewSet)
+router.register(r'attendance-summaries', MonthlyAttendanceSummaryViewSet)
+router.register(r'billing-jobs', BillingJobViewSet)
+
+# Async versions of the endpoints polled at meal times; see mess_api/async_views.py
+async_urlpatterns = [
+    path('menu/', async_views.menu, name='async-menu'),
+    path('me/', async_views.me, name='async-me'),
+    path('attendance/', async_views.attendance, name='async-attendance'),
+    path('bills/', async_views.bills, name='async-bills'),
+    path('roster/', async_views.roster, name='async-roster'),
+    path('headcount/', async_views.headcount, name='async-headcount'),
+]
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('me/', MeView.as_view(), name='me'),
+    path('dashboard/', StudentDashboardView.as_view(), name='dashboard'),
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
 ]
@@ -1,13 +1,114 @@
-from rest_framework import viewsets, permissions, status, generics, serializers, decorators
+import io
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Q, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from rest_framework import viewsets, permissions, status, generics, serializers, decorators, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import User, StudentProfile, Menu, Attendance, Bill
-from .serializers import UserSerializer, StudentProfileSerializer, MenuSerializer, AttendanceSerializer, BillSerializer
+from .models import User, StudentProfile, Menu, Attendance, AttendanceHistory, Bill, MonthlyAttendanceSummary, BillingJob, DailyHeadcount
+from .serializers import UserSerializer, StudentProfileSerializer, MenuSerializer, AttendanceSerializer, BillSerializer, MonthlyAttendanceSummarySerializer, BillingJobSerializer, RosterEntrySerializer
+from .authentication import role_claims
+from .billing_engine import rebill_flagged_bills
+from .jobs import enqueue_billing_job
+from .periods import INVALID_MONTH_MESSAGE, format_month, parse_month
+from .attendance_bitmap import bitmap_storage, clear_days, marked_day, roster_marks, write_days
+from .attendance_ingest import bulk_mark_attendance, import_attendance_csv
+from .headcounts import format_headcount
+from .reconciliation import reconcile_statement
+from .menu_cache import get_cached_menu
+from .exports import export_response, EXPORT_CONTENT_TYPES, BILL_EXPORT_COLUMNS, ATTENDANCE_EXPORT_COLUMNS
+from .pagination import AttendancePagination, BillPagination, StudentProfilePagination, MonthlyAttendanceSummaryPagination, BillingJobPagination, RosterPagination
+
+def parse_iso_date(value):
+    """A YYYY-MM-DD string as a date, or None when malformed or impossible (2025-02-30)."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+def date_query_param(request, name):
+    """Parses an optional YYYY-MM-DD query parameter, rejecting bad input with a 400."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_iso_date(value)
+    if parsed is None:
+        raise serializers.ValidationError({name: 'Expected a date in YYYY-MM-DD format.'})
+    return parsed
+
+def month_query_param(request, name='month'):
+    """Parses an optional YYYY-MM query parameter into a billing period, rejecting bad input with a 400."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return parse_month(value)
+    except ValueError:
+        raise serializers.ValidationError({name: INVALID_MONTH_MESSAGE})
+
+def export_format_param(request):
+    """Reads ?fmt=csv|ndjson for the export actions (DRF reserves ?format=)."""
+    fmt = request.query_params.get('fmt', 'csv')
+    if fmt not in EXPORT_CONTENT_TYPES:
+        raise serializers.ValidationError({'fmt': 'Expected csv or ndjson.'})
+    return fmt
+
+def roster_queryset(request):
+    """
+    Every student LEFT JOIN the ?date= attendance (that day's row, or the
+    month's bitmaps in bitmap storage), narrowed by ?branch= and ?year=, as
+    the RosterEntrySerializer fields. Unordered.
+    """
+    date = date_query_param(request, 'date')
+    if date is None:
+        raise serializers.ValidationError({'date': 'This query parameter is required.'})
+
+    if bitmap_storage():
+        queryset = StudentProfile.objects.annotate(
+            month=FilteredRelation('attendancemonth', condition=Q(attendancemonth__period=date.replace(day=1))),
+        )
+        marks = roster_marks('month', date)
+    else:
+        queryset = StudentProfile.objects.annotate(
+            mark=FilteredRelation('attendance', condition=Q(attendance__date=date)),
+        )
+        marks = {'is_present': F('mark__is_present'), 'meal_type': F('mark__meal_type')}
+    branch = request.query_params.get('branch')
+    if branch:
+        queryset = queryset.filter(branch=branch)
+    year = request.query_params.get('year')
+    if year:
+        if not year.isdigit():
+            raise serializers.ValidationError({'year': 'Expected a number.'})
+        queryset = queryset.filter(year=int(year))
+    return queryset.values(
+        'reg_num', 'branch', 'year',
+        student=F('user_id'),
+        name=F('user__username'),
+        **marks,
+    )
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Role claims let ClaimsJWTAuthentication skip the user lookup and
+        # the frontend skip /me/.
+        token = super().get_token(user)
+        token['username'] = user.username
+        for claim, value in role_claims(user).items():
+            token[claim] = value
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         
@@ -34,65 +135,217 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = UserSerializer(request.user)
+        # request.user may be built from token claims; email is not among them.
+        serializer = UserSerializer(User.objects.get(pk=request.user.pk))
         return Response(serializer.data)
 
+class StudentDashboardView(APIView):
+    """
+    Everything the student dashboard shows, in one response: the student's
+    profile, today's menu, this month's present / non-veg counts, the
+    latest bill with the attendance it was billed on, and the unpaid total.
+
+    A fixed number of queries however long the student's history is: the
+    menu comes from the menu cache, the counts from the monthly summaries
+    and the dues from one aggregate.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        student = request.user.student_profile_id
+        if student is None:
+            return Response({'error': 'Student profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        today = timezone.localdate()
+        month = today.replace(day=1)
+        menu = get_cached_menu(lambda: MenuSerializer(Menu.objects.all(), many=True).data)['data']
+        today_name = Menu.DAYS[today.weekday()][0]
+
+        profile = StudentProfileSerializer.setup_eager_loading(StudentProfile.objects.filter(pk=student)).first()
+        bills = BillSerializer.setup_eager_loading(Bill.objects.filter(student_id=student))
+        latest_bill = bills.order_by('-period', '-id').first()
+        unpaid = Bill.objects.filter(student_id=student, is_paid=False).aggregate(
+            count=Count('id'), total=Sum('amount'),
+        )
+
+        periods = {month}
+        if latest_bill:
+            periods.add(latest_bill.period)
+        counts = {
+            period: {'present_days': present, 'nv_days': nv}
+            for period, present, nv in MonthlyAttendanceSummary.objects
+            .filter(student_id=student, period__in=periods)
+            .values_list('period', 'present_days', 'nv_days')
+        }
+        no_attendance = {'present_days': 0, 'nv_days': 0}
+
+        return Response({
+            'date': today,
+            'profile': StudentProfileSerializer(profile).data,
+            'menu': next((day for day in menu if day['day'] == today_name), None),
+            'month': format_month(month),
+            'attendance': counts.get(month, no_attendance),
+            'latest_bill': BillSerializer(latest_bill).data if latest_bill else None,
+            'latest_bill_attendance': counts.get(latest_bill.period, no_attendance) if latest_bill else None,
+            'unpaid': {
+                'count': unpaid['count'],
+                'total': f"{unpaid['total'] or 0:.2f}",
+            },
+        })
+
 class StudentProfileViewSet(viewsets.ModelViewSet):
     queryset = StudentProfile.objects.all()
     serializer_class = StudentProfileSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StudentProfilePagination
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['reg_num', 'user__username', 'branch']
 
     def get_queryset(self):
         user = self.request.user
         if user.is_staff_member:
-            return StudentProfile.objects.all()
-        return StudentProfile.objects.filter(user=user)
+            queryset = StudentProfile.objects.all()
+        else:
+            queryset = StudentProfile.objects.filter(user_id=user.pk)
+        return self.get_serializer_class().setup_eager_loading(queryset)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.pk)
 
-from .permissions import IsStaffOrReadOnly
+from .permissions import IsStaffOrReadOnly, IsStaffMember
 
 class MenuViewSet(viewsets.ModelViewSet):
+    """
+    The weekly menu. The list is served from mess_api.menu_cache with an
+    ETag and Last-Modified, so clients revalidating an unchanged menu get a
+    304 without touching the database. Writes here and in the admin
+    invalidate it through the Menu signals.
+    """
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
     permission_classes = [IsStaffOrReadOnly]
-    # In a real app, restrict modify to staff
+
+    def perform_authentication(self, request):
+        # Reads are public, so there is no need to load the user for them;
+        # writes still authenticate up front.
+        if request.method not in permissions.SAFE_METHODS:
+            super().perform_authentication(request)
+
+    def list(self, request, *args, **kwargs):
+        entry = get_cached_menu(
+            lambda: self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data
+        )
+        not_modified = get_conditional_response(
+            request._request, etag=entry['etag'], last_modified=entry['last_modified']
+        )
+        response = not_modified or Response(entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        # Let browsers keep the body but revalidate it on every use.
+        patch_cache_control(response, no_cache=True)
+        return response
 
 class AttendanceViewSet(viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AttendancePagination
 
     def get_queryset(self):
          user = self.request.user
-         queryset = Attendance.objects.none()
+         # Reads (the history list and export) include archived years; writes
+         # only ever touch the live table, which in bitmap storage is the
+         # bitmap days of the history view.
+         history = self.action in ('list', 'export')
+         model = AttendanceHistory if history or bitmap_storage() else Attendance
+         queryset = model.objects.none()
          
          if user.is_staff_member:
-             queryset = Attendance.objects.all()
+             queryset = model.objects.all()
              # Allow filtering by specific student for history view
              student_id_param = self.request.query_params.get('student_id')
              if student_id_param:
                  queryset = queryset.filter(student__user__id=student_id_param)
-         elif hasattr(user, 'studentprofile'):
-             queryset = Attendance.objects.filter(student=user.studentprofile)
+         elif user.student_profile_id:
+             queryset = model.objects.filter(student_id=user.student_profile_id)
              
-         date_param = self.request.query_params.get('date')
+         date_param = date_query_param(self.request, 'date')
          if date_param:
              queryset = queryset.filter(date=date_param)
+
+         # Optional inclusive range, e.g. ?start_date=2025-01-01&end_date=2025-01-31
+         start_date = date_query_param(self.request, 'start_date')
+         if start_date:
+             queryset = queryset.filter(date__gte=start_date)
+         end_date = date_query_param(self.request, 'end_date')
+         if end_date:
+             queryset = queryset.filter(date__lte=end_date)
+
+         if model is AttendanceHistory and not history:
+             # Bitmap days have negative ids (attendance_bitmap.history_id).
+             queryset = queryset.filter(id__lt=0)
              
-         return queryset
+         return self.get_serializer_class().setup_eager_loading(queryset)
 
     def perform_create(self, serializer):
         user = self.request.user
-        if not hasattr(user, 'studentprofile'):
+        if not user.student_profile_id:
              raise serializers.ValidationError({"detail": "Student profile not found."})
         
         # Check for duplicate is handled by model unique_together, but we can double check or let DRF handle it
         # The serializer should default 'date' to today if not provided, or frontend provides it.
         # Assuming frontend sends date and meal_type.
         
-        serializer.save(student=user.studentprofile)
+        if bitmap_storage():
+            day = Attendance(**serializer.validated_data)
+            day.student_id = user.student_profile_id
+            self._save_bitmap_day(serializer, day)
+        else:
+            # The row and the summaries / headcounts its signal refreshes
+            # commit together.
+            with transaction.atomic():
+                serializer.save(student_id=user.student_profile_id)
+
+    def perform_update(self, serializer):
+        if not bitmap_storage():
+            with transaction.atomic():
+                return super().perform_update(serializer)
+        previous = serializer.instance
+        day = Attendance(student_id=previous.student_id, date=previous.date,
+                         is_present=previous.is_present, meal_type=previous.meal_type)
+        for field, value in serializer.validated_data.items():
+            setattr(day, field, value)
+        self._save_bitmap_day(serializer, day, previous)
+
+    def perform_destroy(self, instance):
+        if not bitmap_storage():
+            with transaction.atomic():
+                return super().perform_destroy(instance)
+        clear_days([(instance.student_id, instance.date)])
+
+    def _save_bitmap_day(self, serializer, day, previous=None):
+        """
+        serializer.save() for bitmap storage: writes `day` (an unsaved
+        Attendance) into the month's bitmaps, moving it off `previous` when
+        its student or date changed, and points the serializer at the result.
+        """
+        key = (day.student_id, day.date)
+        moved = previous is not None and key != (previous.student_id, previous.date)
+        with transaction.atomic():
+            # The day may also be an Attendance row left from the row
+            # layout; either way a second copy would count it twice.
+            if (previous is None or moved) and (
+                marked_day(*key) is not None
+                or Attendance.objects.filter(student_id=day.student_id, date=day.date).exists()
+            ):
+                # What the unique (student, date) constraint reports for rows.
+                raise serializers.ValidationError(
+                    {'non_field_errors': ['The fields student, date must make a unique set.']}
+                )
+            if moved:
+                clear_days([(previous.student_id, previous.date)])
+            write_days([(day.student_id, day.date, day.is_present, day.meal_type)])
+        serializer.instance = AttendanceHistory.objects.get(student_id=day.student_id, date=day.date, id__lt=0)
 
     @decorators.action(detail=False, methods=['post'], permission_classes=[IsStaffOrReadOnly])
     def bulk_update(self, request):
@@ -112,132 +365,227 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if not date or not records:
              return Response({'error': 'Date and records are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        updated_count = 0
-        errors = []
-
-        for record in records:
-            reg_num = record.get('reg_num')
-            # Default to Present=True if not specified, though usually admin specifies
-            is_present = record.get('is_present', True)
-            meal_type = record.get('meal_type', 'Veg')
-
-            try:
-                student = StudentProfile.objects.get(reg_num=reg_num)
-                # Create or update the attendance record for this student/date
-                Attendance.objects.update_or_create(
-                    student=student,
-                    date=date,
-                    defaults={
-                        'is_present': is_present,
-                        'meal_type': meal_type
-                    }
-                )
-                updated_count += 1
-            except StudentProfile.DoesNotExist:
-                errors.append(f"Student with reg_num {reg_num} not found")
-            except Exception as e:
-                errors.append(f"Error for {reg_num}: {str(e)}")
+        attendance_date = parse_iso_date(date)
+        if attendance_date is None:
+             return Response({'error': 'Invalid date. Expected YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+             return Response({'error': 'records must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            updated_count, errors = bulk_mark_attendance(attendance_date, records)
+        except DjangoValidationError as exc:
+             return Response({'error': exc.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             'message': f'Successfully processing attendance. Updated/Created {updated_count} records.',
             'errors': errors
         })
 
+    @decorators.action(detail=False, methods=['get'], permission_classes=[IsStaffMember],
+                       serializer_class=RosterEntrySerializer, pagination_class=RosterPagination)
+    def roster(self, request):
+        """
+        Every student with their mark for one day, e.g.
+        /api/attendance/roster/?date=2025-01-31&branch=CSE&year=2
+
+        One query: students LEFT JOIN that day's attendance, projected to
+        the columns the roll call screen shows. Ordered and paginated by
+        reg_num.
+        """
+        page = self.paginate_queryset(roster_queryset(request))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @decorators.action(detail=False, methods=['get'], permission_classes=[IsStaffMember])
+    def headcount(self, request):
+        """
+        Plates to cook per meal type for one day (default today), e.g.
+        /api/attendance/headcount/?date=2025-01-31 ->
+        {"date": "2025-01-31", "plates": {"Veg": 412, "Non-Veg": 188}, "total": 600}
+
+        One indexed read of the day's DailyHeadcount rows, which every
+        attendance write keeps current (see mess_api.headcounts).
+        """
+        day = date_query_param(request, 'date') or timezone.localdate()
+        rows = DailyHeadcount.objects.filter(date=day).values_list('meal_type', 'plates')
+        return Response(format_headcount(day, rows))
+
+    @decorators.action(detail=False, methods=['post'], url_path='import', permission_classes=[IsStaffOrReadOnly])
+    def import_csv(self, request):
+        """
+        Imports a CSV register uploaded as multipart field "file", with the
+        columns reg_num, date and optionally is_present and meal_type.
+        Lines that fail validation are skipped and listed in "errors".
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+             return Response({'error': 'Upload a CSV file in the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_attendance_csv(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+        except ValueError as exc:
+             return Response({'error': f'Could not read CSV: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': f"Imported {report['written']} of {report['rows']} rows.",
+            **report,
+        })
+
+    @decorators.action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams the rows visible to the caller as CSV or NDJSON, e.g.
+        /api/attendance/export/?start_date=2025-01-01&end_date=2025-06-30&fmt=csv
+        Accepts the same date / start_date / end_date / student_id filters as the list.
+        """
+        fmt = export_format_param(request)
+        return export_response(self.get_queryset(), ATTENDANCE_EXPORT_COLUMNS, fmt, 'attendance')
+
+class MonthlyAttendanceSummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Monthly present / non-veg counts. Students see their own months, staff
+    see everyone's; both can narrow it with ?month=YYYY-MM.
+    """
+    queryset = MonthlyAttendanceSummary.objects.all()
+    serializer_class = MonthlyAttendanceSummarySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = MonthlyAttendanceSummaryPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff_member:
+            queryset = MonthlyAttendanceSummary.objects.all()
+        elif user.student_profile_id:
+            queryset = MonthlyAttendanceSummary.objects.filter(student_id=user.student_profile_id)
+        else:
+            queryset = MonthlyAttendanceSummary.objects.none()
+
+        period = month_query_param(self.request)
+        if period:
+            queryset = queryset.filter(period=period)
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
 class BillViewSet(viewsets.ModelViewSet):
     queryset = Bill.objects.all()
     serializer_class = BillSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BillPagination
 
     def get_queryset(self):
          user = self.request.user
          if user.is_staff_member:
-             return Bill.objects.all()
-         if hasattr(user, 'studentprofile'):
-             return Bill.objects.filter(student=user.studentprofile)
-         return Bill.objects.none()
+             queryset = Bill.objects.all()
+         elif user.student_profile_id:
+             queryset = Bill.objects.filter(student_id=user.student_profile_id)
+         else:
+             queryset = Bill.objects.none()
+
+         period = month_query_param(self.request)
+         if period:
+             queryset = queryset.filter(period=period)
+         return self.get_serializer_class().setup_eager_loading(queryset)
+
+    @decorators.action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams the bills visible to the caller as CSV or NDJSON, e.g.
+        /api/bills/export/?month=2025-01&fmt=csv
+        """
+        fmt = export_format_param(request)
+        return export_response(self.get_queryset(), BILL_EXPORT_COLUMNS, fmt, 'bills')
 
     @decorators.action(detail=False, methods=['post'], permission_classes=[IsStaffOrReadOnly])
     def generate_bills(self, request):
         month_str = request.data.get('month') # Expected format YYYY-MM
-        
-        # New Inputs
-        daily_rate_input = request.data.get('daily_rate')
-        nv_plate_rate_input = request.data.get('nv_plate_rate')
-        
-        # Detailed Fixed Charges
-        room_rent_input = request.data.get('room_rent', 150)
-        water_charges_input = request.data.get('water_charges', 125)
-        electricity_charges_input = request.data.get('electricity_charges', 150)
-        establishment_charges_input = request.data.get('establishment_charges', 275)
-        
-        if not month_str or not daily_rate_input or not nv_plate_rate_input:
+
+        # Detailed fixed charges default to DEFAULT_FIXED_CHARGES (mess_api/billing.py)
+        if not month_str or not request.data.get('daily_rate') or not request.data.get('nv_plate_rate'):
             return Response({'error': 'Month, Daily Rate, and NV Plate Rate are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Optional: bill every month up to end_month in the same run, with
+        # rate_cards = {"YYYY-MM": {rate: value}} overriding the rates above
+        # for individual months.
+        end_month_str = request.data.get('end_month')
         try:
-            year, month = map(int, month_str.split('-'))
-            daily_rate = float(daily_rate_input)
-            nv_rate = float(nv_plate_rate_input)
-            
-            room_rent = float(room_rent_input)
-            water = float(water_charges_input)
-            curr_elec = float(electricity_charges_input)
-            est = float(establishment_charges_input)
-            
+            period = parse_month(month_str)
+            end_period = parse_month(end_month_str) if end_month_str else None
         except ValueError:
              return Response({'error': 'Invalid format. Month: YYYY-MM, Rates: Numbers'}, status=status.HTTP_400_BAD_REQUEST)
 
-        students = StudentProfile.objects.all()
-        created_count = 0
-        
-        fixed_total = room_rent + water + curr_elec + est
-
-        for student in students:
-            # Calculate Total Present Days (Veg + Non-Veg)
-            present_days = Attendance.objects.filter(
-                student=student, 
-                date__year=year, 
-                date__month=month,
-                is_present=True
-            ).count()
-
-            # Calculate days where meal_type was Non-Veg
-            nv_days = Attendance.objects.filter(
-                student=student, 
-                date__year=year, 
-                date__month=month,
-                is_present=True,
-                meal_type='Non-Veg'
-            ).count()
-            
-            # Formula: (Present Days * Daily Rate) + (NV Days * NV Extra Rate) + Fixed Charges
-            # Note: "Daily Rate" covers the base cost of a meal (Veg). 
-            # If they ate Non-Veg, they pay Daily Rate + NV Extra Rate.
-            
-            food_cost = present_days * daily_rate
-            nv_add_on_cost = nv_days * nv_rate
-            
-            total_amount = food_cost + nv_add_on_cost + fixed_total
-            
-            # Check if bill already exists for this month
-            bill, created = Bill.objects.update_or_create(
-                student=student, 
-                month=month_str, 
-                defaults={
-                    'amount': total_amount,
-                    'daily_rate': daily_rate,
-                    'nv_plate_rate': nv_rate,
-                    'room_rent': room_rent,
-                    'water_charges': water,
-                    'electricity_charges': curr_elec,
-                    'establishment_charges': est
-                }
+        try:
+            # Runs in the background (manage.py run_billing_worker); poll
+            # /api/billing-jobs/<job_id>/ for progress.
+            job = enqueue_billing_job(
+                period,
+                request.data,
+                requested_by_id=request.user.pk,
+                end_period=end_period,
+                rate_cards=request.data.get('rate_cards'),
             )
-            
-            if created:
-                created_count += 1
-        
+        except ValueError as exc:
+             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        months = f'{period:%Y-%m} to {job.end_period:%Y-%m}' if job.end_period else f'{period:%Y-%m}'
         return Response({
-            'message': f'Bills generated for {len(students)} students using new logic.', 
-            'created': created_count,
-            'updated': len(students) - created_count
+            'message': f'Bill generation for {months} queued.',
+            'job_id': job.pk,
+            'status': job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @decorators.action(detail=False, methods=['post'], permission_classes=[IsStaffMember])
+    def reconcile(self, request):
+        """
+        Marks bills paid from a bank / UPI statement CSV uploaded as
+        multipart field "file" (see mess_api.reconciliation for the
+        columns). Returns the matched, ambiguous and unmatched lines; with
+        dry_run=true nothing is marked.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload a statement CSV in the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.data.get('dry_run') in serializers.BooleanField.TRUE_VALUES
+
+        try:
+            report = reconcile_statement(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), dry_run)
+        except ValueError as exc:
+            return Response({'error': f'Could not read statement: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': f"Matched {len(report['matched'])} of {report['lines']} lines; {report['paid']} bills marked paid.",
+            **report,
         })
+
+    @decorators.action(detail=False, methods=['get', 'post'], permission_classes=[IsStaffMember])
+    def rebill(self, request):
+        """
+        Bills whose attendance changed after they were generated. GET counts
+        them per month; POST recomputes them (all, or one ?month=YYYY-MM)
+        with the rates each bill was generated with.
+        """
+        period = month_query_param(request)
+        flagged = Bill.objects.filter(needs_rebill=True)
+        if period:
+            flagged = flagged.filter(period=period)
+
+        if request.method == 'GET':
+            months = {
+                format_month(row['period']): row['count']
+                for row in flagged.order_by('period').values('period').annotate(count=Count('id'))
+            }
+            return Response({'pending': sum(months.values()), 'months': months})
+
+        rebilled = rebill_flagged_bills(period)
+        return Response({'message': f'{rebilled} bills recomputed.', 'rebilled': rebilled})
+
+class BillingJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued bill generation runs (staff only)."""
+    queryset = BillingJob.objects.all()
+    serializer_class = BillingJobSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = BillingJobPagination
+
+    def get_queryset(self):
+        if self.request.user.is_staff_member:
+            queryset = BillingJob.objects.all()
+        else:
+            queryset = BillingJob.objects.none()
+        return self.get_serializer_class().setup_eager_loading(queryset)
@@ -47,9 +47,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so its timings cover the rest of the chain; inert unless
+    # REQUEST_TIMING_ENABLED is set (see below).
+    'mess_api.middleware.RequestTimingMiddleware',
+    # Routes the reads of safe-method requests to the read replica; removes
+    # itself when REPLICA_DATABASE_URL is unset.
+    'mess_api.db_router.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise with an async path, so ASGI requests stay on the event loop
+    'mess_api.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -100,6 +107,16 @@ if 'DATABASE_URL' not in os.environ and config('USE_MYSQL', default=False, cast=
         'PORT': '3306',
     }
 
+# Optional read replica (mess_api/db_router.py): the reads of GET / HEAD /
+# OPTIONS requests go to it, everything else stays on the primary. Any
+# database URL works, e.g. sqlite:///replica.sqlite3 for local testing.
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL)
+    # Tests read and write one database.
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['mess_api.db_router.ReplicaRouter']
+
 
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:5173').split(',')
 
@@ -135,6 +152,21 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Holds the cached menu (mess_api/menu_cache.py). The local-memory default is
+# per process; with several workers point CACHE_BACKEND / CACHE_LOCATION at a
+# shared cache (e.g. django.core.cache.backends.redis.RedisCache) so a menu
+# edit is seen by all of them immediately.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -145,7 +177,47 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 AUTH_USER_MODEL = 'mess_api.User'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        # JWTAuthentication that builds the user from the token's role claims
+        # instead of loading it; see mess_api/authentication.py
+        'mess_api.authentication.ClaimsJWTAuthentication',
+    ),
+    # Default page size for the cursor-paginated list endpoints (see mess_api/pagination.py)
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=100, cast=int),
 }
 
+# PAGE_SIZE is only used by the views that opt into pagination_class.
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
+
+
+
+# Request instrumentation (mess_api/middleware.py): query count, DB,
+# serializer and total time per request as a Server-Timing header and a
+# "mess_api.timing" log line. Requests over either budget are logged as
+# warnings with their most repeated SQL.
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING', default=False, cast=bool)
+REQUEST_TIMING_QUERY_BUDGET = config('REQUEST_TIMING_QUERY_BUDGET', default=30, cast=int)
+REQUEST_TIMING_LATENCY_BUDGET_MS = config('REQUEST_TIMING_LATENCY_BUDGET_MS', default=500, cast=int)
+
+# Month in which an academic year starts (6 = June). archive_attendance
+# archives whole academic years that ended before the current one.
+ACADEMIC_YEAR_START_MONTH = config('ACADEMIC_YEAR_START_MONTH', default=6, cast=int)
+
+# Where day-level attendance is written: 'rows' (one Attendance row per
+# student per day) or 'bitmap' (one AttendanceMonth row per student per
+# month, see mess_api/attendance_bitmap.py). Run
+# `manage.py convert_attendance --to <layout>` after changing it.
+ATTENDANCE_STORAGE = config('ATTENDANCE_STORAGE', default='rows')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'mess_api': {
+            'handlers': ['console'],
+            'level': config('MESS_API_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
@@ -56,10 +56,10 @@ def populate():
         print("Marked Lunch Attendance for Today")
 
     # 5. Create Bill
-    if not Bill.objects.filter(student=student, month="December 2025").exists():
+    if not Bill.objects.filter(student=student, period=datetime.date(2025, 12, 1)).exists():
         Bill.objects.create(
             student=student,
-            month="December 2025",
+            period=datetime.date(2025, 12, 1),
             amount=2500.00,
             is_paid=False
         )
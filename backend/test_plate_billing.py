@@ -1,10 +1,12 @@
 import os
 import django
 import datetime
+import time
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mess_system.settings')
 django.setup()
 
+from mess_api import billing
 from mess_api.models import StudentProfile, Attendance, Bill
 
 def verify_plate_billing():
@@ -20,59 +22,39 @@ def verify_plate_billing():
     print(f"Testing with student: {student.reg_num}")
     
     # Rates
-    veg_rate = 100.0
-    nv_rate_full = 150.0 # Full plate price
-    fixed_total = 150*2 + 125 + 275 # 700
+    payload_rates = {
+        'daily_rate': 100,
+        'nv_plate_rate': 50, # Extra on top of the daily rate
+        'room_rent': 150,
+        'water_charges': 125,
+        'electricity_charges': 150,
+        'establishment_charges': 275
+    }
+    rates = billing.parse_rates(payload_rates)
     
     month_str = "2026-05"
     year, month = 2026, 5
     
     # Clear previous data for this month
     Attendance.objects.filter(student=student, date__year=year, date__month=month).delete()
-    Bill.objects.filter(student=student, month=month_str).delete()
+    Bill.objects.filter(student=student, period=datetime.date(year, month, 1)).delete()
     
     # 2. Create Attendance Records
-    # Day 1: 2 Veg plates
-    Attendance.objects.create(
-        student=student,
-        date=datetime.date(2026, 5, 1),
-        is_present=True,
-        veg_plate_count=2,
-        non_veg_plate_count=0
-    )
-    
-    # Day 2: 1 Veg, 1 Non-Veg
-    Attendance.objects.create(
-        student=student,
-        date=datetime.date(2026, 5, 2),
-        is_present=True,
-        veg_plate_count=1,
-        non_veg_plate_count=1
-    )
-    
-    # Day 3: 0 Veg, 2 Non-Veg
-    Attendance.objects.create(
-        student=student,
-        date=datetime.date(2026, 5, 3),
-        is_present=True,
-        veg_plate_count=0,
-        non_veg_plate_count=2
-    )
-    
-    # Expected Counts:
-    # Total Veg = 2 + 1 + 0 = 3
-    # Total Non-Veg = 0 + 1 + 2 = 3
-    
-    # Expected Cost:
-    # Veg Cost = 3 * 100 = 300
-    # NV Cost = 3 * 150 = 450
-    # Fixed = 700
-    # Total = 300 + 450 + 700 = 1450
-    
-    expected_amount = 1450.0
+    # Day 1: Veg, Day 2: Non-Veg, Day 3: Non-Veg
+    for day, meal_type in ((1, 'Veg'), (2, 'Non-Veg'), (3, 'Non-Veg')):
+        Attendance.objects.create(
+            student=student,
+            date=datetime.date(year, month, day),
+            is_present=True,
+            meal_type=meal_type
+        )
+
+    # Expected: 3 present days, 2 of them Non-Veg, priced by the same
+    # formula the bill generator uses (mess_api/billing.py)
+    expected_amount = billing.bill_amount(3, 2, rates)
     
     print(f"Set up 3 days of attendance.")
-    print(f"Expected: Veg=3, NV=3")
+    print(f"Expected: Present=3, NV=2")
     print(f"Expected Bill Amount: {expected_amount}")
     
     # 3. Trigger Bill Generation
@@ -97,26 +79,24 @@ def verify_plate_billing():
         
         headers = {'Authorization': f'Bearer {token}'}
         
-        payload = {
-            'month': month_str,
-            'daily_rate': veg_rate, # 100
-            'nv_plate_rate': nv_rate_full, # 150
-            'room_rent': 150,
-            'water_charges': 125,
-            'electricity_charges': 150,
-            'establishment_charges': 275
-        }
+        payload = dict(payload_rates, month=month_str)
         
         print("Generating Bill via API...")
         bill_resp = requests.post('http://127.0.0.1:8000/api/bills/generate_bills/', json=payload, headers=headers)
         
-        if bill_resp.status_code == 200:
-            print("✅ Bill Generated Successfully")
+        if bill_resp.status_code == 202:
+            # Bills are generated by the worker (manage.py run_billing_worker)
+            job_url = f"http://127.0.0.1:8000/api/billing-jobs/{bill_resp.json()['job_id']}/"
+            job = bill_resp.json()
+            while job['status'] in ('queued', 'running'):
+                time.sleep(1)
+                job = requests.get(job_url, headers=headers).json()
+            print(f"✅ Bill Generation {job['status']}")
             
-            bill = Bill.objects.get(student=student, month=month_str)
+            bill = Bill.objects.get(student=student, period=datetime.date(year, month, 1))
             print(f"Generated Amount: {bill.amount}")
             
-            if abs(float(bill.amount) - expected_amount) < 0.1: # Float comparison
+            if bill.amount == expected_amount: # Exact decimal comparison
                 print("✅ PASSED: Amount matches expected.")
             else:
                 print(f"❌ FAILED: Expected {expected_amount}, got {bill.amount}")
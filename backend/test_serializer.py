@@ -1,4 +1,5 @@
 import os
+import datetime
 import django
 from django.conf import settings
 
@@ -17,7 +18,7 @@ if not User.objects.filter(username='test_student').exists():
 try:
     student = StudentProfile.objects.first()
     if not Bill.objects.filter(student=student).exists():
-        Bill.objects.create(student=student, month='2025-01', amount=1000)
+        Bill.objects.create(student=student, period=datetime.date(2025, 1, 1), amount=1000)
 
     bill = Bill.objects.filter(student__isnull=False).first()
     if bill:
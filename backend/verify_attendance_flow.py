@@ -65,8 +65,10 @@ def verify_flow():
     client.credentials(HTTP_AUTHORIZATION='Bearer ' + student_token)
     
     # Fetch Attendance (Student Dashboard Logic)
-    att_resp = client.get('/api/attendance/')
-    my_attendance = att_resp.data
+    # The list is cursor-paginated ({next, previous, results}); today's
+    # mark is on the first page when filtered to today.
+    att_resp = client.get('/api/attendance/', {'date': today.isoformat()})
+    my_attendance = att_resp.data['results']
     
     # Check if today is present
     today_record = next((a for a in my_attendance if a['date'] == today.isoformat()), None)
@@ -87,8 +89,8 @@ def verify_flow():
     # 5. Verify Student View again
     print("\n5. Student View: Checking Update...")
     client.credentials(HTTP_AUTHORIZATION='Bearer ' + student_token)
-    att_resp = client.get('/api/attendance/')
-    my_attendance = att_resp.data
+    att_resp = client.get('/api/attendance/', {'date': today.isoformat()})
+    my_attendance = att_resp.data['results']
     today_record = next((a for a in my_attendance if a['date'] == today.isoformat()), None)
     
     if today_record and not today_record['is_present']:
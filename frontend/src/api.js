@@ -16,4 +16,40 @@ api.interceptors.request.use(
     (error) => Promise.reject(error)
 );
 
+// The role claims of the stored access token ({ username, is_student,
+// is_staff_member, student_profile_id, ... }), or null when logged out.
+// Saves a /me/ round trip for pages that only need to know who is logged in.
+export const currentUser = () => {
+    const token = localStorage.getItem('access_token');
+    if (!token) return null;
+    try {
+        const payload = token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/');
+        const claims = JSON.parse(atob(payload));
+        // Tokens issued before the role claims were added
+        return 'is_staff_member' in claims ? claims : null;
+    } catch {
+        return null;
+    }
+};
+
+// The attendance, bills and profiles list endpoints are cursor-paginated and
+// return { next, previous, results }. `next` is an absolute URL (or null).
+export const fetchPage = async (url, params) => {
+    const response = await api.get(url, { params });
+    return response.data;
+};
+
+// Follows `next` links until the last page. Only use this for lists that are
+// bounded by the filters passed in (e.g. one student's month, one date).
+export const fetchAllPages = async (url, params) => {
+    let results = [];
+    let page = await fetchPage(url, params);
+    results = results.concat(page.results);
+    while (page.next) {
+        page = await fetchPage(page.next);
+        results = results.concat(page.results);
+    }
+    return results;
+};
+
 export default api;
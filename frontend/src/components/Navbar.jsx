@@ -1,6 +1,6 @@
 import { Link, useNavigate, useLocation } from 'react-router-dom';
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { currentUser } from '../api';
 import svuLogo from '../assets/logo.jpg';
 
 export default function Navbar() {
@@ -16,8 +16,9 @@ export default function Navbar() {
             if (token) {
                 setIsAuthenticated(true);
                 try {
-                    const response = await api.get('/me/');
-                    setUser(response.data);
+                    // The token's claims carry the role; older tokens need /me/
+                    const claims = currentUser();
+                    setUser(claims || (await api.get('/me/')).data);
                 } catch (error) {
                     console.error("Auth check failed", error);
                 }
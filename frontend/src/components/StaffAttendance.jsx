@@ -1,11 +1,12 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchAllPages } from '../api';
 
 const StaffAttendance = () => {
     const [students, setStudents] = useState([]);
     const [bulkData, setBulkData] = useState({});
     const [selectedDate, setSelectedDate] = useState(new Date().toISOString().split('T')[0]);
     const [saving, setSaving] = useState(false);
+    const [importing, setImporting] = useState(false);
     const [loading, setLoading] = useState(true);
 
     // History Modal State
@@ -24,27 +25,17 @@ const StaffAttendance = () => {
     const fetchAdminData = async (date) => {
         try {
             setLoading(true);
-            const [profilesRes, attRes] = await Promise.all([
-                api.get('/profiles/'),
-                api.get(`/attendance/?date=${date}`)
-            ]);
+            // One joined row per student with the day's mark (null when unmarked)
+            const roster = await fetchAllPages('/attendance/roster/', { date, page_size: 1000 });
 
-            setStudents(profilesRes.data);
+            setStudents(roster);
 
             const attMap = {};
-            attRes.data.forEach(record => {
-                // Determine reg_num from student ID
-                // The API returns 'student' as ID in checking standard, but let's verify if we need to map it
-                // In Attendance.jsx we saw a need to map.
-                const studentProfile = profilesRes.data.find(p => p.id === record.student);
-                // Fallback: if backend serializer returns object, check record.student.reg_num
-                // But based on previous code, it seemed to be an ID.
-
-                // Let's rely on finding by ID from the profiles list we just fetched
-                if (studentProfile) {
-                    attMap[studentProfile.reg_num] = {
-                        is_present: record.is_present,
-                        meal_type: record.meal_type
+            roster.forEach(row => {
+                if (row.is_present !== null) {
+                    attMap[row.reg_num] = {
+                        is_present: row.is_present,
+                        meal_type: row.meal_type
                     };
                 }
             });
@@ -89,6 +80,28 @@ const StaffAttendance = () => {
         }
     };
 
+    // Uploads a CSV register (reg_num, date, is_present, meal_type); it may cover several days
+    const importRegister = async (e) => {
+        const file = e.target.files[0];
+        e.target.value = '';
+        if (!file) return;
+        try {
+            setImporting(true);
+            const formData = new FormData();
+            formData.append('file', file);
+            const response = await api.post('/attendance/import/', formData);
+            const { message, error_count, errors } = response.data;
+            const details = errors.slice(0, 10).join('\n');
+            alert(error_count ? `${message}\n${error_count} lines skipped:\n${details}` : message);
+            await fetchAdminData(selectedDate);
+        } catch (error) {
+            console.error("Import failed", error);
+            alert(error.response?.data?.error || "Failed to import attendance.");
+        } finally {
+            setImporting(false);
+        }
+    };
+
     const handleBulkChange = (regNum, field, value) => {
         setBulkData(prev => ({
             ...prev,
@@ -104,11 +117,9 @@ const StaffAttendance = () => {
         setShowHistory(true);
         setHistoryData([]);
         try {
-            // student object is the profile object from profiles/ endpoint
-            // It has 'user' object which has 'id'. 
-            // Note: student.user is an object with id, username etc based on serializer
-            const res = await api.get(`/attendance/?student_id=${student.user.id}`);
-            setHistoryData(res.data);
+            // Roster rows carry the student's user id as `student`
+            const records = await fetchAllPages('/attendance/', { student_id: student.student });
+            setHistoryData(records);
         } catch (error) {
             console.error("Failed to fetch history", error);
         }
@@ -118,7 +129,7 @@ const StaffAttendance = () => {
         const term = searchTerm.toLowerCase();
         return (
             student.reg_num.toLowerCase().includes(term) ||
-            student.user.username.toLowerCase().includes(term)
+            student.name.toLowerCase().includes(term)
         );
     }).sort((a, b) => {
         if (sortConfig.key === 'status') {
@@ -130,11 +141,6 @@ const StaffAttendance = () => {
         let aValue = a[sortConfig.key];
         let bValue = b[sortConfig.key];
 
-        if (sortConfig.key === 'name') {
-            aValue = a.user.username;
-            bValue = b.user.username;
-        }
-
         if (aValue < bValue) return sortConfig.direction === 'asc' ? -1 : 1;
         if (aValue > bValue) return sortConfig.direction === 'asc' ? 1 : -1;
         return 0;
@@ -207,6 +213,10 @@ const StaffAttendance = () => {
                         >
                             Mark All Absent
                         </button>
+                        <label className={`flex-1 md:flex-none bg-gray-50 text-gray-700 hover:bg-gray-100 px-4 py-2 rounded-lg font-medium text-sm transition-colors border border-gray-200 text-center ${importing ? 'opacity-70 cursor-not-allowed' : 'cursor-pointer'}`}>
+                            {importing ? 'Importing...' : 'Import CSV'}
+                            <input type="file" accept=".csv,text/csv" onChange={importRegister} disabled={importing} className="hidden" />
+                        </label>
                         <div className="w-px bg-gray-300 mx-2 hidden md:block"></div>
                         <button
                             onClick={saveBulkAttendance}
@@ -255,7 +265,7 @@ const StaffAttendance = () => {
                                             <td className="py-3 px-6 font-medium text-gray-700">{student.reg_num}</td>
                                             <td className="py-3 px-6 text-gray-800">
                                                 <div className="flex flex-col">
-                                                    <span className="font-medium">{student.user.username}</span>
+                                                    <span className="font-medium">{student.name}</span>
                                                 </div>
                                             </td>
                                             <td className="py-3 px-6 text-center">
@@ -306,7 +316,7 @@ const StaffAttendance = () => {
                     <div className="bg-white rounded-2xl w-full max-w-2xl max-h-[80vh] flex flex-col shadow-2xl">
                         <div className="p-6 border-b border-gray-100 flex justify-between items-center">
                             <h2 className="text-xl font-bold text-gray-800">
-                                Attendance History: <span className="text-blue-600">{historyStudent?.user.username}</span>
+                                Attendance History: <span className="text-blue-600">{historyStudent?.name}</span>
                             </h2>
                             <button onClick={() => setShowHistory(false)} className="text-gray-400 hover:text-gray-600 text-2xl">&times;</button>
                         </div>
@@ -322,7 +332,7 @@ const StaffAttendance = () => {
                                         </tr>
                                     </thead>
                                     <tbody className="divide-y divide-gray-100">
-                                        {[...historyData].reverse().map(record => (
+                                        {historyData.map(record => (
                                             <tr key={record.id}>
                                                 <td className="py-3 px-4">{new Date(record.date).toLocaleDateString()}</td>
                                                 <td className="py-3 px-4">
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { currentUser, fetchPage } from '../api';
 import StaffAttendance from '../components/StaffAttendance';
 
 const Attendance = () => {
@@ -9,17 +9,19 @@ const Attendance = () => {
 
     // Student State
     const [attendance, setAttendance] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         const init = async () => {
             try {
-                const userRes = await api.get('/me/');
-                const userData = userRes.data;
+                const userData = currentUser() || (await api.get('/me/')).data;
                 setUser(userData);
 
                 if (!userData.is_staff_member) {
-                    const attRes = await api.get('/attendance/');
-                    setAttendance(attRes.data);
+                    const page = await fetchPage('/attendance/');
+                    setAttendance(page.results);
+                    setNextPage(page.next);
                 }
             } catch (error) {
                 console.error("Initialization failed", error);
@@ -30,6 +32,20 @@ const Attendance = () => {
         init();
     }, []);
 
+    const loadOlderRecords = async () => {
+        if (!nextPage) return;
+        try {
+            setLoadingMore(true);
+            const page = await fetchPage(nextPage);
+            setAttendance(prev => [...prev, ...page.results]);
+            setNextPage(page.next);
+        } catch (error) {
+            console.error("Failed to load older records", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) return (
         <div className="flex justify-center items-center h-screen bg-gray-50">
             <div className="animate-spin rounded-full h-12 w-12 border-t-2 border-b-2 border-blue-600"></div>
@@ -106,7 +122,7 @@ const Attendance = () => {
                                             </tr>
                                         </thead>
                                         <tbody className="divide-y divide-gray-100">
-                                            {[...records].reverse().map((record) => (
+                                            {records.map((record) => (
                                                 <tr key={record.id} className="hover:bg-gray-50">
                                                     <td className="py-2 px-4 text-gray-800">{new Date(record.date).toLocaleDateString()}</td>
                                                     <td className="py-2 px-4">
@@ -132,6 +148,17 @@ const Attendance = () => {
                         );
                     })
                 )}
+                {nextPage && (
+                    <div className="flex justify-center">
+                        <button
+                            onClick={loadOlderRecords}
+                            disabled={loadingMore}
+                            className="px-4 py-2 text-sm font-medium text-blue-700 bg-blue-50 border border-blue-200 rounded-lg hover:bg-blue-100 disabled:opacity-70"
+                        >
+                            {loadingMore ? 'Loading...' : 'Load older records'}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
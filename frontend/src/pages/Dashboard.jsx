@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import api from '../api';
+import api, { currentUser } from '../api';
 import { useNavigate } from 'react-router-dom';
 import { jsPDF } from "jspdf";
 import autoTable from 'jspdf-autotable';
@@ -92,49 +92,21 @@ const CreateProfile = ({ onProfileCreated }) => {
     );
 };
 
-const StudentDashboard = ({ user, profile }) => {
+const StudentDashboard = ({ user, dashboard }) => {
     const navigate = useNavigate();
-    const [menu, setMenu] = useState([]);
-    const [attendance, setAttendance] = useState([]);
-    const [bill, setBill] = useState(null);
-
-    useEffect(() => {
-        const fetchData = async () => {
-            try {
-                // Fetch Menu
-                const menuRes = await api.get('/menu/');
-                setMenu(menuRes.data);
-
-                // Fetch Attendance
-                const attRes = await api.get('/attendance/');
-                setAttendance(attRes.data);
-
-                // Fetch Bills
-                const billRes = await api.get('/bills/');
-                if (billRes.data.length > 0) {
-                    // Sort by ID descending to show the latest bill
-                    const sortedBills = billRes.data.sort((a, b) => b.id - a.id);
-                    setBill(sortedBills[0]);
-                }
-            } catch (error) {
-                console.error("Error fetching dashboard data", error);
-            }
-        };
-        fetchData();
-    }, []);
-
-    const todayDay = new Date().toLocaleDateString('en-US', { weekday: 'long' });
-    const todayMenu = menu.find(m => m.day === todayDay);
+    // Profile, today's menu, this month's counts and the latest bill all
+    // come from the one /dashboard/ response the page loaded.
+    const profile = dashboard.profile;
+    const todayMenu = dashboard.menu;
+    const monthSummary = dashboard.attendance;
+    const bill = dashboard.latest_bill;
+    // The invoice breakdown uses the billed month's counts
+    const billSummary = dashboard.latest_bill_attendance;
 
     // Monthly Attendance Logic
-    const currentMonth = new Date().getMonth();
-    const currentYear = new Date().getFullYear();
     const monthName = new Date().toLocaleString('default', { month: 'long' });
 
-    const thisMonthPresent = attendance.filter(a => {
-        const d = new Date(a.date);
-        return d.getMonth() === currentMonth && d.getFullYear() === currentYear && a.is_present;
-    }).length;
+    const thisMonthPresent = monthSummary ? monthSummary.present_days : 0;
 
     const downloadInvoice = () => {
         if (!bill) return;
@@ -180,20 +152,12 @@ const StudentDashboard = ({ user, profile }) => {
         doc.text(`Year: ${profile.year}`, 100, 92);
 
         // 3. Calculation Data preparation
-        const daysInMonth = new Date(currentYear, currentMonth + 1, 0).getDate();
-        const pDays = attendance.filter(a => {
-            const d = new Date(a.date);
-            return d.getMonth() === currentMonth && d.getFullYear() === currentYear && a.is_present;
-        }).length;
+        const [billYear, billMonth] = bill.month.split('-').map(Number);
+        const daysInMonth = new Date(billYear, billMonth, 0).getDate();
+        const pDays = billSummary ? billSummary.present_days : 0;
         const abDays = daysInMonth - pDays;
-        const vegCount = attendance.filter(a => {
-            const d = new Date(a.date);
-            return d.getMonth() === currentMonth && d.getFullYear() === currentYear && a.is_present && a.meal_type === 'Veg';
-        }).length;
-        const nvCount = attendance.filter(a => {
-            const d = new Date(a.date);
-            return d.getMonth() === currentMonth && d.getFullYear() === currentYear && a.is_present && a.meal_type === 'Non-Veg';
-        }).length;
+        const nvCount = billSummary ? billSummary.nv_days : 0;
+        const vegCount = pDays - nvCount;
 
         const dailyRate = parseFloat(bill.daily_rate || 0);
         const nvPlateRate = parseFloat(bill.nv_plate_rate || 0);
@@ -331,8 +295,27 @@ const StudentDashboard = ({ user, profile }) => {
 
 import StaffAttendance from '../components/StaffAttendance';
 
+// How often the kitchen's plate counts are re-read while the dashboard is open
+const HEADCOUNT_POLL_MS = 30000;
+
 const StaffDashboard = ({ user }) => {
     const navigate = useNavigate();
+    const [headcount, setHeadcount] = useState(null);
+
+    useEffect(() => {
+        const fetchHeadcount = async () => {
+            try {
+                const { data } = await api.get('/attendance/headcount/');
+                setHeadcount(data);
+            } catch (error) {
+                console.error("Headcount fetch failed", error);
+            }
+        };
+        fetchHeadcount();
+        const timer = setInterval(fetchHeadcount, HEADCOUNT_POLL_MS);
+        return () => clearInterval(timer);
+    }, []);
+
     return (
         <div className="bg-white p-8 rounded-xl shadow-lg space-y-8 border border-gray-200">
             <div>
@@ -361,6 +344,18 @@ const StaffDashboard = ({ user }) => {
                         <h4 className="font-bold text-purple-600 mb-2">Billing</h4>
                         <p className="text-sm text-gray-600">Generate and track monthly mess bills.</p>
                     </div>
+                    <div className="p-6 bg-gray-50 rounded-xl border border-gray-200">
+                        <h4 className="font-bold text-orange-600 mb-2">Today's Plates</h4>
+                        {headcount ? (
+                            <p className="text-sm text-gray-600">
+                                <span className="font-bold text-gray-900">{headcount.plates['Veg']}</span> Veg,{' '}
+                                <span className="font-bold text-gray-900">{headcount.plates['Non-Veg']}</span> Non-Veg
+                                ({headcount.total} total)
+                            </p>
+                        ) : (
+                            <p className="text-sm text-gray-600">Loading...</p>
+                        )}
+                    </div>
                 </div>
             </div>
 
@@ -375,31 +370,33 @@ const StaffDashboard = ({ user }) => {
 export default function Dashboard() {
     const navigate = useNavigate();
     const [user, setUser] = useState(null);
-    const [profile, setProfile] = useState(null);
+    const [dashboard, setDashboard] = useState(null);
     const [loading, setLoading] = useState(true);
 
-    const fetchProfile = async () => {
+    // 404 means the student has no profile yet
+    const fetchDashboard = async () => {
         try {
-            // For student, try to fetch profile
-            const profileRes = await api.get('/profiles/');
-            if (profileRes.data && profileRes.data.length > 0) {
-                setProfile(profileRes.data[0]);
+            const { data } = await api.get('/dashboard/');
+            setDashboard(data);
+        } catch (error) {
+            if (error.response && error.response.status === 404) {
+                setDashboard(null);
             } else {
-                setProfile(null);
+                throw error;
             }
-        } catch (error) {
-            console.error("Profile Fetch Error", error);
         }
     };
 
     useEffect(() => {
         const init = async () => {
             try {
-                const userRes = await api.get('/me/');
-                setUser(userRes.data);
+                // Who is logged in comes from the token, so a student's page
+                // load is the single /dashboard/ request.
+                const userData = currentUser() || (await api.get('/me/')).data;
+                setUser(userData);
 
-                if (!userRes.data.is_staff_member) {
-                    await fetchProfile();
+                if (!userData.is_staff_member) {
+                    await fetchDashboard();
                 }
             } catch (error) {
                 console.error("Auth Error", error);
@@ -427,10 +424,10 @@ export default function Dashboard() {
                 <StaffDashboard user={user} />
             ) : (
                 <>
-                    {profile ? (
-                        <StudentDashboard user={user} profile={profile} />
+                    {dashboard ? (
+                        <StudentDashboard user={user} dashboard={dashboard} />
                     ) : (
-                        <CreateProfile onProfileCreated={fetchProfile} />
+                        <CreateProfile onProfileCreated={fetchDashboard} />
                     )}
                 </>
             )}
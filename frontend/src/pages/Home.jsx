@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import api from '../api';
+import api, { currentUser } from '../api';
 import svuBuilding from '../assets/svu_building.jpg';
 import logo from '../assets/logo.jpg';
 
@@ -12,8 +12,8 @@ const Home = () => {
         const fetchUser = async () => {
             try {
                 if (localStorage.getItem('access_token')) {
-                    const res = await api.get('/me/');
-                    setUser(res.data);
+                    const claims = currentUser();
+                    setUser(claims || (await api.get('/me/')).data);
                 }
             } catch (error) {
                 console.log("Not logged in");
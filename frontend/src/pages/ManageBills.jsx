@@ -1,11 +1,18 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchPage } from '../api';
 
 const ManageBills = () => {
     const [bills, setBills] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [exportMonth, setExportMonth] = useState('');
+    const [job, setJob] = useState(null);
+    const [pendingRebill, setPendingRebill] = useState(0);
+    const [reconciling, setReconciling] = useState(false);
     const [formData, setFormData] = useState({
         month: '',
+        end_month: '',
         daily_rate: '',
         nv_plate_rate: '',
         room_rent: '150',
@@ -16,12 +23,37 @@ const ManageBills = () => {
 
     useEffect(() => {
         fetchBills();
+        fetchPendingRebill();
     }, []);
 
+    // Bills whose attendance was corrected after they were generated
+    const fetchPendingRebill = async () => {
+        try {
+            const response = await api.get('/bills/rebill/');
+            setPendingRebill(response.data.pending);
+        } catch (error) {
+            console.error("Error checking bills to recompute", error);
+        }
+    };
+
+    const handleRebill = async () => {
+        try {
+            const response = await api.post('/bills/rebill/');
+            alert(response.data.message);
+            setPendingRebill(0);
+            fetchBills();
+        } catch (error) {
+            console.error("Error recomputing bills", error);
+            alert('Failed to recompute bills.');
+        }
+    };
+
+    // Bills come newest first, one page at a time
     const fetchBills = async () => {
         try {
-            const response = await api.get('/bills/');
-            setBills(response.data);
+            const page = await fetchPage('/bills/');
+            setBills(page.results);
+            setNextPage(page.next);
         } catch (error) {
             console.error("Error fetching bills", error);
         } finally {
@@ -29,20 +61,44 @@ const ManageBills = () => {
         }
     };
 
+    const loadMoreBills = async () => {
+        if (!nextPage) return;
+        try {
+            setLoadingMore(true);
+            const page = await fetchPage(nextPage);
+            setBills(prev => [...prev, ...page.results]);
+            setNextPage(page.next);
+        } catch (error) {
+            console.error("Error fetching more bills", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleChange = (e) => {
         setFormData({ ...formData, [e.target.name]: e.target.value });
     };
 
+    // Bills are generated by a background worker; poll the job until it finishes
+    const pollJob = async (jobId) => {
+        while (true) {
+            const { data: job } = await api.get(`/billing-jobs/${jobId}/`);
+            setJob(job);
+            if (job.status === 'done' || job.status === 'failed') return job;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    };
+
     const handleGenerate = async (e) => {
         e.preventDefault();
-        if (!window.confirm(`Generate bills for ${formData.month}?`)) return;
+        const months = formData.end_month ? `${formData.month} to ${formData.end_month}` : formData.month;
+        if (!window.confirm(`Generate bills for ${months}?`)) return;
 
         try {
             const response = await api.post('/bills/generate_bills/', formData);
-            alert(response.data.message);
-            fetchBills();
             setFormData({
                 month: '',
+                end_month: '',
                 daily_rate: '',
                 nv_plate_rate: '',
                 room_rent: '150',
@@ -50,9 +106,64 @@ const ManageBills = () => {
                 electricity_charges: '150',
                 establishment_charges: '275'
             });
+            const job = await pollJob(response.data.job_id);
+            if (job.status === 'done') {
+                alert(`${job.total} bills generated (${job.created_count} new, ${job.updated_count} updated).`);
+                fetchBills();
+                fetchPendingRebill();
+            } else {
+                alert(`Bill generation failed: ${job.errors.join(', ')}`);
+            }
         } catch (error) {
             console.error("Error generating bills", error);
             alert('Failed to generate bills.');
+        } finally {
+            setJob(null);
+        }
+    };
+
+    // Downloads the month's bills as CSV (all bills when no month is picked)
+    const exportBills = async () => {
+        try {
+            const response = await api.get('/bills/export/', {
+                params: { fmt: 'csv', ...(exportMonth && { month: exportMonth }) },
+                responseType: 'blob',
+            });
+            const url = URL.createObjectURL(response.data);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = `bills${exportMonth ? `-${exportMonth}` : ''}.csv`;
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (error) {
+            console.error("Error exporting bills", error);
+            alert('Failed to export bills.');
+        }
+    };
+
+    // Uploads a bank / UPI statement CSV; matched lines mark their bills paid
+    const reconcileStatement = async (e) => {
+        const file = e.target.files[0];
+        e.target.value = '';
+        if (!file) return;
+        try {
+            setReconciling(true);
+            const formData = new FormData();
+            formData.append('file', file);
+            const response = await api.post('/bills/reconcile/', formData);
+            const { message, ambiguous, unmatched } = response.data;
+            const review = [...ambiguous, ...unmatched]
+                .sort((a, b) => a.line - b.line)
+                .slice(0, 10)
+                .map(entry => `Line ${entry.line}: ${entry.reason}`);
+            const pending = ambiguous.length + unmatched.length;
+            alert(pending ? `${message}\n${pending} lines need review:\n${review.join('\n')}` : message);
+            fetchBills();
+        } catch (error) {
+            console.error("Reconciliation failed", error);
+            alert(error.response?.data?.error || 'Failed to reconcile the statement.');
+        } finally {
+            setReconciling(false);
         }
     };
 
@@ -61,8 +172,8 @@ const ManageBills = () => {
     const markAsPaid = async (id) => {
         if (!window.confirm('Mark this bill as Paid?')) return;
         try {
-            await api.patch(`/bills/${id}/`, { is_paid: true });
-            fetchBills();
+            const response = await api.patch(`/bills/${id}/`, { is_paid: true });
+            setBills(prev => prev.map(bill => (bill.id === id ? response.data : bill)));
         } catch (error) {
             console.error("Error updating bill", error);
             alert("Failed to update bill.");
@@ -73,6 +184,18 @@ const ManageBills = () => {
         <div className="max-w-6xl mx-auto p-6 space-y-8">
             <h1 className="text-3xl font-bold text-gray-800">Billing Management</h1>
 
+            {pendingRebill > 0 && (
+                <div className="flex flex-col md:flex-row justify-between items-start md:items-center gap-4 bg-yellow-50 border border-yellow-200 text-yellow-800 p-4 rounded-xl">
+                    <span>Attendance changed for {pendingRebill} bill{pendingRebill === 1 ? '' : 's'} after {pendingRebill === 1 ? 'it was' : 'they were'} generated.</span>
+                    <button
+                        onClick={handleRebill}
+                        className="px-4 py-2 bg-yellow-500 text-white rounded-lg font-bold hover:bg-yellow-600 transition shadow-md"
+                    >
+                        Recompute Changed Bills
+                    </button>
+                </div>
+            )}
+
             {/* Generate Bills Section */}
             <div className="bg-white p-8 rounded-2xl shadow-lg border border-gray-100">
                 <h2 className="text-xl font-bold mb-6 text-gray-700 flex items-center">
@@ -91,6 +214,17 @@ const ManageBills = () => {
                             className="w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-purple-500 focus:border-transparent"
                         />
                     </div>
+                    <div>
+                        <label className="block text-sm font-semibold text-gray-600 mb-2">Through Month (optional)</label>
+                        <input
+                            name="end_month"
+                            type="month"
+                            min={formData.month}
+                            value={formData.end_month}
+                            onChange={handleChange}
+                            className="w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-purple-500 focus:border-transparent"
+                        />
+                    </div>
                     <div>
                         <label className="block text-sm font-semibold text-gray-600 mb-2">Daily Rate (Veg)</label>
                         <input
@@ -168,16 +302,52 @@ const ManageBills = () => {
 
                     <button
                         type="submit"
-                        className="px-6 py-2.5 bg-purple-600 text-white rounded-lg font-bold hover:bg-purple-700 transition shadow-md md:col-span-1"
+                        disabled={job !== null}
+                        className="px-6 py-2.5 bg-purple-600 text-white rounded-lg font-bold hover:bg-purple-700 transition shadow-md md:col-span-1 disabled:opacity-70 disabled:cursor-not-allowed"
                     >
-                        Generate Bills
+                        {job ? 'Generating...' : 'Generate Bills'}
                     </button>
                 </form>
+                {job && (
+                    <div className="mt-6">
+                        <div className="flex justify-between text-sm text-gray-600 mb-1">
+                            <span>{job.status === 'queued' ? 'Waiting for the billing worker...' : `Billing ${job.month}${job.end_month ? ` to ${job.end_month}` : ''}`}</span>
+                            <span>{job.processed} / {job.total || '?'}</span>
+                        </div>
+                        <div className="w-full bg-gray-100 rounded-full h-2">
+                            <div
+                                className="bg-purple-600 h-2 rounded-full transition-all"
+                                style={{ width: `${job.total ? Math.round(100 * job.processed / job.total) : 0}%` }}
+                            ></div>
+                        </div>
+                    </div>
+                )}
             </div>
 
             {/* Bills List */}
             <div className="bg-white p-8 rounded-2xl shadow-lg border border-gray-100">
-                <h2 className="text-xl font-bold mb-6 text-gray-700">Recent Bills</h2>
+                <div className="flex flex-wrap items-center justify-between gap-4 mb-6">
+                    <h2 className="text-xl font-bold text-gray-700">Recent Bills</h2>
+                    <div className="flex items-center gap-2">
+                        <input
+                            type="month"
+                            value={exportMonth}
+                            onChange={(e) => setExportMonth(e.target.value)}
+                            className="px-3 py-2 border rounded-lg text-sm focus:ring-2 focus:ring-purple-500 focus:border-transparent"
+                        />
+                        <button
+                            type="button"
+                            onClick={exportBills}
+                            className="px-4 py-2 bg-gray-100 text-gray-700 rounded-lg text-sm font-semibold hover:bg-gray-200 transition"
+                        >
+                            Export CSV
+                        </button>
+                        <label className={`px-4 py-2 bg-green-50 text-green-700 border border-green-200 rounded-lg text-sm font-semibold hover:bg-green-100 transition ${reconciling ? 'opacity-70 cursor-not-allowed' : 'cursor-pointer'}`}>
+                            {reconciling ? 'Reconciling...' : 'Reconcile Statement'}
+                            <input type="file" accept=".csv,text/csv" onChange={reconcileStatement} disabled={reconciling} className="hidden" />
+                        </label>
+                    </div>
+                </div>
                 {loading ? (
                     <p>Loading...</p>
                 ) : bills.length === 0 ? (
@@ -195,7 +365,7 @@ const ManageBills = () => {
                                 </tr>
                             </thead>
                             <tbody className="divide-y divide-gray-100">
-                                {[...bills].reverse().map((bill) => (
+                                {bills.map((bill) => (
                                     <tr key={bill.id} className="hover:bg-gray-50">
                                         <td className="py-3 px-4 text-gray-800 font-medium">
                                             {bill.student_name}
@@ -227,6 +397,17 @@ const ManageBills = () => {
                                 ))}
                             </tbody>
                         </table>
+                        {nextPage && (
+                            <div className="flex justify-center py-4">
+                                <button
+                                    onClick={loadMoreBills}
+                                    disabled={loadingMore}
+                                    className="px-4 py-2 text-sm font-medium text-purple-700 bg-purple-50 border border-purple-200 rounded-lg hover:bg-purple-100 disabled:opacity-70"
+                                >
+                                    {loadingMore ? 'Loading...' : 'Load more bills'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 )}
             </div>
@@ -1,19 +1,24 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import { fetchPage } from '../api';
 
 const ManageStudents = () => {
     const [students, setStudents] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [searchTerm, setSearchTerm] = useState('');
 
+    // Search runs on the server (?search=), debounced while typing
     useEffect(() => {
-        fetchStudents();
-    }, []);
+        const timer = setTimeout(() => fetchStudents(searchTerm), 300);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
 
-    const fetchStudents = async () => {
+    const fetchStudents = async (term) => {
         try {
-            const response = await api.get('/profiles/');
-            setStudents(response.data);
+            const page = await fetchPage('/profiles/', term ? { search: term } : undefined);
+            setStudents(page.results);
+            setNextPage(page.next);
         } catch (error) {
             console.error("Error fetching students", error);
         } finally {
@@ -21,11 +26,19 @@ const ManageStudents = () => {
         }
     };
 
-    const filteredStudents = students.filter(student =>
-        student.user.username.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        student.reg_num.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (student.branch && student.branch.toLowerCase().includes(searchTerm.toLowerCase()))
-    );
+    const loadMoreStudents = async () => {
+        if (!nextPage) return;
+        try {
+            setLoadingMore(true);
+            const page = await fetchPage(nextPage);
+            setStudents(prev => [...prev, ...page.results]);
+            setNextPage(page.next);
+        } catch (error) {
+            console.error("Error fetching more students", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     if (loading) return (
         <div className="flex justify-center items-center h-[50vh]">
@@ -38,7 +51,7 @@ const ManageStudents = () => {
             <div className="flex flex-col md:flex-row justify-between items-end md:items-center gap-4">
                 <div>
                     <h1 className="text-3xl font-bold text-gray-800">Student Profiles</h1>
-                    <p className="text-gray-500 mt-1">Total Registered Students: {students.length}</p>
+                    <p className="text-gray-500 mt-1">Showing {students.length}{nextPage ? '+' : ''} students</p>
                 </div>
                 <div className="relative w-full md:w-80">
                     <span className="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none text-gray-400">
@@ -67,14 +80,14 @@ const ManageStudents = () => {
                             </tr>
                         </thead>
                         <tbody className="divide-y divide-gray-50">
-                            {filteredStudents.length === 0 ? (
+                            {students.length === 0 ? (
                                 <tr>
                                     <td colSpan="5" className="text-center py-10 text-gray-500 italic">
                                         No students found matching your search.
                                     </td>
                                 </tr>
                             ) : (
-                                filteredStudents.map((student) => (
+                                students.map((student) => (
                                     <tr key={student.user.id} className="hover:bg-blue-50/50 transition-colors group">
                                         <td className="py-4 px-6">
                                             <div className="flex items-center gap-3">
@@ -105,6 +118,17 @@ const ManageStudents = () => {
                         </tbody>
                     </table>
                 </div>
+                {nextPage && (
+                    <div className="flex justify-center py-4 border-t border-gray-100">
+                        <button
+                            onClick={loadMoreStudents}
+                            disabled={loadingMore}
+                            className="px-4 py-2 text-sm font-medium text-blue-700 bg-blue-50 border border-blue-200 rounded-lg hover:bg-blue-100 disabled:opacity-70"
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more students'}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );